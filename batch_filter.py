@@ -0,0 +1,174 @@
+from array import array
+from collections.abc import Hashable, Iterable
+from dataclasses import dataclass
+
+from compact_filter import CompactStopWordMatcher
+from stream_stopper import StopWordFilter, StopWordMatcher, compile_stop_words
+
+# Up to this many stop words filter_batch scans with str.find (C speed) instead of the automaton
+FIND_SCAN_LIMIT = 32
+
+
+@dataclass(frozen=True, slots=True)
+class BatchResult:
+    """
+    Outcome of one filtered stream.
+    text is the same as "".join(cut_stream_stop_words(tokens, stop_words)),
+    cut is the character offset where the stop word starts, None when the stream was not cut.
+    """
+    text: str
+    cut: int | None = None
+    stop_word: str | None = None
+
+
+def filter_batch(streams: Iterable[list[str]],
+                 stop_words: list[str] | StopWordFilter) -> list[BatchResult]:
+    """
+    Filter many recorded token streams without one generator per stream.
+    Each stream is first scanned as a single joined text, only streams containing a stop word
+    are rescanned token by token to find the cut of cut_stream_stop_words exactly.
+    Short literal lists are scanned with str.find, which runs at C speed.
+    """
+    filter = compile_stop_words(stop_words)
+    if _scans_with_find(filter):
+        words = [word for word in filter.complete_words if word]
+        return [_cut_with_find(tokens, words) for tokens in streams]
+
+    matcher = filter.matcher()
+    plain = _plain_matcher(matcher)
+    results = []
+
+    for tokens in streams:
+        text = "".join(tokens)
+        if not filter.max_length:
+            results.append(BatchResult(text))
+            continue
+
+        matcher = _reset(matcher, filter, plain)
+        if matcher.feed(text) is None:
+            results.append(BatchResult(text))
+            continue
+
+        # The earliest match of the whole text may end in a later token than the first match,
+        # cut_stream_stop_words stops at the first token completing any stop word
+        matcher = _reset(matcher, filter, plain)
+        for token in tokens:
+            match = matcher.feed(token)
+            if match:
+                stop_word, stop_start, _ = match
+                results.append(BatchResult(text[:stop_start], stop_start, stop_word))
+                break
+
+    return results
+
+
+def _plain_matcher(matcher) -> bool:
+    # The whole state of these matchers is (state, offset), other matchers keep more
+    return isinstance(matcher, (StopWordMatcher, CompactStopWordMatcher))
+
+
+def _reset(matcher, filter, plain: bool):
+    if plain:
+        matcher.state = matcher.offset = 0
+        return matcher
+    return filter.matcher()
+
+
+def _scans_with_find(filter) -> bool:
+    # Normalizing filters match other text than the literal words
+    return (isinstance(filter, StopWordFilter) and filter.normalize is None
+            and len(filter.complete_words) <= FIND_SCAN_LIMIT)
+
+
+def _cut_with_find(tokens: list[str], words: list[str]) -> BatchResult:
+    """
+    Same cut as the automaton, computed from the first occurrence of every stop word.
+    """
+    text = "".join(tokens)
+
+    # The first completed match ends where the earliest ending first occurrence ends
+    first_end = None
+    for word in words:
+        index = text.find(word)
+        if index >= 0 and (first_end is None or index + len(word) < first_end):
+            first_end = index + len(word)
+    if first_end is None:
+        return BatchResult(text)
+
+    # End of the token completing it, the filter stops after this token
+    token_end = 0
+    for token in tokens:
+        token_end += len(token)
+        if token_end >= first_end:
+            break
+
+    # Earliest start among the matches inside the scanned text, the shortest word on a tie
+    stop_start = stop_word = None
+    for word in words:
+        index = text.find(word, 0, token_end)
+        if index >= 0 and (stop_start is None or index < stop_start
+                           or index == stop_start and len(word) < len(stop_word)):
+            stop_start, stop_word = index, word
+
+    return BatchResult(text[:stop_start], stop_start, stop_word)
+
+
+def filter_interleaved(events: Iterable[tuple[Hashable, str]],
+                       stop_words: list[str] | StopWordFilter) -> dict[Hashable, BatchResult]:
+    """
+    Filter one interleaved stream of (stream_id, token) events, e.g. a replayed server log.
+    The matcher state of every stream is kept in flat arrays indexed by a per-stream slot and
+    loaded into a single shared matcher for each event. Tokens of a stream after its cut are ignored.
+    Short literal lists and matchers with more state than (state, offset), e.g. normalizing
+    or pattern filters, group the tokens by stream and use filter_batch.
+    """
+    filter = compile_stop_words(stop_words)
+    matcher = filter.matcher()
+    if _scans_with_find(filter) or not _plain_matcher(matcher):
+        grouped = {}
+        for stream_id, token in events:
+            tokens = grouped.get(stream_id)
+            if tokens is None:
+                tokens = grouped[stream_id] = []
+            tokens.append(token)
+        return dict(zip(grouped, filter_batch(grouped.values(), filter)))
+
+    slots = {}                 # stream_id -> slot
+    states = array("q")        # automaton state of each slot
+    offsets = array("q")       # characters fed to each slot
+    cuts = array("q")          # stop word start of each slot, -1 while the stream is open
+    stop_words_found = []
+    pieces = []                # tokens of each slot
+
+    for stream_id, token in events:
+        slot = slots.get(stream_id)
+        if slot is None:
+            slot = slots[stream_id] = len(states)
+            states.append(0)
+            offsets.append(0)
+            cuts.append(-1)
+            stop_words_found.append(None)
+            pieces.append([])
+        elif cuts[slot] >= 0:
+            continue
+
+        pieces[slot].append(token)
+        if not filter.max_length:
+            continue
+
+        matcher.state = states[slot]
+        matcher.offset = offsets[slot]
+        match = matcher.feed(token)
+        states[slot] = matcher.state
+        offsets[slot] = matcher.offset
+        if match:
+            stop_words_found[slot], cuts[slot], _ = match
+
+    results = {}
+    for stream_id, slot in slots.items():
+        text = "".join(pieces[slot])
+        if cuts[slot] >= 0:
+            results[stream_id] = BatchResult(text[:cuts[slot]], cuts[slot], stop_words_found[slot])
+        else:
+            results[stream_id] = BatchResult(text)
+    return results
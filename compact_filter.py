@@ -0,0 +1,314 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable
+
+from stream_stopper import StopWordFilter
+
+# File layout: header followed by the little-endian uint32 tables and the UTF-8 words blob
+FILE_MAGIC = b"SSAC"
+FILE_VERSION = 2
+# magic, version, states, edges, words, blob bytes, max length, sha256 of everything after the header
+_HEADER = struct.Struct("<4sIIIIII32s")
+_TABLES = ("edge_offsets", "edge_chars", "edge_targets", "fail", "depth",
+           "output_length", "output_word", "word_offsets")
+
+
+class CompactStopWordFilter:
+    """
+    Array-backed form of the StopWordFilter automaton for large stop word vocabularies.
+    Transitions are stored as sorted edge tables in flat uint32 arrays instead of nested dicts:
+    the edges of state s are edge_chars/edge_targets[edge_offsets[s]:edge_offsets[s + 1]],
+    sorted by code point and searched with bisect.
+    The tables can be saved to a single file and loaded back through mmap without copying,
+    so worker processes start instantly and share the pages.
+    """
+
+    def __init__(self, stop_words: Iterable[str]):
+        self._load_tables(StopWordFilter(stop_words))
+
+    @classmethod
+    def from_filter(cls, filter: StopWordFilter) -> "CompactStopWordFilter":
+        """
+        Convert an already compiled StopWordFilter.
+        Normalizing filters are not supported, the compact tables carry no normalization.
+        """
+        if filter.normalize is not None:
+            raise ValueError("a normalizing StopWordFilter cannot be converted to a CompactStopWordFilter")
+        compact = cls.__new__(cls)
+        compact._load_tables(filter)
+        return compact
+
+    def _load_tables(self, filter: StopWordFilter):
+        self.max_length = filter.max_length
+
+        self.edge_offsets = array("I", [0])
+        self.edge_chars = array("I")
+        self.edge_targets = array("I")
+        for edges in filter.goto:
+            for char in sorted(edges):
+                self.edge_chars.append(ord(char))
+                self.edge_targets.append(edges[char])
+            self.edge_offsets.append(len(self.edge_chars))
+
+        self.fail = array("I", filter.fail)
+        self.depth = array("I", filter.depth)
+
+        # Outputs refer to the words blob, the length alone is enough while scanning
+        words = sorted(set(word for word in filter.output if word is not None))
+        word_index = {word: index for index, word in enumerate(words)}
+        self.output_length = array("I", (len(word) if word else 0 for word in filter.output))
+        self.output_word = array("I", (word_index[word] if word else 0 for word in filter.output))
+
+        blob = bytearray()
+        self.word_offsets = array("I", [0])
+        for word in words:
+            blob += word.encode("utf-8")
+            self.word_offsets.append(len(blob))
+        self.words_blob = bytes(blob)
+        self._mmap = None
+
+    @property
+    def stop_words(self) -> tuple[str, ...]:
+        return tuple(self._word(index) for index in range(len(self.word_offsets) - 1))
+
+    def _word(self, index: int) -> str:
+        return bytes(self.words_blob[self.word_offsets[index]:self.word_offsets[index + 1]]).decode("utf-8")
+
+    def _next_state(self, state: int, char: str) -> int | None:
+        """
+        Trie edge of the state for the character, or None.
+        """
+        code = ord(char)
+        lo = self.edge_offsets[state]
+        hi = self.edge_offsets[state + 1]
+        index = bisect_left(self.edge_chars, code, lo, hi)
+        if index < hi and self.edge_chars[index] == code:
+            return self.edge_targets[index]
+        return None
+
+    def matcher(self) -> "CompactStopWordMatcher":
+        """
+        Create a streaming matcher starting at the beginning of a new stream.
+        """
+        return CompactStopWordMatcher(self)
+
+    def find_stop_word_at_position(self, text: str, start_pos: int) -> tuple[str, int] | None:
+        """
+        Find a stop word starting at the given position.
+        Returns (stop_word, end_position) or None.
+        """
+        state = 0
+        for i in range(start_pos, min(start_pos + self.max_length, len(text))):
+            state = self._next_state(state, text[i])
+            if state is None:
+                return None
+            if self.output_length[state] == self.depth[state] != 0:
+                return self._word(self.output_word[state]), i + 1
+
+        return None
+
+    def find_stop_words_at_position(self, text: str, start_pos: int) -> list[tuple[str, int]]:
+        """
+        Find all stop words starting at the given position, shortest first.
+        Returns a list of (stop_word, end_position).
+        """
+        matches = []
+        state = 0
+        for i in range(start_pos, min(start_pos + self.max_length, len(text))):
+            state = self._next_state(state, text[i])
+            if state is None:
+                break
+            if self.output_length[state] == self.depth[state] != 0:
+                matches.append((self._word(self.output_word[state]), i + 1))
+        return matches
+
+    def find_earliest_stop_word(self, text: str) -> tuple[str, int, int] | None:
+        """
+        Find the earliest occurring stop word in the text.
+        Returns (stop_word, start_pos, end_pos) or None.
+        """
+        return self.matcher().feed(text)
+
+    def save(self, path: str):
+        """
+        Serialize the automaton into a single file which can be loaded with load().
+        """
+        payload = []
+        for name in _TABLES:
+            table = array("I", getattr(self, name))
+            if sys.byteorder != "little":
+                table.byteswap()
+            payload.append(table.tobytes())
+        payload.append(bytes(self.words_blob))
+
+        checksum = hashlib.sha256()
+        for part in payload:
+            checksum.update(part)
+        with open(path, "wb") as file:
+            file.write(_HEADER.pack(FILE_MAGIC, FILE_VERSION, len(self.fail), len(self.edge_chars),
+                                    len(self.word_offsets) - 1, len(self.words_blob), self.max_length,
+                                    checksum.digest()))
+            for part in payload:
+                file.write(part)
+
+    @classmethod
+    def load(cls, path: str, verify: bool = True) -> "CompactStopWordFilter":
+        """
+        Load an automaton saved by save(). The tables are memory mapped, not copied.
+        With verify the sha256 checksum of the tables is checked, a damaged file raises ValueError.
+        """
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(mapped) < _HEADER.size:
+            mapped.close()
+            raise ValueError(f"{path} is not a compact stop word filter of version {FILE_VERSION}")
+        magic, version, states, edges, words, blob_size, max_length, checksum = _HEADER.unpack_from(mapped)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            mapped.close()
+            raise ValueError(f"{path} is not a compact stop word filter of version {FILE_VERSION}")
+
+        sizes = {"edge_offsets": states + 1, "edge_chars": edges, "edge_targets": edges,
+                 "fail": states, "depth": states, "output_length": states,
+                 "output_word": states, "word_offsets": words + 1}
+        if len(mapped) != _HEADER.size + 4 * sum(sizes.values()) + blob_size:
+            mapped.close()
+            raise ValueError(f"{path} is truncated")
+
+        view = memoryview(mapped)
+        if verify and hashlib.sha256(view[_HEADER.size:]).digest() != checksum:
+            view.release()
+            mapped.close()
+            raise ValueError(f"{path} fails the checksum")
+
+        compact = cls.__new__(cls)
+        compact.max_length = max_length
+        compact._mmap = mapped
+        position = _HEADER.size
+        for name in _TABLES:
+            size = sizes[name] * 4
+            table = view[position:position + size].cast("I")
+            if sys.byteorder != "little":
+                table = array("I", table)
+                table.byteswap()
+            setattr(compact, name, table)
+            position += size
+        compact.words_blob = view[position:position + blob_size]
+        return compact
+
+
+def default_cache_dir() -> str:
+    """
+    STREAM_STOPPER_CACHE, or stream_stopper in the user cache directory.
+    """
+    path = os.environ.get("STREAM_STOPPER_CACHE")
+    if path:
+        return path
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "stream_stopper")
+
+
+def cache_key(stop_words: Iterable[str]) -> str:
+    """
+    Content address of a stop word list: sha256 of the normalized word set (deduplicated, sorted,
+    without empty words, like compile_stop_words) and the file format version.
+    A changed list or a new format version gives a new key, old entries are never read.
+    """
+    digest = hashlib.sha256(b"%s%d\0" % (FILE_MAGIC, FILE_VERSION))
+    words = set(stop_words)
+    words.discard("")
+    digest.update("\0".join(sorted(words)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_cached(stop_words: Iterable[str], cache_dir: str | None = None) -> CompactStopWordFilter:
+    """
+    Compiled filter of the stop words from a content addressed cache directory.
+    The first worker builds the automaton and saves it, the others mmap the file instead of rebuilding.
+    A damaged or unreadable entry is rebuilt; entries are written to a temporary file and renamed,
+    so concurrent workers never see a partial file.
+    """
+    stop_words = list(stop_words)
+    cache_dir = cache_dir or default_cache_dir()
+    path = os.path.join(cache_dir, cache_key(stop_words) + ".ssac")
+    try:
+        return CompactStopWordFilter.load(path)
+    except (OSError, ValueError):
+        pass
+
+    compact = CompactStopWordFilter(sorted(set(word for word in stop_words if word)))
+    os.makedirs(cache_dir, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    os.close(descriptor)
+    try:
+        compact.save(temporary)
+        os.replace(temporary, path)
+    except OSError:
+        os.unlink(temporary)
+        raise
+    return compact
+
+
+class CompactStopWordMatcher:
+    """
+    Streaming state of the CompactStopWordFilter automaton, same interface as StopWordMatcher.
+    """
+
+    def __init__(self, filter: CompactStopWordFilter):
+        self.filter = filter
+        self.state = 0
+        self.offset = 0  # Number of characters fed so far
+
+    @property
+    def live_start(self) -> int:
+        """
+        Stream offset of the longest fed suffix which is still a prefix of some stop word.
+        """
+        return self.offset - self.filter.depth[self.state]
+
+    def feed(self, text: str) -> tuple[str, int, int] | None:
+        """
+        Advance the automaton over the text.
+        Returns (stop_word, start_pos, end_pos) of the earliest starting stop word which ends
+        inside the text, positions are counted from the start of the stream. Otherwise None.
+        """
+        filter = self.filter
+        edge_offsets = filter.edge_offsets
+        edge_chars = filter.edge_chars
+        edge_targets = filter.edge_targets
+        fail = filter.fail
+        output_length = filter.output_length
+
+        state = self.state
+        position = self.offset
+        match = None
+
+        for char in text:
+            position += 1
+            code = ord(char)
+            while True:
+                lo = edge_offsets[state]
+                hi = edge_offsets[state + 1]
+                index = bisect_left(edge_chars, code, lo, hi)
+                if index < hi and edge_chars[index] == code:
+                    state = edge_targets[index]
+                    break
+                if not state:
+                    break
+                state = fail[state]
+
+            length = output_length[state]
+            if length:
+                start = position - length
+                if match is None or start < match[1]:
+                    match = (filter._word(filter.output_word[state]), start, position)
+
+        self.state = state
+        self.offset = position
+        return match
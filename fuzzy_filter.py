@@ -0,0 +1,235 @@
+"""
+Approximate stop words: matches within a maximal edit distance (Levenshtein: substitutions,
+insertions and deletions), so "HOTOVO" and "HOTOVO." catch "HOTOVO!" and "stopnì" catches "stopni".
+
+    filter = FuzzyStopWordFilter(["HOTOVO!", "stopni"], max_edits=1)
+    filtered = cut_stream_stop_words(token_stream, filter)
+"""
+from collections.abc import Iterable, Mapping
+
+
+def _best_start(word: str, edits: int, text: str, end: int, low: int) -> tuple[int, int] | None:
+    """
+    Start of the best approximate occurrence of the word ending at text[end]: the lowest edit
+    distance, on a tie the latest start, so surrounding characters are not cut with the word.
+    Returns (distance, start) or None. The text is scanned leftwards from end down to low.
+    """
+    length = len(word)
+    # previous[i] = distance(word[length - i:], text[t + 1:end]) for the column right of t
+    previous = list(range(length + 1))
+    best = None
+    for t in range(end - 1, max(low, end - length - edits) - 1, -1):
+        char = text[t]
+        current = [end - t]
+        for i in range(1, length + 1):
+            current.append(min(previous[i - 1] + (word[length - i] != char), previous[i] + 1, current[i - 1] + 1))
+        if current[length] <= edits and (best is None or current[length] < best[0]):
+            best = (current[length], t)
+        if min(current) > edits:
+            # Every alignment reaching further left passes through this column
+            break
+        previous = current
+    return best
+
+
+def _ends_from(word: str, edits: int, text: str, start: int) -> list[int]:
+    """
+    Ends of the approximate occurrences of the word starting at text[start], shortest first.
+    """
+    length = len(word)
+    # previous[i] = distance(word[:i], text[start:t - 1])
+    previous = list(range(length + 1))
+    ends = []
+    for t in range(start, min(len(text), start + length + edits)):
+        char = text[t]
+        current = [t + 1 - start]
+        for i in range(1, length + 1):
+            current.append(min(previous[i - 1] + (word[i - 1] != char), previous[i] + 1, current[i - 1] + 1))
+        if current[length] <= edits:
+            ends.append(t + 1)
+        if min(current) > edits:
+            break
+        previous = current
+    return ends
+
+
+class FuzzyStopWordFilter:
+    """
+    Stop words matched within max_edits edits, a drop-in replacement for StopWordFilter.
+    max_edits is one distance for all words or a mapping word -> distance (missing words match
+    exactly); it has to be smaller than the word, otherwise the word would match anywhere.
+    All words run in one bit-parallel Wu-Manber automaton: the words are laid out side by side
+    in one integer and every level d (0..max_edits) holds the word prefixes which end at the
+    current position with at most d edits, so each character costs a few integer operations
+    per level instead of a rescan. The state is carried between tokens.
+    A match spans at most len(word) + edits characters, which bounds the hold-back (max_length).
+    """
+
+    def __init__(self, stop_words: Iterable[str], max_edits: int | Mapping[str, int] = 1):
+        self.stop_words = tuple(stop_words)
+        self.words = tuple(dict.fromkeys(word for word in self.stop_words if word))
+        if isinstance(max_edits, Mapping):
+            self.edits = tuple(max_edits.get(word, 0) for word in self.words)
+        else:
+            self.edits = (max_edits,) * len(self.words)
+        for word, edits in zip(self.words, self.edits):
+            if not 0 <= edits < len(word):
+                raise ValueError(f"max_edits of {word!r} must be between 0 and {len(word) - 1}, got {edits}")
+
+        self.max_edits = max(self.edits, default=0)
+        self.max_length = max((len(word) + edits for word, edits in zip(self.words, self.edits)), default=0)
+
+        # Bit layout: word w occupies bits offsets[w] .. offsets[w] + len(word) - 1,
+        # bit offsets[w] + j is set when the prefix word[:j + 1] ends at the current position
+        self.first = 0                                       # first bit of every word
+        self.last = [0] * (self.max_edits + 1)               # last bits of the words allowing d edits
+        self.word_of_last = {}                               # last bit -> word index
+        self.masks = {}                                      # character -> bits of its positions
+        longest = max(map(len, self.words), default=0)
+        self.at_least = [0] * (longest + 1)                  # bits at relative position >= j
+        self.deletions = [0] * (self.max_edits + 1)          # prefixes of at most d characters
+        offset = 0
+        for index, (word, edits) in enumerate(zip(self.words, self.edits)):
+            self.first |= 1 << offset
+            last = offset + len(word) - 1
+            for level in range(edits + 1):
+                self.last[level] |= 1 << last
+            self.word_of_last[last] = index
+            for position, char in enumerate(word):
+                self.masks[char] = self.masks.get(char, 0) | 1 << offset + position
+                for j in range(position + 1):
+                    self.at_least[j] |= 1 << offset + position
+            for level in range(1, self.max_edits + 1):
+                self.deletions[level] |= ((1 << min(level, len(word))) - 1) << offset
+            offset += len(word)
+        self.all = (1 << offset) - 1
+
+    def matcher(self) -> "FuzzyStopWordMatcher":
+        """
+        Create a streaming matcher starting at the beginning of a new stream.
+        """
+        return FuzzyStopWordMatcher(self)
+
+    def _longest_prefix(self, bits: int) -> int:
+        """
+        Length of the longest word prefix set in bits, found by bisection over the at_least masks.
+        """
+        if not bits:
+            return 0
+        low, high = 0, len(self.at_least) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if bits & self.at_least[middle]:
+                low = middle
+            else:
+                high = middle - 1
+        return low + 1
+
+    def find_stop_words_at_position(self, text: str, start_pos: int) -> list[tuple[str, int]]:
+        """
+        Find all approximate stop word occurrences starting at the given position, shortest first.
+        Returns a list of (stop_word, end_position).
+        """
+        matches = []
+        for index, (word, edits) in enumerate(zip(self.words, self.edits)):
+            matches += [(end, index, word) for end in _ends_from(word, edits, text, start_pos)]
+        return [(word, end) for end, _, word in sorted(matches)]
+
+    def find_stop_word_at_position(self, text: str, start_pos: int) -> tuple[str, int] | None:
+        """
+        Find an approximate stop word occurrence starting at the given position, the shortest one.
+        Returns (stop_word, end_position) or None.
+        """
+        matches = self.find_stop_words_at_position(text, start_pos)
+        return matches[0] if matches else None
+
+    def find_earliest_stop_word(self, text: str) -> tuple[str, int, int] | None:
+        """
+        Find the earliest starting approximate stop word occurrence in the text.
+        Returns (stop_word, start_pos, end_pos) or None.
+        """
+        return self.matcher().feed(text)
+
+
+class FuzzyStopWordMatcher:
+    """
+    Streaming state of the FuzzyStopWordFilter: one bit vector per edit level and the last
+    max_length - 1 characters, from which the start of a match is found when one ends.
+    """
+
+    def __init__(self, filter: FuzzyStopWordFilter):
+        self.filter = filter
+        self.levels = list(filter.deletions)
+        self.offset = 0  # Number of characters fed so far
+        self.window = ""  # Last max_length - 1 characters
+
+    @property
+    def state(self) -> tuple[int, ...]:
+        return tuple(self.levels)
+
+    @property
+    def live_start(self) -> int:
+        """
+        A partial match of a prefix of length j with at most max_edits edits spans at most
+        j + max_edits characters, and no match spans more than max_length.
+        """
+        filter = self.filter
+        span = filter._longest_prefix(self.levels[-1]) + filter.max_edits
+        return self.offset - min(span, filter.max_length - 1)
+
+    def feed(self, text: str) -> tuple[str, int, int] | None:
+        """
+        Advance the automaton over the text.
+        Returns (stop_word, start_pos, end_pos) of the earliest starting approximate occurrence
+        which ends inside the text, positions are counted from the start of the stream. Otherwise None.
+        """
+        filter = self.filter
+        masks = filter.masks
+        first = filter.first
+        every = filter.all
+        last = filter.last
+        levels = self.levels
+        depth = len(levels)
+
+        position = self.offset
+        ends = None
+        for char in text:
+            position += 1
+            bits = masks.get(char, 0)
+            # Level 0: exact prefixes, shifted by one character and started anew at every word
+            previous = levels[0]
+            updated = ((previous << 1) | first) & bits
+            levels[0] = updated
+            hits = updated & last[0]
+            for level in range(1, depth):
+                old = levels[level]
+                # match | insertion of the character | substitution and deletion of a word character
+                updated = (((old << 1) | first) & bits | previous | ((previous | updated) << 1) | first) & every
+                previous = old
+                levels[level] = updated
+                hits |= updated & last[level]
+            if hits:
+                if ends is None:
+                    ends = []
+                ends.append((position, hits))
+
+        match = None
+        window = self.window + text
+        window_start = self.offset - len(self.window)
+        if ends is not None:
+            for end, hits in ends:
+                while hits:
+                    bit = hits & -hits
+                    hits ^= bit
+                    index = filter.word_of_last[bit.bit_length() - 1]
+                    word = filter.words[index]
+                    found = _best_start(word, filter.edits[index], window, end - window_start, 0)
+                    if found is not None:
+                        start = window_start + found[1]
+                        if match is None or start < match[1]:
+                            match = (word, start, end)
+
+        self.offset = position
+        keep = filter.max_length - 1
+        self.window = window[-keep:] if keep > 0 else ""
+        return match
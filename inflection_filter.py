@@ -0,0 +1,304 @@
+"""
+Inflected stop words: every stop word is expanded offline into its inflected forms (by suffix
+rules or a word list) and the forms are compiled into one literal StopWordFilter automaton,
+so "historie" also stops "historii" and "Praha" also stops "Praze".
+
+    filter = InflectedStopWordFilter(["historie", "Praha"])
+    filtered = cut_stream_stop_words(token_stream, filter)
+
+Matches report the canonical stop word. With persistent=True the expansion is cached on disk,
+keyed by the stop words, the rules and the word list, so a worker start neither re-reads the
+word list nor re-applies the rules.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from collections.abc import Iterable, Mapping, Sequence
+from itertools import product
+
+from compact_filter import default_cache_dir
+from stream_stopper import compile_stop_words
+
+# Lemma ending -> endings of its paradigm in case slots: singular nominative, genitive, dative,
+# accusative, vocative, locative, instrumental, then the same seven in plural. A slot holds one
+# ending, a tuple of alternatives or None. The longest lemma ending of a word selects its paradigm,
+# consonant alternations are spelled out (Praha -> Praze). Zero endings (genitive plural "žen") are
+# None, a short stem would match unrelated words. Words of a phrase are inflected in the same slot,
+# so adjectives agree with their noun in case ("krásném městě", not "krásného městě").
+CZECH_SUFFIXES = {
+    # Feminine nouns: žena, Praha, matka, moucha, sestra
+    "a": ("a", "y", ("ě", "e"), "u", "o", ("ě", "e"), "ou", "y", None, "ám", "y", "y", "ách", "ami"),
+    "ha": ("ha", "hy", "ze", "hu", "ho", "ze", "hou", "hy", None, "hám", "hy", "hy", "hách", "hami"),
+    "ka": ("ka", "ky", "ce", "ku", "ko", "ce", "kou", "ky", None, "kám", "ky", "ky", "kách", "kami"),
+    "cha": ("cha", "chy", "še", "chu", "cho", "še", "chou", "chy", None, "chám", "chy", "chy", "chách", "chami"),
+    "ra": ("ra", "ry", "ře", "ru", "ro", "ře", "rou", "ry", None, "rám", "ry", "ry", "rách", "rami"),
+    # Soft nouns: historie, růže
+    "ie": ("ie", "ie", "ii", "ii", "ie", "ii", "ií", "ie", "ií", "iím", "ie", "ie", "iích", "iemi"),
+    "e": ("e", "e", "i", "i", "e", "i", "í", "e", "í", "ím", "e", "e", "ích", "emi"),
+    # Neuter nouns: město, jablko
+    "o": ("o", "a", "u", "o", "o", ("ě", "u"), "em", "a", None, "ům", "a", "a", "ech", "y"),
+    "ko": ("ko", "ka", "ku", "ko", "ko", ("ku", "ce"), "kem", "ka", None, "kům", "ka", "ka", "kách", "ky"),
+    # Neuter nouns and soft adjectives: stavení, jarní
+    "í": ("í", ("í", "ího"), ("í", "ímu"), "í", "í", ("í", "ím"), "ím", "í", "ích", "ím", "í", "í", "ích", "ími"),
+    # Hard adjectives: krásný, krásná, krásné
+    "ý": ("ý", "ého", "ému", ("ého", "ý"), "ý", "ém", "ým", ("í", "é"), "ých", "ým", "é", ("í", "é"), "ých", "ými"),
+    "á": ("á", "é", "é", "ou", "á", "é", "ou", "é", "ých", "ým", "é", "é", "ých", "ými"),
+    "é": ("é", "ého", "ému", "é", "é", "ém", "ým", "á", "ých", "ým", "á", "á", "ých", "ými"),
+    # Masculine nouns ending in a consonant: hrad, pán, konec, domek
+    "": ("", ("u", "a"), ("u", "ovi"), ("", "a"), ("e", "u"), ("u", "ě", "e", "ovi"), "em",
+         ("y", "i", "ové"), "ů", "ům", "y", ("y", "i", "ové"), ("ech", "ích"), "y"),
+    "ec": ("ec", "ce", ("ci", "covi"), ("ec", "ce"), "ci", ("ci", "covi"), "cem",
+           ("ce", "ci", "cové"), "ců", "cům", "ce", ("ce", "ci", "cové"), "cích", "ci"),
+    "ek": ("ek", "ku", ("ku", "kovi"), ("ek", "ka"), "ku", ("ku", "kovi"), "kem",
+           ("ky", "kové"), "ků", "kům", "ky", ("ky", "kové"), ("cích", "kách"), "ky"),
+}
+
+# Lemma ending -> case slots of endings, see CZECH_SUFFIXES
+Paradigms = Mapping[str, Sequence[str | tuple[str, ...] | None]]
+
+# The consonant paradigm ("" lemma ending) only applies to words ending in a consonant
+_VOWELS = frozenset("aeiouyáéěíóúůý")
+
+# Format version of the cached expansions, part of the cache key
+EXPANSION_VERSION = 2
+# Upper bound of the variants of one stop word, the stop word itself included
+MAX_PHRASE_VARIANTS = 64
+
+
+def _slot_forms(word: str, rules: Paradigms, min_stem: int) -> list[tuple[str, ...] | None] | None:
+    """
+    Forms of the word in every case slot of its paradigm, None when the word is not inflected.
+    """
+    lowered = word.lower()
+    for length in range(len(word), -1, -1):
+        ending = lowered[len(word) - length:]
+        if ending not in rules or length == 0 and (not word or lowered[-1] in _VOWELS):
+            continue
+        stem = word[:len(word) - length]
+        if len(stem) < min_stem:
+            return None
+        return [None if slot is None else tuple(stem + suffix for suffix in ((slot,) if isinstance(slot, str) else slot))
+                for slot in rules[ending]]
+    return None
+
+
+def inflect(word: str, rules: Paradigms = CZECH_SUFFIXES, min_stem: int = 3) -> list[str]:
+    """
+    Inflected forms of one word by its longest matching lemma ending, the word itself first.
+    Words whose stem would be shorter than min_stem characters are not inflected.
+    """
+    forms = dict.fromkeys([word])
+    for alternatives in _slot_forms(word, rules, min_stem) or ():
+        forms.update(dict.fromkeys(alternatives or ()))
+    return list(forms)
+
+
+def inflect_phrase(phrase: str, rules: Paradigms = CZECH_SUFFIXES, min_stem: int = 3,
+                   max_variants: int = MAX_PHRASE_VARIANTS) -> list[str]:
+    """
+    Inflected forms of a phrase in agreement, the phrase itself first: all its words take the
+    same case slot, words without a paradigm keep their form. A slot which some word's paradigm
+    lacks is left out. At most max_variants forms are returned.
+    """
+    words = phrase.split(" ")
+    slots = [_slot_forms(word, rules, min_stem) for word in words]
+    forms = dict.fromkeys([phrase])
+    for slot in range(max((len(word_slots) for word_slots in slots if word_slots is not None), default=0)):
+        choices = []
+        for word, word_slots in zip(words, slots):
+            if word_slots is None:
+                choices.append((word,))
+            elif slot < len(word_slots) and word_slots[slot] is not None:
+                choices.append(word_slots[slot])
+            else:
+                break
+        else:
+            for variant in product(*choices):
+                if len(forms) >= max_variants:
+                    return list(forms)
+                forms.setdefault(" ".join(variant))
+    return list(forms)
+
+
+def load_lexicon(path: str, lemmas: Iterable[str] | None = None) -> dict[str, list[str]]:
+    """
+    Read a word list of tab separated "lemma<TAB>form" lines (further columns are ignored).
+    Returns lemma -> forms, only for the given lemmas if any, so large lexicons stay out of memory.
+    """
+    wanted = None if lemmas is None else set(lemmas)
+    lexicon = {}
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 2 or not fields[1] or wanted is not None and fields[0] not in wanted:
+                continue
+            lexicon.setdefault(fields[0], []).append(fields[1])
+    return lexicon
+
+
+def expand_stop_words(stop_words: Iterable[str], rules: Paradigms | None = CZECH_SUFFIXES,
+                      lexicon: str | Mapping[str, Iterable[str]] | None = None,
+                      max_variants: int = MAX_PHRASE_VARIANTS) -> dict[str, str]:
+    """
+    Expand the stop words into their inflected forms.
+    Returns variant -> canonical stop word. Phrases are inflected in agreement (see inflect_phrase),
+    each stop word gets at most max_variants variants, word list forms after the rule forms.
+    A variant shared by several stop words belongs to the first of them, and a stop word always
+    maps to itself. lexicon is a mapping lemma -> forms or the path of a word list (see load_lexicon).
+    """
+    stop_words = [word for word in stop_words if word]
+    if isinstance(lexicon, str):
+        lexicon = load_lexicon(lexicon, stop_words)
+    canonical = dict.fromkeys(stop_words)
+    for word in canonical:
+        canonical[word] = word
+    for word in stop_words:
+        variants = dict.fromkeys([word])
+        if rules is not None:
+            variants.update(dict.fromkeys(inflect_phrase(word, rules, max_variants=max_variants)))
+        if lexicon is not None:
+            variants.update(dict.fromkeys(lexicon.get(word, ())))
+        for variant in list(variants)[:max_variants]:
+            if variant:
+                canonical.setdefault(variant, word)
+    return canonical
+
+
+def expansion_cache_key(stop_words: Iterable[str], rules: Paradigms | None = CZECH_SUFFIXES,
+                        lexicon: str | Mapping[str, Iterable[str]] | None = None,
+                        max_variants: int = MAX_PHRASE_VARIANTS) -> str:
+    """
+    Content address of an expansion: sha256 of the stop words (in order, it decides shared variants),
+    the rules, the word list and the variant limit. A word list file is identified by its path, size and modification
+    time, so a cache hit does not read it.
+    """
+    stop_words = [word for word in stop_words if word]
+    digest = hashlib.sha256(b"expansion%d\0%d\0" % (EXPANSION_VERSION, max_variants))
+    digest.update("\0".join(stop_words).encode("utf-8"))
+    if rules is not None:
+        digest.update(json.dumps({ending: list(slots) for ending, slots in rules.items()},
+                                 sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    if isinstance(lexicon, str):
+        stat = os.stat(lexicon)
+        digest.update(f"\0{os.path.abspath(lexicon)}\0{stat.st_size}\0{stat.st_mtime_ns}".encode("utf-8"))
+    elif lexicon is not None:
+        forms = {word: list(lexicon.get(word, ())) for word in stop_words}
+        digest.update(json.dumps(forms, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_expansion_cached(stop_words: Iterable[str], rules: Paradigms | None = CZECH_SUFFIXES,
+                          lexicon: str | Mapping[str, Iterable[str]] | None = None,
+                          cache_dir: str | None = None, max_variants: int = MAX_PHRASE_VARIANTS) -> dict[str, str]:
+    """
+    expand_stop_words through a content addressed cache directory (default_cache_dir by default).
+    An unreadable or damaged entry is expanded again; entries are written to a temporary file
+    and renamed, so concurrent workers never see a partial file.
+    """
+    stop_words = list(stop_words)
+    cache_dir = cache_dir or default_cache_dir()
+    path = os.path.join(cache_dir, expansion_cache_key(stop_words, rules, lexicon, max_variants) + ".json")
+    try:
+        with open(path, encoding="utf-8") as file:
+            cached = json.load(file)
+        if cached.get("version") == EXPANSION_VERSION and isinstance(cached.get("variants"), dict):
+            return cached["variants"]
+    except (OSError, ValueError):
+        pass
+
+    canonical = expand_stop_words(stop_words, rules, lexicon, max_variants)
+    os.makedirs(cache_dir, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+            json.dump({"version": EXPANSION_VERSION, "variants": canonical}, file, ensure_ascii=False)
+        os.replace(temporary, path)
+    except OSError:
+        os.unlink(temporary)
+        raise
+    return canonical
+
+
+class InflectedStopWordFilter:
+    """
+    Stop words matched in all their inflected forms, a drop-in replacement for StopWordFilter.
+    The forms are compiled through compile_stop_words into one literal automaton (normalization
+    options included), matching runs at its speed; the matcher only renames the reported word
+    to its canonical stop word. Each stop word gets at most max_variants variants.
+    With persistent the expansion is read from and written to cache_dir (default_cache_dir()
+    when None) during construction; by default nothing is written to disk.
+    """
+
+    def __init__(self, stop_words: Iterable[str], rules: Paradigms | None = CZECH_SUFFIXES,
+                 lexicon: str | Mapping[str, Iterable[str]] | None = None, casefold: bool = False,
+                 strip_diacritics: bool = False, persistent: bool = False, cache_dir: str | None = None,
+                 max_variants: int = MAX_PHRASE_VARIANTS):
+        self.stop_words = tuple(stop_words)
+        if persistent:
+            self.canonical = load_expansion_cached(self.stop_words, rules, lexicon, cache_dir, max_variants)
+        else:
+            self.canonical = expand_stop_words(self.stop_words, rules, lexicon, max_variants)
+        self.filter = compile_stop_words(self.canonical, casefold, strip_diacritics)
+        self.max_length = self.filter.max_length
+
+    @property
+    def variants(self) -> tuple[str, ...]:
+        return tuple(self.canonical)
+
+    def matcher(self) -> "InflectedStopWordMatcher":
+        """
+        Create a streaming matcher starting at the beginning of a new stream.
+        """
+        return InflectedStopWordMatcher(self.filter.matcher(), self.canonical)
+
+    def find_stop_word_at_position(self, text: str, start_pos: int) -> tuple[str, int] | None:
+        """
+        Find an inflected stop word starting at the given position, the shortest one.
+        Returns (canonical_stop_word, end_position) or None.
+        """
+        match = self.filter.find_stop_word_at_position(text, start_pos)
+        return match and (self.canonical.get(match[0], match[0]), match[1])
+
+    def find_stop_words_at_position(self, text: str, start_pos: int) -> list[tuple[str, int]]:
+        """
+        Find all inflected stop words starting at the given position, shortest first.
+        Returns a list of (canonical_stop_word, end_position).
+        """
+        return [(self.canonical.get(word, word), end) for word, end in self.filter.find_stop_words_at_position(text, start_pos)]
+
+    def find_earliest_stop_word(self, text: str) -> tuple[str, int, int] | None:
+        """
+        Find the earliest starting inflected stop word in the text.
+        Returns (canonical_stop_word, start_pos, end_pos) or None.
+        """
+        return self.matcher().feed(text)
+
+
+class InflectedStopWordMatcher:
+    """
+    Matcher of the compiled forms, reporting the canonical stop word of the matched form.
+    """
+
+    def __init__(self, matcher, canonical: Mapping[str, str]):
+        self.matcher = matcher
+        self.canonical = canonical
+
+    @property
+    def state(self):
+        return self.matcher.state
+
+    @property
+    def offset(self) -> int:
+        return self.matcher.offset
+
+    @property
+    def live_start(self) -> int:
+        return self.matcher.live_start
+
+    def feed(self, text: str) -> tuple[str, int, int] | None:
+        match = self.matcher.feed(text)
+        if match is None:
+            return None
+        word, start, end = match
+        return self.canonical.get(word, word), start, end
@@ -1,10 +1,57 @@
 import os
 
 
-from test_playground.tests import test_enhanced_algorithm, benchmark_algorithm
+from test_playground.tests import (
+    test_enhanced_algorithm,
+    test_reference_equivalence,
+    test_compiled_filter_cache,
+    test_async_algorithm,
+    test_stop_event_and_cancellation,
+    test_mock_streaming_latency,
+    test_sse_parser,
+    test_batch_filtering,
+    test_parallel_filtering,
+    test_filter_metrics,
+    test_minimal_hold_back,
+    test_normalized_matching,
+    test_pattern_filter,
+    test_token_id_filter,
+    test_stop_list_registry,
+    test_redaction,
+    test_import_time,
+    test_filter_disk_cache,
+    test_fan_out,
+    test_fuzzy_matching,
+    test_inflected_stop_words,
+    test_output_coalescing,
+    test_load_harness,
+    benchmark_algorithm,
+)
 
 if __name__ == "__main__":
     test_enhanced_algorithm()
+    test_reference_equivalence()
+    test_compiled_filter_cache()
+    test_async_algorithm()
+    test_stop_event_and_cancellation()
+    test_mock_streaming_latency()
+    test_sse_parser()
+    test_batch_filtering()
+    test_parallel_filtering()
+    test_filter_metrics()
+    test_minimal_hold_back()
+    test_normalized_matching()
+    test_pattern_filter()
+    test_token_id_filter()
+    test_stop_list_registry()
+    test_redaction()
+    test_import_time()
+    test_filter_disk_cache()
+    test_fan_out()
+    test_fuzzy_matching()
+    test_inflected_stop_words()
+    test_output_coalescing()
+    test_load_harness()
     print("\n" + "=" * 50 + "\n")
     benchmark_algorithm()
 
@@ -0,0 +1,141 @@
+"""
+Parallel offline filtering of recorded stream corpora (JSONL dumps of model outputs).
+
+    python parallel_filter.py outputs.jsonl --field tokens --stop-word HOTOVO! --workers 8 > cuts.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from collections.abc import Generator, Iterable
+from concurrent.futures import ProcessPoolExecutor
+
+from batch_filter import filter_batch
+from compact_filter import CompactStopWordFilter
+from stream_stopper import StopWordFilter, compile_stop_words
+
+# Filter of the worker process, set once per worker and never sent with the tasks
+_worker_filter = None
+_worker_field = None
+
+
+def _init_worker(filter, field: str):
+    """
+    Worker initializer, the filter is an initializer argument of its own pool. With fork the
+    arguments are inherited without pickling, a path loads a saved CompactStopWordFilter
+    through mmap, so all workers share its pages.
+    """
+    global _worker_filter, _worker_field
+    if isinstance(filter, str):
+        filter = CompactStopWordFilter.load(filter)
+    _worker_filter = filter
+    _worker_field = field
+
+
+def _record_tokens(record: dict, field: str) -> list[str]:
+    """
+    Tokens at a dotted field path, a string value is one token.
+    """
+    value = record
+    for key in field.split("."):
+        value = value[key]
+    return [value] if isinstance(value, str) else value
+
+
+def _filter_lines(lines: list[str]) -> list[tuple[int | None, str | None, int]]:
+    streams = [_record_tokens(json.loads(line), _worker_field) for line in lines]
+    return [(result.cut, result.stop_word, sum(len(token) for token in tokens))
+            for result, tokens in zip(filter_batch(streams, _worker_filter), streams)]
+
+
+def _read_batches(path: str, batch_size: int) -> Generator[list[str], None, None]:
+    batch = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                batch.append(line)
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+def filter_corpus(path: str, stop_words: Iterable[str] | StopWordFilter | None = None, field: str = "tokens",
+                  workers: int | None = None, batch_size: int = 1000, compact_path: str | None = None,
+                  stats: dict | None = None) -> Generator[dict, None, None]:
+    """
+    Filter every record of a JSONL corpus on a process pool and yield
+    {"record", "cut", "stop_word"} in the order of the file.
+    The compiled filter reaches every worker once through the pool initializer (inherited with
+    fork, pickled once per worker otherwise), the tasks only carry raw lines. Concurrent calls
+    use their own pools and filters. compact_path of a saved CompactStopWordFilter
+    replaces stop_words and shares one memory mapped automaton between the workers.
+    When stats is given, it is filled with records, characters and seconds, also when the
+    generator is closed before the end.
+    """
+    workers = workers or os.cpu_count() or 1
+    filter = compact_path or compile_stop_words(stop_words)
+
+    start = time.perf_counter()
+    records = characters = 0
+
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(filter, field)) as executor:
+            # Bounded number of batches in flight, results are yielded in order
+            pending = deque()
+            batches = _read_batches(path, batch_size)
+            for batch in batches:
+                pending.append(executor.submit(_filter_lines, batch))
+                if len(pending) >= 2 * workers:
+                    break
+
+            while pending:
+                results = pending.popleft().result()
+                batch = next(batches, None)
+                if batch is not None:
+                    pending.append(executor.submit(_filter_lines, batch))
+
+                for cut, stop_word, length in results:
+                    records += 1
+                    characters += length
+                    yield {"record": records - 1, "cut": cut, "stop_word": stop_word}
+    finally:
+        # Also reached when the consumer closes the generator early
+        if stats is not None:
+            stats.update(records=records, characters=characters, seconds=time.perf_counter() - start)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Audit where stop words fire in a JSONL corpus of recorded streams.")
+    parser.add_argument("corpus", help="JSONL file, one recorded stream per line")
+    parser.add_argument("--field", default="tokens", help="dotted path to the token list (or text) of a record")
+    parser.add_argument("--stop-word", action="append", default=[], help="stop word, can be repeated")
+    parser.add_argument("--stop-words-file", help="file with one stop word per line")
+    parser.add_argument("--compact", help="saved CompactStopWordFilter, memory mapped by the workers")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    stop_words = list(args.stop_word)
+    if args.stop_words_file:
+        with open(args.stop_words_file, encoding="utf-8") as file:
+            stop_words += [line.rstrip("\n") for line in file if line.strip()]
+    if not stop_words and not args.compact:
+        parser.error("no stop words given")
+
+    stats = {}
+    for result in filter_corpus(args.corpus, stop_words, args.field, args.workers,
+                                args.batch_size, args.compact, stats):
+        sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    seconds = stats["seconds"]
+    print(f"{stats['records']} records, {stats['characters']} characters in {seconds:.2f}s: "
+          f"{stats['records'] / seconds:,.0f} records/s, {stats['characters'] / seconds:,.0f} chars/s",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
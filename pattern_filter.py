@@ -0,0 +1,511 @@
+import threading
+from collections.abc import Iterable
+
+# Hold-back of patterns with * / + / {m,}, longer matches are only cut within this many characters
+UNBOUNDED_LIMIT = 256
+# DFA states cached per filter before the cache is flushed and built again
+STATE_LIMIT = 10000
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "f": "\f", "v": "\v", "0": "\0"}
+_CATEGORIES = {
+    "d": str.isdigit,
+    "w": lambda char: char.isalnum() or char == "_",
+    "s": str.isspace,
+}
+
+# NFA state kinds
+_CHAR, _SPLIT, _ACCEPT = 0, 1, 2
+
+
+class CharClass:
+    """
+    Set of characters matched by one regex atom: literals, ranges and \\d \\w \\s categories,
+    optionally negated.
+    """
+
+    def __init__(self, chars: Iterable[str] = (), ranges: Iterable[tuple[str, str]] = (),
+                 categories: Iterable[tuple[str, bool]] = (), negated: bool = False):
+        self.chars = frozenset(chars)
+        self.ranges = tuple(ranges)
+        self.categories = tuple(categories)  # (category, negated)
+        self.negated = negated
+
+    def __contains__(self, char: str) -> bool:
+        found = (char in self.chars
+                 or any(low <= char <= high for low, high in self.ranges)
+                 or any(_CATEGORIES[category](char) != negated for category, negated in self.categories))
+        return found != self.negated
+
+
+_ANY = CharClass(negated=True)
+
+
+class _PatternParser:
+    """
+    Recursive descent parser of the supported regex subset into a small AST:
+    ("char", CharClass), ("cat", [nodes]), ("alt", [nodes]), ("repeat", node, min, max or None).
+    """
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.position = 0
+
+    def error(self, message: str) -> ValueError:
+        return ValueError(f"{message} at position {self.position} of pattern {self.pattern!r}")
+
+    def peek(self) -> str | None:
+        return self.pattern[self.position] if self.position < len(self.pattern) else None
+
+    def take(self) -> str:
+        char = self.peek()
+        if char is None:
+            raise self.error("unexpected end")
+        self.position += 1
+        return char
+
+    def parse(self):
+        node = self.parse_alternation()
+        if self.peek() is not None:
+            raise self.error(f"unexpected {self.peek()!r}")
+        return node
+
+    def parse_alternation(self):
+        branches = [self.parse_concatenation()]
+        while self.peek() == "|":
+            self.take()
+            branches.append(self.parse_concatenation())
+        return branches[0] if len(branches) == 1 else ("alt", branches)
+
+    def parse_concatenation(self):
+        items = []
+        while self.peek() not in (None, "|", ")"):
+            items.append(self.parse_repeat())
+        return items[0] if len(items) == 1 else ("cat", items)
+
+    def parse_repeat(self):
+        node = self.parse_atom()
+        while self.peek() in ("*", "+", "?", "{"):
+            char = self.take()
+            if char == "*":
+                node = ("repeat", node, 0, None)
+            elif char == "+":
+                node = ("repeat", node, 1, None)
+            elif char == "?":
+                node = ("repeat", node, 0, 1)
+            else:
+                minimum, maximum = self.parse_bounds()
+                node = ("repeat", node, minimum, maximum)
+            if self.peek() == "?":
+                # Lazy quantifiers find the same matches, only the shortest one is reported anyway
+                self.take()
+        return node
+
+    def parse_bounds(self) -> tuple[int, int | None]:
+        end = self.pattern.find("}", self.position)
+        if end < 0:
+            raise self.error("unterminated {")
+        low, comma, high = self.pattern[self.position:end].partition(",")
+        try:
+            minimum = int(low)
+            maximum = (int(high) if high.strip() else None) if comma else minimum
+        except ValueError:
+            raise self.error("invalid repetition bounds") from None
+        if maximum is not None and maximum < minimum:
+            raise self.error("repetition maximum below its minimum")
+        self.position = end + 1
+        return minimum, maximum
+
+    def parse_atom(self):
+        char = self.take()
+        if char == "(":
+            if self.pattern.startswith("?:", self.position):
+                self.position += 2
+            elif self.peek() == "?":
+                raise self.error("unsupported group")
+            node = self.parse_alternation()
+            if self.take() != ")":
+                raise self.error("missing )")
+            return node
+        if char == "[":
+            return ("char", self.parse_class())
+        if char == ".":
+            return ("char", _ANY)
+        if char == "\\":
+            return ("char", self.parse_escape())
+        if char in "^$":
+            raise self.error("anchors are not supported")
+        if char in "*+?{)":
+            raise self.error(f"nothing to repeat before {char!r}")
+        return ("char", CharClass(char))
+
+    def parse_escape(self) -> CharClass:
+        char = self.take()
+        if char.lower() in _CATEGORIES:
+            return CharClass(categories=[(char.lower(), char.isupper())])
+        if char in _ESCAPES:
+            return CharClass(_ESCAPES[char])
+        if char.isalnum():
+            raise self.error(f"unsupported escape \\{char}")
+        return CharClass(char)
+
+    def parse_class(self) -> CharClass:
+        negated = self.peek() == "^"
+        if negated:
+            self.take()
+        chars, ranges, categories = [], [], []
+        first = True
+        while True:
+            char = self.take()
+            if char == "]" and not first:
+                break
+            first = False
+            if char == "\\":
+                escaped = self.parse_escape()
+                if escaped.categories:
+                    categories += escaped.categories
+                    continue
+                (char,) = escaped.chars
+            if self.peek() == "-" and self.pattern[self.position + 1:self.position + 2] not in ("]", ""):
+                self.take()
+                high = self.take()
+                if high == "\\":
+                    (high,) = self.parse_escape().chars
+                if high < char:
+                    raise self.error("invalid class range")
+                ranges.append((char, high))
+            else:
+                chars.append(char)
+        return CharClass(chars, ranges, categories, negated)
+
+
+def _max_length(node) -> int | None:
+    """
+    Longest string matched by the AST node, None when unbounded.
+    """
+    kind = node[0]
+    if kind == "char":
+        return 1
+    if kind == "cat":
+        lengths = [_max_length(item) for item in node[1]]
+        return None if None in lengths else sum(lengths)
+    if kind == "alt":
+        lengths = [_max_length(item) for item in node[1]]
+        return None if None in lengths else max(lengths)
+    _, child, _, maximum = node
+    length = _max_length(child)
+    if length == 0:
+        return 0
+    if length is None or maximum is None:
+        return None
+    return length * maximum
+
+
+class _NFA:
+    """
+    Thompson NFA of all patterns. States are (kind, char class or targets, next/pattern index).
+    """
+
+    def __init__(self):
+        self.kinds = []
+        self.classes = []  # CharClass of _CHAR states
+        self.targets = []  # next state of _CHAR, list of states of _SPLIT, pattern index of _ACCEPT
+
+    def add(self, kind: int, char_class, target) -> int:
+        self.kinds.append(kind)
+        self.classes.append(char_class)
+        self.targets.append(target)
+        return len(self.kinds) - 1
+
+    def compile(self, node, next_state: int) -> int:
+        """
+        Add the states of the AST node continuing with next_state, return its first state.
+        """
+        kind = node[0]
+        if kind == "char":
+            return self.add(_CHAR, node[1], next_state)
+        if kind == "cat":
+            for item in reversed(node[1]):
+                next_state = self.compile(item, next_state)
+            return next_state
+        if kind == "alt":
+            return self.add(_SPLIT, None, [self.compile(item, next_state) for item in node[1]])
+
+        _, child, minimum, maximum = node
+        if maximum is None:
+            loop = self.add(_SPLIT, None, [])
+            self.targets[loop] += [self.compile(child, loop), next_state]
+            next_state = loop
+        else:
+            for _ in range(maximum - minimum):
+                next_state = self.add(_SPLIT, None, [self.compile(child, next_state), next_state])
+        for _ in range(minimum):
+            next_state = self.compile(child, next_state)
+        return next_state
+
+    def closure(self, states: Iterable[int]) -> frozenset[int]:
+        """
+        _CHAR and _ACCEPT states reachable through _SPLIT states.
+        """
+        result = set()
+        seen = set()
+        stack = list(states)
+        while stack:
+            state = stack.pop()
+            if state in seen:
+                continue
+            seen.add(state)
+            if self.kinds[state] == _SPLIT:
+                stack += self.targets[state]
+            else:
+                result.add(state)
+        return frozenset(result)
+
+
+class _DFACache:
+    """
+    States and transitions built so far. A flush replaces the whole cache, a matcher still
+    holding the old one keeps a consistent view and moves to the new one on its next miss.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.sets = []
+        self.transitions = []  # character -> state of each state
+        self.accepting = []    # lowest matching pattern index of each state, or None
+
+
+class _LazyDFA:
+    """
+    Subset construction done on demand: a DFA state is created the first time the stream
+    reaches it and each transition is computed once per (state, character).
+    States of the unanchored DFA hold only the partial matches in progress, every step also
+    starts all patterns anew, so its initial state (no partial match) is also the idle state.
+    Past state_limit states the cache is flushed and built again from the states in use,
+    so adversarial text cannot grow it without bound; the dead and initial states keep their ids.
+    """
+
+    def __init__(self, nfa: _NFA, start: frozenset[int], unanchored: bool, state_limit: int = STATE_LIMIT):
+        self.nfa = nfa
+        self.start = start
+        self.unanchored = unanchored
+        self.state_limit = max(state_limit, 4)  # Dead, initial, source and target after a flush
+        self.flushes = 0
+        self.lock = threading.Lock()
+        self._flush()
+
+    def _flush(self):
+        self.cache = _DFACache()
+        self.dead = self._state(frozenset())
+        self.initial = self.dead if self.unanchored else self._state(self.start)
+
+    def _state(self, nfa_states: frozenset[int]) -> int:
+        cache = self.cache
+        state = cache.ids.get(nfa_states)
+        if state is None:
+            state = cache.ids[nfa_states] = len(cache.sets)
+            cache.sets.append(nfa_states)
+            cache.transitions.append({})
+            accepted = [self.nfa.targets[s] for s in nfa_states if self.nfa.kinds[s] == _ACCEPT]
+            cache.accepting.append(min(accepted) if accepted else None)
+        return state
+
+    def step(self, state: int, char: str, cache: _DFACache) -> tuple[int, _DFACache]:
+        """
+        Compute and cache the transition of a state of the given cache, the filter is shared so
+        new states are added under a lock. Returns the next state and the (current) cache it
+        belongs to.
+        """
+        with self.lock:
+            nfa = self.nfa
+            nfa_states = cache.sets[state]
+            sources = nfa_states | self.start if self.unanchored else nfa_states
+            targets = nfa.closure([nfa.targets[s] for s in sources if nfa.kinds[s] == _CHAR and char in nfa.classes[s]])
+            # States to add: the target, and the source when it comes from a flushed cache
+            ids = self.cache.ids
+            added = (targets not in ids) + (cache is not self.cache and nfa_states not in ids and nfa_states != targets)
+            if added and len(self.cache.sets) + added > self.state_limit:
+                self.flushes += 1
+                self._flush()
+            if cache is not self.cache:
+                state = self._state(nfa_states)
+            next_state = self._state(targets)
+            self.cache.transitions[state][char] = next_state
+            return next_state, self.cache
+
+
+class PatternFilter:
+    """
+    Streaming filter of regex stop patterns, a drop-in replacement for StopWordFilter.
+    Supported subset: literals, escapes (\\n \\t \\d \\w \\s \\D \\W \\S and escaped punctuation),
+    character classes with ranges and negation, ".", groups (...) and (?:...), alternation and the
+    quantifiers ? * + {m} {m,} {m,n}. Anchors, backreferences and lookarounds are rejected.
+    All patterns run in one lazily built DFA, so a stream is scanned once, character by character.
+    Hold-back is bounded by the longest possible match (pattern_max_lengths), unbounded patterns are
+    limited to unbounded_limit characters. Each DFA caches at most state_limit states.
+    """
+
+    def __init__(self, patterns: Iterable[str], unbounded_limit: int = UNBOUNDED_LIMIT,
+                 state_limit: int = STATE_LIMIT):
+        self.patterns = tuple(patterns)
+        self.stop_words = self.patterns
+        nfa = _NFA()
+        starts = []
+        lengths = []
+        for index, pattern in enumerate(self.patterns):
+            node = _PatternParser(pattern).parse()
+            start = nfa.compile(node, nfa.add(_ACCEPT, None, index))
+            if any(nfa.kinds[state] == _ACCEPT for state in nfa.closure([start])):
+                raise ValueError(f"pattern {pattern!r} matches the empty string")
+            starts.append(start)
+            lengths.append(_max_length(node))
+
+        self.pattern_max_lengths = tuple(lengths)
+        self.unbounded_limit = unbounded_limit
+        self.max_length = max((unbounded_limit if length is None else length for length in lengths), default=0)
+
+        start = nfa.closure(starts)
+        self.dfa = _LazyDFA(nfa, start, unanchored=True, state_limit=state_limit)
+        self.anchored_dfa = _LazyDFA(nfa, start, unanchored=False, state_limit=state_limit)
+
+    def matcher(self) -> "PatternMatcher":
+        """
+        Create a streaming matcher starting at the beginning of a new stream.
+        """
+        return PatternMatcher(self)
+
+    def match_at(self, text: str, start_pos: int, min_end: int = 0) -> tuple[str, int] | None:
+        """
+        Shortest match starting at start_pos and ending after min_end.
+        Returns (pattern, end_position) or None.
+        """
+        dfa = self.anchored_dfa
+        cache = dfa.cache
+        transitions = cache.transitions
+        state = dfa.initial
+        for i in range(start_pos, len(text)):
+            char = text[i]
+            next_state = transitions[state].get(char)
+            if next_state is None:
+                next_state, cache = dfa.step(state, char, cache)
+                transitions = cache.transitions
+            state = next_state
+            if state == dfa.dead:
+                return None
+            pattern = cache.accepting[state]
+            if pattern is not None and i + 1 > min_end:
+                return self.patterns[pattern], i + 1
+        return None
+
+    def find_stop_word_at_position(self, text: str, start_pos: int) -> tuple[str, int] | None:
+        """
+        Find a pattern match starting at the given position.
+        Returns (pattern, end_position) or None.
+        """
+        return self.match_at(text, start_pos)
+
+    def find_stop_words_at_position(self, text: str, start_pos: int) -> list[tuple[str, int]]:
+        """
+        Find all match ends of the patterns starting at the given position, shortest first.
+        Returns a list of (pattern, end_position), at each end the first listed matching pattern.
+        """
+        dfa = self.anchored_dfa
+        cache = dfa.cache
+        state = dfa.initial
+        matches = []
+        for i in range(start_pos, min(start_pos + self.max_length, len(text))):
+            char = text[i]
+            next_state = cache.transitions[state].get(char)
+            if next_state is None:
+                next_state, cache = dfa.step(state, char, cache)
+            state = next_state
+            if state == dfa.dead:
+                break
+            pattern = cache.accepting[state]
+            if pattern is not None:
+                matches.append((self.patterns[pattern], i + 1))
+        return matches
+
+    def find_earliest_stop_word(self, text: str) -> tuple[str, int, int] | None:
+        """
+        Find the earliest starting pattern match in the text.
+        Returns (pattern, start_pos, end_pos) or None.
+        """
+        return self.matcher().feed(text)
+
+
+class PatternMatcher:
+    """
+    Streaming state of the PatternFilter DFA, same interface as StopWordMatcher.
+    Besides the DFA state it keeps the offset where no partial match was alive (idle) and the
+    text since then, at most max_length - 1 characters, for the rescan which finds the start.
+    """
+
+    def __init__(self, filter: PatternFilter):
+        self.filter = filter
+        self.cache = filter.dfa.cache  # The DFA cache self.state belongs to
+        self.state = filter.dfa.initial
+        self.offset = 0  # Number of characters fed so far
+        self.idle_offset = 0
+        self.window = ""  # Text fed since live_start
+
+    @property
+    def live_start(self) -> int:
+        return max(self.idle_offset, self.offset - self.filter.max_length + 1)
+
+    def feed(self, text: str) -> tuple[str, int, int] | None:
+        """
+        Advance the DFA over the text.
+        Returns (pattern, start_pos, end_pos) of the earliest starting match which ends
+        inside the text, positions are counted from the start of the stream. Otherwise None.
+        """
+        dfa = self.filter.dfa
+        cache = self.cache
+        transitions = cache.transitions
+        accepting = cache.accepting
+        idle = dfa.initial
+
+        state = self.state
+        position = self.offset
+        idle_offset = self.idle_offset
+        matched = None
+
+        for char in text:
+            position += 1
+            next_state = transitions[state].get(char)
+            if next_state is None:
+                next_state, cache = dfa.step(state, char, cache)
+                transitions = cache.transitions
+                accepting = cache.accepting
+            state = next_state
+            if state == idle:
+                idle_offset = position
+            elif matched is None:
+                matched = accepting[state]
+
+        window_start = self.live_start
+        window = self.window + text
+        match = None
+        if matched is not None:
+            match = self._earliest_match(window, window_start, self.offset, matched)
+
+        self.cache = cache
+        self.state = state
+        self.offset = position
+        self.idle_offset = idle_offset
+        keep = position - self.live_start
+        self.window = window[len(window) - keep:] if keep else ""
+        return match
+
+    def _earliest_match(self, window: str, window_start: int, token_start: int,
+                        pattern: int) -> tuple[str, int, int]:
+        """
+        Anchored rescan of the window: the earliest start with a match ending inside the token.
+        """
+        min_end = token_start - window_start
+        for start in range(len(window)):
+            found = self.filter.match_at(window, start, min_end)
+            if found:
+                word, end = found
+                return word, window_start + start, window_start + end
+        # A longer match of an unbounded pattern, cut as early as the window reaches
+        return self.filter.patterns[pattern], window_start, window_start + len(window)
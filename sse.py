@@ -0,0 +1,70 @@
+"""
+Incremental parsing of chat-completions server-sent events, without network dependencies:
+an SSE parser working on raw byte buffers and a fast path extracting only
+choices[0].delta.content from each chunk.
+"""
+import json
+import re
+
+DONE = b"[DONE]"
+
+# Content of the first delta object, only when no nested object precedes it inside the delta
+_DELTA_CONTENT = re.compile(rb'"delta"\s*:\s*\{[^{}]*?"content"\s*:\s*("(?:[^"\\]|\\.)*"|null)')
+
+
+class SSEParser:
+    """
+    Incremental parser of server-sent events over raw byte chunks.
+    Chunks may split lines, events and multi-byte characters anywhere.
+    Lines end with LF or CRLF, comments and fields other than data are ignored.
+    """
+
+    def __init__(self):
+        self._tail = b""   # Incomplete last line
+        self._data = []    # Data lines of the current event
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        """
+        Parse the next chunk and return the data of every event it completes.
+        """
+        lines = (self._tail + chunk).split(b"\n")
+        self._tail = lines.pop()
+        events = []
+
+        for line in lines:
+            if line.endswith(b"\r"):
+                line = line[:-1]
+            if not line:
+                # Blank line dispatches the event
+                if self._data:
+                    events.append(b"\n".join(self._data))
+                    self._data = []
+            elif line.startswith(b"data:"):
+                # Remove the "data:" prefix and a single optional space, not a set of characters
+                value = line[5:]
+                if value.startswith(b" "):
+                    value = value[1:]
+                self._data.append(value)
+
+        return events
+
+
+def extract_content(data: bytes) -> str | None:
+    """
+    Fast path for choices[0].delta.content of a chunk without building the full dict.
+    Falls back to json.loads when the chunk does not have the usual shape.
+    """
+    position = data.find(b'"delta"')
+    match = _DELTA_CONTENT.match(data, position) if position >= 0 else None
+    if match is None:
+        try:
+            return json.loads(data)["choices"][0]["delta"].get("content")
+        except (KeyError, IndexError, TypeError, AttributeError, ValueError):
+            return None
+
+    literal = match.group(1)
+    if literal == b"null":
+        return None
+    if b"\\" not in literal:
+        return literal[1:-1].decode("utf-8")
+    return json.loads(literal)
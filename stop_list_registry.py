@@ -0,0 +1,445 @@
+"""
+Many named stop lists in one shared automaton, changed at runtime without rebuilding it.
+
+    registry = StopListRegistry()
+    registry.add("customer-a", ["HOTOVO!", "stopni"])
+    registry.add("customer-b", ["HOTOVO!", "Praha"])
+    filtered = cut_stream_stop_words(token_stream, registry.view("customer-a"))
+    registry.remove("customer-a", ["stopni"])  # running streams keep their snapshot
+"""
+import threading
+from collections.abc import Iterable
+
+
+class _Node:
+    """
+    Immutable trie node. mask has bit i set when the node ends a word of the list with bit i,
+    subtree has the bits of all lists with a word through the node.
+    Published nodes are never modified: an update copies the path from the root to the changed node,
+    all other nodes are shared between the versions.
+    """
+    __slots__ = ("children", "mask", "subtree", "depth", "word")
+
+    def __init__(self, children: dict, mask: int, depth: int, word: str | None, subtree: int | None = None):
+        self.children = children
+        self.mask = mask
+        self.depth = depth
+        self.word = word  # Set on nodes ending a word of some list
+        if subtree is None:
+            subtree = mask
+            for child in children.values():
+                subtree |= child.subtree
+        self.subtree = subtree
+
+
+def _update_path(root: _Node, word: str, bit: int, add: bool, fresh: set | None = None) -> _Node | None:
+    """
+    New root with the list bit set (add) or cleared on the node spelling the word,
+    None when nothing changed. Nodes without children and lists are pruned.
+    Nodes in fresh were created by the same batch and are not published yet, they are updated
+    in place instead of copied; the nodes created by an insert are added to it.
+    """
+    path = [root]
+    node = root
+    for char in word:
+        node = node.children.get(char) if node is not None else None
+        path.append(node)
+
+    old = path[-1]
+    mask = old.mask if old is not None else 0
+    mask = mask | bit if add else mask & ~bit
+    if old is not None and mask == old.mask or old is None and not mask:
+        return None
+    if fresh is not None and old in fresh:
+        # Its fresh ancestors already carry the bit in their subtree
+        old.mask = mask
+        old.subtree |= bit
+        old.word = word
+        return root
+    # A published node is shared with older snapshots, its children are copied, never reused
+    children = dict(old.children) if old is not None else {}
+    new = _Node(children, mask, len(word), word if mask else None) if mask or children else None
+    if fresh is not None:
+        fresh.add(new)
+
+    for depth in range(len(word) - 1, -1, -1):
+        old = path[depth]
+        if fresh is not None and old in fresh:
+            old.children[word[depth]] = new
+            old.subtree |= bit
+            return root
+        children = dict(old.children) if old is not None else {}
+        if new is None:
+            children.pop(word[depth], None)
+        else:
+            children[word[depth]] = new
+        if depth and not children and not old.mask:
+            new = None
+        elif old is None:
+            new = _Node(children, 0, depth, None, new.subtree)
+        else:
+            # An insert only adds the bit, a removal recomputes the subtree from the children
+            subtree = old.subtree | bit if add else None
+            new = _Node(children, old.mask, depth, old.word, subtree)
+        if fresh is not None:
+            fresh.add(new)
+    return new
+
+
+def _words(root: _Node, bit: int) -> tuple[str, ...]:
+    words = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.mask & bit:
+            words.append(node.word)
+        stack += node.children.values()
+    return tuple(sorted(words))
+
+
+class RegistrySnapshot:
+    """
+    Immutable version of the registry. Failure links and transitions are computed lazily the first
+    time a stream needs them and memoized in the snapshot, so they are shared by all its streams.
+    A new version starts with empty memos instead of recomputing the links of the whole trie.
+    """
+
+    def __init__(self, root: _Node, lists: dict[str, tuple[int, int]], version: int):
+        self.root = root
+        self.lists = lists  # list name -> (bit, longest word)
+        self.version = version
+        self.fail = {root: root}
+        self.transitions = {}  # node -> {char: node}
+        self.output_masks = {}  # node -> bits of the lists with a word ending at the node
+        self.views = {}
+        self.lock = threading.Lock()
+
+    def step(self, node: _Node, char: str) -> _Node:
+        """
+        Aho-Corasick transition, the failure links of entered children are computed on the way.
+        The failure chain is walked with a loop, its nodes wait on a stack for the transition
+        of their failure link, so long periodic words do not recurse.
+        """
+        root = self.root
+        transitions = self.transitions
+        fail = self.fail
+        pending = []  # (node, child or None) whose transition is the one of its failure link
+        while True:
+            edges = transitions.get(node)
+            if edges is None:
+                edges = transitions[node] = {}
+            target = edges.get(char)
+            if target is not None:
+                break
+            child = node.children.get(char)
+            if child is not None and (node is root or child in fail):
+                fail.setdefault(child, root)
+                target = edges[char] = child
+                break
+            if child is None and node is root:
+                target = edges[char] = root
+                break
+            # The failure link of a new child is the transition of the node's failure link
+            pending.append((node, child))
+            node = fail[node]
+
+        for node, child in reversed(pending):
+            if child is not None:
+                fail[child] = target
+                target = child
+            transitions[node][char] = target
+        return target
+
+    def output_mask(self, node: _Node) -> int:
+        """
+        Bits of the lists with a word ending at the node, i.e. on the node or its failure chain.
+        Lets a scan over several lists skip the nodes where none of them matches.
+        """
+        output_masks = self.output_masks
+        mask = output_masks.get(node)
+        if mask is not None:
+            return mask
+        # The failure links were set when the nodes were entered
+        chain = []
+        while True:
+            mask = output_masks.get(node)
+            if mask is not None:
+                break
+            if node is self.root:
+                mask = output_masks[node] = node.mask
+                break
+            chain.append(node)
+            node = self.fail[node]
+        for node in reversed(chain):
+            mask = output_masks[node] = node.mask | mask
+        return mask
+
+    def view(self, name: str) -> "StopListView":
+        """
+        Filter of one list in this snapshot, usable wherever a StopWordFilter is accepted.
+        """
+        view = self.views.get(name)
+        if view is None:
+            with self.lock:
+                view = self.views.get(name)
+                if view is None:
+                    bit, max_length = self.lists.get(name, (0, 0))
+                    view = self.views[name] = StopListView(self, name, bit, max_length)
+        return view
+
+
+class StopListView:
+    """
+    One named list of a RegistrySnapshot, same interface as StopWordFilter.
+    The longest word of the list ending at a node (its dictionary suffix link) is memoized per view.
+    """
+
+    def __init__(self, snapshot: RegistrySnapshot, name: str, bit: int, max_length: int):
+        self.snapshot = snapshot
+        self.name = name
+        self.bit = bit
+        self.max_length = max_length
+        self.outputs = {}  # node -> longest word of the list which is a suffix of the node, or None
+        self.live_depths = {}  # node -> length of its longest suffix which is a prefix of a word of the list
+
+    @property
+    def stop_words(self) -> tuple[str, ...]:
+        return _words(self.snapshot.root, self.bit)
+
+    def output(self, node: _Node) -> str | None:
+        outputs = self.outputs
+        if node in outputs:
+            return outputs[node]
+        # The failure links were set when the nodes were entered
+        chain = []
+        while node not in outputs:
+            if node.mask & self.bit:
+                word = outputs[node] = node.word
+                break
+            if node is self.snapshot.root:
+                word = outputs[node] = None
+                break
+            chain.append(node)
+            node = self.snapshot.fail[node]
+        else:
+            word = outputs[node]
+        for node in chain:
+            outputs[node] = word
+        return word
+
+    def live_depth(self, node: _Node) -> int:
+        live_depths = self.live_depths
+        depth = live_depths.get(node)
+        if depth is not None:
+            return depth
+        chain = []
+        while True:
+            depth = live_depths.get(node)
+            if depth is not None:
+                break
+            if node.subtree & self.bit:
+                depth = live_depths[node] = node.depth
+                break
+            if node is self.snapshot.root:
+                depth = live_depths[node] = 0
+                break
+            chain.append(node)
+            node = self.snapshot.fail[node]
+        for node in chain:
+            live_depths[node] = depth
+        return depth
+
+    def matcher(self) -> "StopListMatcher":
+        """
+        Create a streaming matcher starting at the beginning of a new stream.
+        """
+        return StopListMatcher(self)
+
+    def find_stop_word_at_position(self, text: str, start_pos: int) -> tuple[str, int] | None:
+        """
+        Find a stop word of the list starting at the given position.
+        Returns (stop_word, end_position) or None.
+        """
+        node = self.snapshot.root
+        for i in range(start_pos, min(start_pos + self.max_length, len(text))):
+            node = node.children.get(text[i])
+            if node is None:
+                return None
+            if node.mask & self.bit:
+                return node.word, i + 1
+        return None
+
+    def find_stop_words_at_position(self, text: str, start_pos: int) -> list[tuple[str, int]]:
+        """
+        Find all stop words of the list starting at the given position, shortest first.
+        Returns a list of (stop_word, end_position).
+        """
+        matches = []
+        node = self.snapshot.root
+        for i in range(start_pos, min(start_pos + self.max_length, len(text))):
+            node = node.children.get(text[i])
+            if node is None:
+                break
+            if node.mask & self.bit:
+                matches.append((node.word, i + 1))
+        return matches
+
+    def find_earliest_stop_word(self, text: str) -> tuple[str, int, int] | None:
+        """
+        Find the earliest occurring stop word of the list in the text.
+        Returns (stop_word, start_pos, end_pos) or None.
+        """
+        return self.matcher().feed(text)
+
+
+class StopListMatcher:
+    """
+    Streaming state of a StopListView, same interface as StopWordMatcher with a trie node as state.
+    """
+
+    def __init__(self, view: StopListView):
+        self.view = view
+        self.state = view.snapshot.root
+        self.offset = 0  # Number of characters fed so far
+
+    @property
+    def live_start(self) -> int:
+        # The shared trie also holds the words of other lists, only prefixes of this list are live
+        return self.offset - self.view.live_depth(self.state)
+
+    def feed(self, text: str) -> tuple[str, int, int] | None:
+        """
+        Advance the automaton over the text.
+        Returns (stop_word, start_pos, end_pos) of the earliest starting stop word which ends
+        inside the text, positions are counted from the start of the stream. Otherwise None.
+        """
+        snapshot = self.view.snapshot
+        transitions = snapshot.transitions
+        outputs = self.view.outputs
+
+        state = self.state
+        position = self.offset
+        match = None
+
+        for char in text:
+            position += 1
+            edges = transitions.get(state)
+            next_state = edges.get(char) if edges is not None else None
+            state = next_state if next_state is not None else snapshot.step(state, char)
+
+            word = outputs[state] if state in outputs else self.view.output(state)
+            if word is not None:
+                start = position - len(word)
+                if match is None or start < match[1]:
+                    match = (word, start, position)
+
+        self.state = state
+        self.offset = position
+        return match
+
+
+class StopListRegistry:
+    """
+    Named stop lists sharing one persistent trie, every terminal node is tagged with a bitmask of
+    its lists. Adding or removing a word copies only the path of the word (O(word length) nodes),
+    failure links are recomputed lazily per snapshot. Streams hold a RegistrySnapshot (through its
+    views) and are not affected by later updates.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.root = _Node({}, 0, 0, None)
+        self.bits = {}          # list name -> bit
+        self.lengths = {}       # list name -> {word length: number of words}
+        self.free_bits = []
+        self.next_bit = 1
+        self.version = 0
+        self._snapshot = None
+
+    def _bit(self, name: str) -> int:
+        bit = self.bits.get(name)
+        if bit is None:
+            if self.free_bits:
+                bit = self.free_bits.pop()
+            else:
+                bit = self.next_bit
+                self.next_bit <<= 1
+            self.bits[name] = bit
+            self.lengths[name] = {}
+        return bit
+
+    def _changed(self):
+        self.version += 1
+        self._snapshot = None
+
+    def add(self, name: str, words: Iterable[str]):
+        """
+        Add words to the named list, the list is created when missing.
+        """
+        with self.lock:
+            bit = self._bit(name)
+            lengths = self.lengths[name]
+            fresh = set()  # Paths copied by this call are shared by its following words
+            for word in words:
+                if not word:
+                    continue
+                root = _update_path(self.root, word, bit, True, fresh)
+                if root is not None:
+                    self.root = root
+                    lengths[len(word)] = lengths.get(len(word), 0) + 1
+            self._changed()
+
+    def remove(self, name: str, words: Iterable[str]):
+        """
+        Remove words from the named list, missing words are ignored.
+        """
+        with self.lock:
+            bit = self.bits.get(name)
+            if bit is None:
+                return
+            lengths = self.lengths[name]
+            for word in words:
+                if not word:
+                    continue
+                root = _update_path(self.root, word, bit, False)
+                if root is not None:
+                    self.root = root
+                    lengths[len(word)] -= 1
+                    if not lengths[len(word)]:
+                        del lengths[len(word)]
+            self._changed()
+
+    def drop(self, name: str):
+        """
+        Remove the named list and all its words.
+        """
+        with self.lock:
+            bit = self.bits.get(name)
+            if bit is None:
+                return
+            for word in _words(self.root, bit):
+                self.root = _update_path(self.root, word, bit, False)
+            del self.bits[name]
+            del self.lengths[name]
+            self.free_bits.append(bit)
+            self._changed()
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        return tuple(self.bits)
+
+    def snapshot(self) -> RegistrySnapshot:
+        """
+        Current immutable version, shared until the next update.
+        """
+        with self.lock:
+            if self._snapshot is None:
+                lists = {name: (bit, max(self.lengths[name], default=0)) for name, bit in self.bits.items()}
+                self._snapshot = RegistrySnapshot(self.root, lists, self.version)
+            return self._snapshot
+
+    def view(self, name: str) -> StopListView:
+        """
+        Filter of the named list in the current snapshot.
+        """
+        return self.snapshot().view(name)
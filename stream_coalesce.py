@@ -0,0 +1,157 @@
+"""
+Coalescing of the filtered output into frames, so a downstream writer (e.g. an SSE response)
+pays its per-write cost once per frame instead of once per token.
+
+    for frame in coalesce_stream(cut_stream_stop_words(token_stream, stop_words), max_chars=256, max_delay=0.02):
+        response.write(frame)
+"""
+import asyncio
+import time
+from collections import namedtuple
+from collections.abc import AsyncGenerator, AsyncIterable, Generator, Iterable
+
+# Default limits: characters per frame and seconds the first piece of a frame may wait
+MAX_CHARS = 256
+MAX_DELAY = 0.02
+
+
+class Frame(namedtuple("Frame", ("text", "tokens"))):
+    """
+    Coalesced text and the pieces it was merged from, yielded with keep_tokens.
+    """
+    __slots__ = ()
+
+
+def _frame(pieces: list[str], keep_tokens: bool) -> str | Frame:
+    text = pieces[0] if len(pieces) == 1 else "".join(pieces)
+    return Frame(text, tuple(pieces)) if keep_tokens else text
+
+
+def coalesce_stream(text_stream: Iterable[str],
+                    max_chars: int = MAX_CHARS,
+                    max_delay: float | None = MAX_DELAY,
+                    keep_tokens: bool = False) -> Generator[str | Frame, None, None]:
+    """
+    Merge the pieces of a text stream (e.g. the output of cut_stream_stop_words) into frames.
+    A frame is flushed when it reaches max_chars, when its first piece has waited max_delay seconds
+    (None: no deadline) and at the end of the stream, which is also where a stopped filter ends.
+    Pieces are never split, a frame exceeds max_chars by less than one piece.
+    The deadline is checked when a piece arrives, so a frame may wait longer while the upstream
+    stalls; acoalesce_stream flushes on the deadline itself.
+    With keep_tokens Frame(text, tokens) is yielded, keeping the original token boundaries.
+    Closing the generator closes the upstream.
+    """
+    iterator = iter(text_stream)
+    clock = time.monotonic
+    pieces = []
+    size = 0
+    deadline = 0.0
+    try:
+        for piece in iterator:
+            if not piece:
+                continue
+            if not pieces and max_delay is not None:
+                deadline = clock() + max_delay
+            pieces.append(piece)
+            size += len(piece)
+            if size >= max_chars or max_delay is not None and clock() >= deadline:
+                yield _frame(pieces, keep_tokens)
+                pieces = []
+                size = 0
+        if pieces:
+            yield _frame(pieces, keep_tokens)
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
+async def acoalesce_stream(text_stream: AsyncIterable[str],
+                           max_chars: int = MAX_CHARS,
+                           max_delay: float | None = MAX_DELAY,
+                           keep_tokens: bool = False) -> AsyncGenerator[str | Frame, None]:
+    """
+    Asyncio variant of coalesce_stream, a frame is flushed on its deadline even while the upstream
+    is still waiting for the next piece. The upstream is read by one task per stream, which pauses
+    while a full frame waits for the consumer; the per-piece cost stays a list append.
+    """
+    iterator = aiter(text_stream)
+    if max_delay is None:
+        pieces = []
+        size = 0
+        async for piece in iterator:
+            if piece:
+                pieces.append(piece)
+                size += len(piece)
+                if size >= max_chars:
+                    yield _frame(pieces, keep_tokens)
+                    pieces = []
+                    size = 0
+        if pieces:
+            yield _frame(pieces, keep_tokens)
+        return
+
+    loop = asyncio.get_running_loop()
+    pieces = []
+    size = 0
+    started = 0.0          # Loop time of the first piece of the frame
+    finished = False
+    wake = asyncio.Event()  # A frame was started, filled or the upstream ended
+    room = asyncio.Event()  # The full frame was taken
+    room.set()
+
+    async def produce():
+        nonlocal size, started, finished
+        try:
+            async for piece in iterator:
+                if not piece:
+                    continue
+                if not pieces:
+                    started = loop.time()
+                    wake.set()
+                pieces.append(piece)
+                size += len(piece)
+                if size >= max_chars:
+                    wake.set()
+                    room.clear()
+                    await room.wait()
+        finally:
+            finished = True
+            wake.set()
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            if not pieces:
+                if finished:
+                    break
+                wake.clear()
+                await wake.wait()
+                continue
+            if size < max_chars and not finished:
+                timeout = started + max_delay - loop.time()
+                if timeout > 0:
+                    wake.clear()
+                    try:
+                        async with asyncio.timeout(timeout):
+                            await wake.wait()
+                    except TimeoutError:
+                        pass
+                    continue
+            frame = _frame(pieces, keep_tokens)
+            pieces.clear()
+            size = 0
+            room.set()
+            yield frame
+        # Raises the error of the upstream, if any
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,251 @@
+"""
+One token stream filtered against several stop lists in a single pass.
+
+    ui, logging, safety = fan_out_stop_words(token_stream, [ui_words, logging_words, safety_words])
+    for token in ui: ...
+
+Every output behaves like cut_stream_stop_words(token_stream, its stop list).
+"""
+import threading
+from collections import deque
+from collections.abc import Callable, Generator, Iterable, Mapping, Sequence
+
+from stop_list_registry import StopListRegistry
+from stream_stopper import StopEvent
+
+# Scanned tokens are dropped from the shared log in batches, once no output needs them
+TRIM_EVERY = 32
+
+
+def _words(stop_list) -> list[str]:
+    if not hasattr(stop_list, "matcher"):
+        return list(stop_list)
+    if getattr(stop_list, "normalize", None) is not None or not hasattr(stop_list, "complete_words"):
+        raise ValueError("fan-out merges plain stop word lists, pass the words or a StopWordFilter without normalization")
+    return list(stop_list.stop_words)
+
+
+class _SharedScan:
+    """
+    The merged automaton of all lists (a StopListRegistry snapshot, terminals tagged with list bits)
+    and the log of scanned tokens shared by the outputs. Each character is scanned once.
+    The log keeps the tokens until every output has read them; per token it stores, for every list,
+    the offset up to which the text is safe. Outputs hold references to the logged strings,
+    so no text is duplicated per output.
+    """
+
+    def __init__(self, token_stream: Iterable[str], stop_lists: list[list[str]], close_upstream: bool):
+        registry = StopListRegistry()
+        for index, words in enumerate(stop_lists):
+            registry.add(str(index), words)
+        self.snapshot = registry.snapshot()
+        self.views = [self.snapshot.view(str(index)) for index in range(len(stop_lists))]
+        self.bits = [view.bit for view in self.views]
+        self.live_depths = [(view, view.live_depths) for view in self.views]
+
+        self.iterator = iter(token_stream)
+        self.close_upstream = close_upstream
+        self.state = self.snapshot.root
+        self.offset = 0
+        self.active = 0  # Bits of the lists which have not stopped
+        for bit in self.bits:
+            self.active |= bit
+        self.exhausted = False
+        self.error = None  # Exception of the source, raised in every output instead of its end
+
+        self.log = deque()  # (token, start offset, safe offset of every list) of the scanned tokens
+        self.first = 0      # Index of log[0] in the stream
+        self.trim_at = TRIM_EVERY
+        self.stops = [None] * len(stop_lists)  # (token index, StopEvent) of every stopped list
+        self.readers = [0] * len(stop_lists)   # Next token index every output reads, None when done
+        self.lock = threading.Lock()
+
+    def _scan(self) -> bool:
+        """
+        Scan the next source token, False at the end of the source.
+        An exception of the source is kept and raised again to every output reaching it,
+        an output must not take a failed stream for a finished one and flush its held-back text.
+        """
+        if self.error is not None:
+            raise self.error
+        if self.exhausted:
+            return False
+        try:
+            token = next(self.iterator)
+        except StopIteration:
+            self.exhausted = True
+            return False
+        except Exception as error:
+            self.error = error
+            self.exhausted = True
+            raise
+
+        snapshot = self.snapshot
+        transitions = snapshot.transitions
+        output_masks = snapshot.output_masks
+        active = self.active
+        state = self.state
+        position = self.offset
+        matches = None
+
+        for char in token:
+            position += 1
+            edges = transitions.get(state)
+            next_state = edges.get(char) if edges is not None else None
+            state = next_state if next_state is not None else snapshot.step(state, char)
+
+            mask = output_masks.get(state)
+            if mask is None:
+                mask = snapshot.output_mask(state)
+            if mask & active:
+                # Same rule as StopWordMatcher.feed, per list: the earliest start of the matches in the token
+                if matches is None:
+                    matches = {}
+                for index, bit in enumerate(self.bits):
+                    if mask & active & bit:
+                        word = self.views[index].output(state)
+                        start = position - len(word)
+                        if index not in matches or start < matches[index][1]:
+                            matches[index] = (word, start, position)
+
+        token_index = self.first + len(self.log)
+        if matches:
+            for index, (word, start, end) in matches.items():
+                self.stops[index] = (token_index, StopEvent(word, start, end))
+                active &= ~self.bits[index]
+        safe = [position - (depths[state] if state in depths else view.live_depth(state))
+                for view, depths in self.live_depths]
+
+        self.log.append((token, self.offset, safe))
+        self.state = state
+        self.offset = position
+        self.active = active
+        if not active:
+            # Every list has stopped, nothing after this token is needed
+            self.exhausted = True
+            self._close()
+        return True
+
+    def _close(self):
+        close = getattr(self.iterator, "close", None)
+        if self.close_upstream and close is not None:
+            close()
+
+    def _trim(self):
+        needed = [reader for reader in self.readers if reader is not None]
+        oldest = min(needed) if needed else self.first + len(self.log)
+        while self.first < oldest and self.log:
+            self.log.popleft()
+            self.first += 1
+
+    def entry(self, index: int) -> tuple[str, int, list[int]] | None:
+        """
+        Log entry of the token index, scanning the source as needed. None after the last token,
+        the exception of the source when it failed before the token.
+        """
+        while index >= self.first + len(self.log):
+            if len(self.log) >= self.trim_at:
+                self._trim()
+                self.trim_at = len(self.log) + TRIM_EVERY
+            if not self._scan():
+                return None
+        return self.log[index - self.first]
+
+    def done(self, output: int):
+        """
+        The output has finished or was closed, its text no longer has to be kept.
+        """
+        self.readers[output] = None
+        if all(reader is None for reader in self.readers) and not self.exhausted:
+            self.exhausted = True
+            self._close()
+        self._trim()
+
+
+def _output(shared: _SharedScan, output: int, key, on_stop: Callable | None,
+            split_tokens: bool) -> Generator[str, None, None]:
+    """
+    Emission of one list, same pieces as StreamCutter. Pending tokens are references to the
+    strings of the shared log, a partly emitted token is not copied: emitted marks its sent head.
+    """
+    lock = shared.lock
+    log = shared.log
+    stops = shared.stops
+    readers = shared.readers
+    pending = deque()
+    base = 0     # Stream offset of pending[0]
+    emitted = 0  # Stream offset up to which the text was emitted
+    index = 0    # Next token index to read from the log
+    try:
+        while True:
+            with lock:
+                position = index - shared.first
+                entry = log[position] if position < len(log) else shared.entry(index)
+                stop = stops[output]
+                readers[output] = index = index + 1
+
+            if entry is None:
+                # End of the stream, the rest is emitted
+                if pending:
+                    yield pending.popleft()[emitted - base:]
+                yield from pending
+                return
+
+            token, _, safe = entry
+            pending.append(token)
+            if stop is not None and stop[0] == index - 1:
+                end = stop[1].start
+            else:
+                end = safe[output]
+                if end <= emitted or base + len(pending[0]) > end and not split_tokens:
+                    continue
+                if base == emitted and len(pending) == 1 and len(token) + base <= end:
+                    # Common case: nothing was pending and the whole token is safe
+                    pending.pop()
+                    base = emitted = base + len(token)
+                    yield token
+                    continue
+                stop = None
+
+            pieces = []
+            while pending and base + len(pending[0]) <= end:
+                token = pending.popleft()
+                pieces.append(token[emitted - base:] if emitted > base else token)
+                base += len(token)
+                emitted = base
+            if emitted < end and (split_tokens or stop is not None):
+                # The safe head of the token leaves now, its tail stays pending
+                pieces.append(pending[0][emitted - base:end - base])
+                emitted = end
+            if stop is not None:
+                if on_stop is not None:
+                    on_stop(key, stop[1])
+                yield from pieces
+                return
+            yield from pieces
+    finally:
+        with lock:
+            shared.done(output)
+
+
+def fan_out_stop_words(token_stream: Iterable[str],
+                       stop_lists: Sequence[Iterable[str]] | Mapping[str, Iterable[str]],
+                       on_stop: Callable[[object, StopEvent], None] | None = None,
+                       close_upstream: bool = True,
+                       split_tokens: bool = True) -> list[Generator[str, None, None]] | dict[str, Generator[str, None, None]]:
+    """
+    Filter one token stream against several stop lists in a single pass.
+    Returns one generator per stop list (a dict for a mapping of named lists), each yielding what
+    cut_stream_stop_words(token_stream, stop_list) would. The lists are merged into one automaton
+    with terminals tagged by list, every character is scanned once and the buffered tokens are
+    shared by the outputs. on_stop is called with the list index (or name) and the StopEvent.
+    The source is read as fast as the most advanced output and closed once every list has
+    stopped or every output was closed. The outputs may be consumed from different threads.
+    """
+    keys = list(stop_lists) if isinstance(stop_lists, Mapping) else list(range(len(stop_lists)))
+    lists = [_words(stop_lists[key]) for key in keys]
+    shared = _SharedScan(token_stream, lists, close_upstream)
+    outputs = [_output(shared, output, key, on_stop, split_tokens) for output, key in enumerate(keys)]
+    if isinstance(stop_lists, Mapping):
+        return dict(zip(keys, outputs))
+    return outputs
@@ -0,0 +1,86 @@
+"""
+Optional HTTP client extras for the Hugging Face chat-completions endpoint: pooled keep-alive
+connections feeding the incremental SSE parser of sse.py. Needs requests, which the core
+modules never import.
+"""
+import json
+from collections.abc import Generator
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError as error:
+    raise ImportError("stream_http needs the requests package: pip install requests") from error
+
+from sse import DONE, SSEParser, extract_content
+
+API_URL = "https://router.huggingface.co/v1/chat/completions"
+
+
+class StreamingChatClient:
+    """
+    Chat-completions streaming client with a pooled requests.Session, so consecutive
+    requests reuse keep-alive connections instead of a new TCP+TLS handshake each time.
+    Closing a stream generator early closes its connection, the server stops generating.
+    """
+
+    def __init__(self, api_url: str = API_URL, token: str | None = None, pool_size: int = 10,
+                 fast_json: bool = True):
+        self.api_url = api_url
+        self.fast_json = fast_json
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def stream_events(self, payload: dict) -> Generator[bytes, None, None]:
+        """
+        Raw data of every SSE event until [DONE].
+        """
+        parser = SSEParser()
+        with self.session.post(self.api_url, json=payload, stream=True) as response:
+            response.raise_for_status()
+            done = False
+            # chunk_size=None hands over the raw bytes as soon as they arrive
+            for chunk in response.iter_content(chunk_size=None):
+                if done:
+                    continue  # Read the rest of the body, so the connection returns to the pool
+                for data in parser.feed(chunk):
+                    if data == DONE:
+                        done = True
+                        break
+                    yield data
+
+    def stream_chunks(self, payload: dict) -> Generator[dict, None, None]:
+        """
+        Parsed chat-completions chunks, same output as real_streaming_api.query.
+        """
+        for data in self.stream_events(payload):
+            yield json.loads(data)
+
+    def stream_tokens(self, payload: dict) -> Generator[str, None, None]:
+        """
+        Non-empty delta contents of the stream, ready for cut_stream_stop_words.
+        """
+        for data in self.stream_events(payload):
+            if self.fast_json:
+                content = extract_content(data)
+            else:
+                try:
+                    content = json.loads(data)["choices"][0]["delta"]["content"]
+                except (KeyError, IndexError, TypeError):
+                    continue
+            if content:
+                yield content
@@ -0,0 +1,287 @@
+"""
+Optional instrumentation of cut_stream_stop_words / acut_stream_stop_words.
+Pass metrics=InMemoryMetrics() (or any object with the FilterMetrics methods) to the filter,
+without it the filter runs the plain StreamCutter and pays nothing.
+
+    metrics = PrometheusMetrics()
+    server = serve_metrics(metrics, port=9108)   # GET http://127.0.0.1:9108/metrics
+    for token in cut_stream_stop_words(stream, stop_words, metrics=metrics): ...
+"""
+import bisect
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from stream_stopper import StopEvent, StreamCutter
+
+# Histogram bucket upper bounds
+SECONDS_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+CHARACTER_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+
+class FilterMetrics:
+    """
+    Sink interface of the instrumented filter, every method is a no-op here.
+    Implementations must be thread-safe when one sink is shared by concurrent streams.
+    """
+
+    def record_token(self, seconds: float, held_back: int, nodes_visited: int | None):
+        """
+        One token was processed in seconds, held_back characters are pending after it.
+        nodes_visited is None when the matcher cannot count automaton transitions.
+        """
+
+    def record_delay(self, seconds: float):
+        """
+        A token was emitted seconds after it arrived from the upstream.
+        """
+
+    def record_match(self, event: StopEvent):
+        """
+        A stop word was confirmed.
+        """
+
+    def record_stream(self):
+        """
+        A new stream started.
+        """
+
+
+class Histogram:
+    """
+    Fixed bucket histogram, counts[i] is the number of observations <= buckets[i],
+    the last count is for observations above all buckets.
+    """
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, fraction: float):
+        """
+        Upper bound of the bucket holding the given quantile, None without observations.
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class InMemoryMetrics(FilterMetrics):
+    """
+    Histograms and counters kept in memory, shared by all streams using this sink.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.token_seconds = Histogram(SECONDS_BUCKETS)
+        self.held_back_characters = Histogram(CHARACTER_BUCKETS)
+        self.emit_delay_seconds = Histogram(SECONDS_BUCKETS)
+        self.nodes_visited = Histogram(CHARACTER_BUCKETS)
+        self.matches = {}  # stop word -> count
+        self.streams = 0
+
+    def record_token(self, seconds: float, held_back: int, nodes_visited: int | None):
+        with self.lock:
+            self.token_seconds.observe(seconds)
+            self.held_back_characters.observe(held_back)
+            if nodes_visited is not None:
+                self.nodes_visited.observe(nodes_visited)
+
+    def record_delay(self, seconds: float):
+        with self.lock:
+            self.emit_delay_seconds.observe(seconds)
+
+    def record_match(self, event: StopEvent):
+        with self.lock:
+            self.matches[event.stop_word] = self.matches.get(event.stop_word, 0) + 1
+
+    def record_stream(self):
+        with self.lock:
+            self.streams += 1
+
+    def summary(self) -> dict:
+        """
+        Counts and approximate p50/p99 of every histogram, plus the match counts.
+        """
+        with self.lock:
+            histograms = {"token_seconds": self.token_seconds,
+                          "held_back_characters": self.held_back_characters,
+                          "emit_delay_seconds": self.emit_delay_seconds,
+                          "nodes_visited": self.nodes_visited}
+            result = {name: {"count": histogram.count, "sum": histogram.sum,
+                             "p50": histogram.quantile(0.5), "p99": histogram.quantile(0.99)}
+                      for name, histogram in histograms.items()}
+            result["matches"] = dict(self.matches)
+            result["streams"] = self.streams
+            return result
+
+
+class PrometheusMetrics(InMemoryMetrics):
+    """
+    InMemoryMetrics rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self, prefix: str = "stream_stopper"):
+        super().__init__()
+        self.prefix = prefix
+
+    def _histogram_lines(self, name: str, help: str, histogram: Histogram) -> list[str]:
+        metric = f"{self.prefix}_{name}"
+        lines = [f"# HELP {metric} {help}", f"# TYPE {metric} histogram"]
+        cumulative = 0
+        for bound, count in zip(self._bucket_labels(histogram), histogram.counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{metric}_sum {histogram.sum}")
+        lines.append(f"{metric}_count {histogram.count}")
+        return lines
+
+    @staticmethod
+    def _bucket_labels(histogram: Histogram) -> list[str]:
+        return [repr(float(bound)) for bound in histogram.buckets] + ["+Inf"]
+
+    def render(self) -> str:
+        with self.lock:
+            lines = []
+            lines += self._histogram_lines("token_seconds", "Filter processing time per token.", self.token_seconds)
+            lines += self._histogram_lines("held_back_characters", "Characters pending after a token.",
+                                           self.held_back_characters)
+            lines += self._histogram_lines("emit_delay_seconds", "Time from token arrival to its emission.",
+                                           self.emit_delay_seconds)
+            lines += self._histogram_lines("nodes_visited", "Automaton nodes visited per token.", self.nodes_visited)
+
+            metric = f"{self.prefix}_matches_total"
+            lines += [f"# HELP {metric} Confirmed stop word matches.", f"# TYPE {metric} counter"]
+            for stop_word, count in sorted(self.matches.items()):
+                escaped = stop_word.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+                lines.append(f'{metric}{{stop_word="{escaped}"}} {count}')
+
+            metric = f"{self.prefix}_streams_total"
+            lines += [f"# HELP {metric} Filtered streams.", f"# TYPE {metric} counter", f"{metric} {self.streams}"]
+            return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve_metrics(metrics: PrometheusMetrics, port: int = 9108, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve GET /metrics on a daemon thread, call shutdown() on the returned server to stop it.
+    Port 0 picks a free port, see server.server_address.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.metrics = metrics
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class _CountingMatcher:
+    """
+    Matcher proxy remembering how many automaton nodes the last feed visited.
+    """
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.counting = hasattr(matcher, "feed_counting")
+        self.visited = None
+
+    @property
+    def offset(self) -> int:
+        return self.matcher.offset
+
+    @property
+    def live_start(self) -> int:
+        return self.matcher.live_start
+
+    def feed(self, text: str):
+        if self.counting:
+            match, self.visited = self.matcher.feed_counting(text)
+            return match
+        return self.matcher.feed(text)
+
+
+class InstrumentedStreamCutter(StreamCutter):
+    """
+    StreamCutter reporting every token to a FilterMetrics sink.
+    Arrival times of the pending tokens are kept in a deque parallel to the pending tokens.
+    """
+
+    def __init__(self, filter, metrics: FilterMetrics, split_tokens: bool = True):
+        super().__init__(filter, split_tokens)
+        self.matcher = _CountingMatcher(self.matcher)
+        self.metrics = metrics
+        self.arrivals = deque()
+        self.split_emitted = None  # When the head of the first pending token was emitted, if split
+        metrics.record_stream()
+
+    def push(self, token: str):
+        arrived = time.perf_counter()
+        self.arrivals.append(arrived)
+        emitted_tokens = super().push(token)
+        done = time.perf_counter()
+
+        metrics = self.metrics
+        if self.stopped:
+            held_back = 0
+            metrics.record_match(self.stop_event)
+        else:
+            held_back = self.matcher.offset - self.base
+        metrics.record_token(done - arrived, held_back, self.matcher.visited)
+
+        # A token's delay is recorded once, when its last piece is emitted: a split token leaves
+        # its tail pending and keeps its arrival until the tail follows
+        arrivals = self.arrivals
+        if self.stopped:
+            # Nothing follows the cut, every token with an emitted piece is done. A split token
+            # cut before its tail was done when its head was emitted.
+            if not emitted_tokens and self.split_emitted is not None:
+                metrics.record_delay(self.split_emitted - arrivals[0])
+            for index in range(len(emitted_tokens)):
+                metrics.record_delay(done - arrivals[index])
+            arrivals.clear()
+        else:
+            completed = len(arrivals) - len(self.tokens)
+            for _ in range(completed):
+                metrics.record_delay(done - arrivals.popleft())
+            if len(emitted_tokens) > completed:
+                self.split_emitted = done  # The last piece is the head of the first pending token
+            elif completed:
+                self.split_emitted = None
+        return emitted_tokens
+
+    def flush(self) -> list[str]:
+        remaining = super().flush()
+        done = time.perf_counter()
+        for arrived in self.arrivals:
+            self.metrics.record_delay(done - arrived)
+        self.arrivals.clear()
+        return remaining
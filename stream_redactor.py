@@ -0,0 +1,242 @@
+"""
+Redaction of every stop word occurrence in a stream, instead of cutting at the first one.
+
+    for text in redact_stream(token_stream, ["heslo123", "555-1234"], mode="mask"):
+        ...  # 'Moje heslo je ********'
+"""
+import inspect
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterable, Callable, Generator, Iterable, Sequence
+
+from stream_stopper import StopEvent, StopWordFilter, compile_stop_words
+
+# Overlapping matches: the leftmost start wins, then the longest match or the first listed stop word
+LEFTMOST_LONGEST = "leftmost-longest"
+LEFTMOST_FIRST = "leftmost-first"
+POLICIES = (LEFTMOST_LONGEST, LEFTMOST_FIRST)
+
+# mask replaces every matched character by mask_char, remove drops the match,
+# report passes the text unchanged and only reports the matches
+MODES = ("mask", "remove", "report")
+
+
+class StreamRedactor:
+    """
+    Token bookkeeping for match-all filtering, the counterpart of StreamCutter.
+    Matches are reported in stream order without overlaps: a match is resolved once no live prefix
+    of the matcher starts at or before it, so no earlier or longer match is possible anymore.
+    The matcher is then restarted right after the match and the held-back rest is fed again.
+    Only the live prefix (or the unresolved match) is held back, at most max_length characters.
+    """
+
+    def __init__(self, filter, mode: str = "mask", policy: str = LEFTMOST_LONGEST, mask_char: str = "*",
+                 order: Iterable[str] | None = None):
+        if mode not in MODES:
+            raise ValueError(f"unknown mode {mode!r}, expected one of {MODES}")
+        if policy not in POLICIES:
+            raise ValueError(f"unknown policy {policy!r}, expected one of {POLICIES}")
+        self.filter = filter
+        self.mode = mode
+        self.policy = policy
+        self.mask_char = mask_char
+        # Rank of each stop word for leftmost-first, in the order the stop words were given
+        words = list(filter.stop_words if order is None else order)
+        self.priorities = {word: rank for rank, word in reversed(list(enumerate(words)))}
+
+        self.matcher = filter.matcher()
+        self.matcher_base = 0  # Stream offset where the matcher was (re)started
+        self.live_prefix = hasattr(self.matcher, "live_start")
+        self.candidate = None  # Earliest starting match (stop_word, start, end) not resolved yet
+        self.events = []       # Resolved matches not yet taken by the caller
+
+        # Pending tokens, they end at offset
+        self.tokens = deque()
+        self.base = 0  # Absolute offset of the first pending token
+        self.offset = 0
+
+    def _feed(self, text: str):
+        match = self.matcher.feed(text)
+        if match:
+            word, start, end = match
+            start += self.matcher_base
+            if self.candidate is None or start < self.candidate[1]:
+                self.candidate = (word, start, end + self.matcher_base)
+
+    def _live_start(self) -> int:
+        if self.live_prefix:
+            return self.matcher_base + self.matcher.live_start
+        return self.matcher_base + self.matcher.offset - self.filter.max_length + 1
+
+    def _take(self, end: int) -> list[str]:
+        """
+        Remove the pending text up to the absolute offset end, the last token is split at it.
+        """
+        tokens = self.tokens
+        base = self.base
+        pieces = []
+        while tokens and base + len(tokens[0]) <= end:
+            token = tokens.popleft()
+            base += len(token)
+            pieces.append(token)
+        if base < end:
+            token = tokens[0]
+            pieces.append(token[:end - base])
+            tokens[0] = token[end - base:]
+            base = end
+        self.base = base
+        return pieces
+
+    def _choose(self, candidate: tuple[str, int, int]) -> tuple[str, int, int]:
+        """
+        The match starting at the candidate start according to the policy.
+        """
+        start = candidate[1]
+        text = "".join(self.tokens)[start - self.base:]
+        matches = self.filter.find_stop_words_at_position(text, 0)
+        if not matches:
+            # E.g. a match starting inside the normalization of one character
+            return candidate
+        if self.policy == LEFTMOST_LONGEST:
+            word, end = matches[-1]
+        else:
+            # The longest end of the first listed stop word, patterns may match at several ends
+            word, end = min(reversed(matches), key=lambda match: self.priorities.get(match[0], len(self.priorities)))
+        return word, start, start + end
+
+    def _resolve(self, output: list[str], final: bool = False):
+        """
+        Resolve the candidate matches which can no longer grow or be preceded by another match.
+        """
+        while self.candidate is not None and (final or self.candidate[1] < self._live_start()):
+            word, start, end = self._choose(self.candidate)
+            output += self._take(start)
+            matched = self._take(end)
+            if self.mode == "mask":
+                output.append(self.mask_char * (end - start))
+            elif self.mode == "report":
+                output += matched
+            self.events.append(StopEvent(word, start, end))
+
+            # Matches do not overlap, the next one starts after this one
+            self.matcher = self.filter.matcher()
+            self.matcher_base = end
+            self.candidate = None
+            if self.tokens:
+                self._feed("".join(self.tokens))
+
+    def push(self, token: str) -> Sequence[str]:
+        """
+        Process the next token and return the redacted text which can be emitted.
+        Resolved matches are appended to events.
+        """
+        self.tokens.append(token)
+        self.offset += len(token)
+        self._feed(token)
+
+        output = []
+        self._resolve(output)
+        boundary = self._live_start()
+        if self.candidate is not None:
+            boundary = min(boundary, self.candidate[1])
+        if boundary > self.base:
+            output += self._take(boundary)
+
+        if self.mode == "report":
+            # The text is not changed, so nothing has to wait for the matches
+            return (token,)
+        return output
+
+    def flush(self) -> list[str]:
+        """
+        End of the stream, resolve the remaining matches and return the rest of the text.
+        """
+        output = []
+        self._resolve(output, final=True)
+        output += self._take(self.offset)
+        return [] if self.mode == "report" else output
+
+
+def _redactor(stop_words: Iterable[str] | StopWordFilter, mode: str, policy: str,
+              mask_char: str, order: Iterable[str] | None) -> StreamRedactor:
+    if hasattr(stop_words, "matcher"):
+        return StreamRedactor(stop_words, mode, policy, mask_char, order)
+    # The compiled filter keeps the words sorted, leftmost-first needs the given order
+    stop_words = list(stop_words)
+    return StreamRedactor(compile_stop_words(stop_words), mode, policy, mask_char,
+                          stop_words if order is None else order)
+
+
+def redact_stream(token_stream: Generator[str, None, None],
+                  stop_words: list[str] | StopWordFilter,
+                  mode: str = "mask",
+                  policy: str = LEFTMOST_LONGEST,
+                  mask_char: str = "*",
+                  on_match: Callable[[StopEvent], None] | None = None,
+                  order: Iterable[str] | None = None) -> Generator[str, None, None]:
+    """
+    Mask, remove or report every stop word occurrence instead of stopping at the first one.
+    Accepts the same filters as cut_stream_stop_words. Overlapping matches are resolved by policy:
+    leftmost-longest (the longest match at the earliest start) or leftmost-first (the stop word
+    listed first at the earliest start). on_match is called with a StopEvent for every match.
+    "Listed first" follows the given list of stop words, or order when given. A precompiled
+    filter only knows the sorted stop words of compile_stop_words, pass order to keep the
+    original priority.
+    """
+    redactor = _redactor(stop_words, mode, policy, mask_char, order)
+    token_iterator = iter(token_stream)
+    if not redactor.filter.max_length:
+        yield from token_iterator
+        return
+
+    for token in token_iterator:
+        emitted = redactor.push(token)
+        if redactor.events:
+            if on_match is not None:
+                for event in redactor.events:
+                    on_match(event)
+            redactor.events.clear()
+        yield from emitted
+
+    emitted = redactor.flush()
+    if on_match is not None:
+        for event in redactor.events:
+            on_match(event)
+    yield from emitted
+
+
+async def aredact_stream(token_stream: AsyncIterable[str],
+                         stop_words: list[str] | StopWordFilter,
+                         mode: str = "mask",
+                         policy: str = LEFTMOST_LONGEST,
+                         mask_char: str = "*",
+                         on_match: Callable[[StopEvent], None] | None = None,
+                         order: Iterable[str] | None = None) -> AsyncGenerator[str, None]:
+    """
+    Asyncio variant of redact_stream with identical semantics, on_match may also be a coroutine function.
+    """
+    redactor = _redactor(stop_words, mode, policy, mask_char, order)
+    token_iterator = aiter(token_stream)
+    if not redactor.filter.max_length:
+        async for token in token_iterator:
+            yield token
+        return
+
+    async def report():
+        if on_match is not None:
+            for event in redactor.events:
+                result = on_match(event)
+                if inspect.isawaitable(result):
+                    await result
+        redactor.events.clear()
+
+    async for token in token_iterator:
+        emitted = redactor.push(token)
+        if redactor.events:
+            await report()
+        for text in emitted:
+            yield text
+
+    emitted = redactor.flush()
+    await report()
+    for text in emitted:
+        yield text
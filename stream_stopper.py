@@ -1,29 +1,129 @@
-from collections import deque
-from typing import Generator
+# Only modules loaded by the interpreter at startup are imported here, the core stays cheap
+# to import (see test_import_time); inspect and unicodedata are imported where they are needed
+from collections import deque, namedtuple
+from collections.abc import AsyncGenerator, AsyncIterable, Callable, Generator, Iterable, Sequence
+from functools import lru_cache
+
+# Number of distinct stop word lists kept compiled by compile_stop_words
+COMPILE_CACHE_SIZE = 128
+
+# Shared empty result of StreamCutter.push, nothing is allocated while tokens are held back
+_NOTHING = ()
+
+# Unicode forms accepted by the filter and the decomposition applied to every character for them
+_DECOMPOSITIONS = {"NFC": "NFD", "NFD": "NFD", "NFKC": "NFKD", "NFKD": "NFKD"}
+
+
+def make_char_normalizer(casefold: bool = False, strip_diacritics: bool = False,
+                         unicode_form: str | None = None) -> Callable[[str], str] | None:
+    """
+    Per-character normalization of the stop words and the fed text, None when no option is set.
+    Composition needs the following characters, so canonical (NFC/NFD) and compatibility
+    (NFKC/NFKD) equivalence is matched by decomposing every character, and strip_diacritics
+    drops the combining marks of the decomposition. Results are memoized per character.
+    """
+    if unicode_form is not None and unicode_form not in _DECOMPOSITIONS:
+        raise ValueError(f"unknown unicode_form {unicode_form!r}, expected one of {sorted(_DECOMPOSITIONS)}")
+    if not (casefold or strip_diacritics or unicode_form):
+        return None
+    import unicodedata
+    decomposition = _DECOMPOSITIONS[unicode_form or "NFD"]
+    cache = {}
+
+    def normalize(char: str) -> str:
+        normalized = cache.get(char)
+        if normalized is None:
+            normalized = unicodedata.normalize(decomposition, char.casefold() if casefold else char)
+            if casefold:
+                # Decomposition may reveal characters with another case fold, e.g. of compatibility forms
+                normalized = unicodedata.normalize(decomposition, normalized.casefold())
+            if strip_diacritics:
+                normalized = "".join(c for c in normalized if not unicodedata.combining(c))
+            cache[char] = normalized
+        return normalized
+
+    return normalize
 
 
 class StopWordFilter:
     """
-    Efficient filter for stop word detection using n-grams.
-    Uses trie structure for fast prefix searching.
+    Efficient filter for stop word detection.
+    Compiles the stop words into an Aho-Corasick automaton (a trie with failure links),
+    so a stream can be scanned once, character by character, without rescanning the buffer.
+    The compiled filter is immutable, all per-stream state lives in StopWordMatcher,
+    so one filter can be shared by any number of concurrent streams and threads.
     """
 
-    def __init__(self, stop_words: list[str]):
-        self.stop_words = stop_words
-        self.max_length = max(len(word) for word in stop_words) if stop_words else 0
+    def __init__(self, stop_words: Iterable[str], casefold: bool = False, strip_diacritics: bool = False,
+                 unicode_form: str | None = None):
+        self.stop_words = tuple(stop_words)
+        self.complete_words = frozenset(self.stop_words)
+
+        # Optional normalization, the automaton is built over normalized words and the
+        # matcher normalizes the fed text one character at a time
+        self.normalize = make_char_normalizer(casefold, strip_diacritics, unicode_form)
+        self.original_words = {}  # normalized word -> first stop word normalized to it
+        words = self.stop_words
+        if self.normalize is not None:
+            words = []
+            for word in self.stop_words:
+                normalized = "".join(map(self.normalize, word))
+                if normalized and normalized not in self.original_words:
+                    self.original_words[normalized] = word
+                    words.append(normalized)
+        # Longest stop word in normalized characters
+        self.max_length = max(map(len, words), default=0)
 
-        # Trie structure for prefix searching
-        self.trie = {}
-        self.complete_words = set(stop_words)
+        # Automaton states, state 0 is the root of the trie
+        self.goto = [{}]      # trie edges of each state
+        self.fail = [0]       # longest proper suffix of the state which is also a trie prefix
+        self.depth = [0]      # length of the prefix spelled by the state
+        self.output = [None]  # longest stop word which is a suffix of the state's prefix
 
         # Build the trie
-        for word in stop_words:
-            current = self.trie
+        for word in words:
+            if not word:
+                continue
+            state = 0
             for char in word:
-                if char not in current:
-                    current[char] = {}
-                current = current[char]
-            current['$'] = True  # End of word marker
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.depth.append(self.depth[state] + 1)
+                    self.output.append(None)
+                state = next_state
+            self.output[state] = word  # End of word marker
+
+        # Failure links in breadth-first order, so every link points to an already finished state
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                fallback = self.goto[fallback].get(char, 0)
+                self.fail[child] = fallback
+                if self.output[child] is None:
+                    self.output[child] = self.output[fallback]
+
+        # Freeze the tables, the filter is never modified after compilation
+        self.goto = tuple(self.goto)
+        self.fail = tuple(self.fail)
+        self.depth = tuple(self.depth)
+        self.output = tuple(self.output)
+
+    def matcher(self) -> "StopWordMatcher | NormalizingMatcher":
+        """
+        Create a streaming matcher starting at the beginning of a new stream.
+        """
+        if self.normalize is not None:
+            return NormalizingMatcher(self)
+        return StopWordMatcher(self)
 
     def find_stop_word_at_position(self, text: str, start_pos: int) -> tuple[str, int] | None:
         """
@@ -32,114 +132,459 @@ class StopWordFilter:
         """
         if start_pos >= len(text):
             return None
+        if self.normalize is not None:
+            return self._find_normalized_at_position(text, start_pos)
 
-        current = self.trie
+        state = 0
         for i in range(start_pos, min(start_pos + self.max_length, len(text))):
-            char = text[i]
-            if char not in current:
+            state = self.goto[state].get(text[i])
+            if state is None:
                 return None
-            current = current[char]
-            if '$' in current:
+            word = self.output[state]
+            if word is not None and len(word) == self.depth[state]:
                 # We found a complete stop word
-                stop_word = text[start_pos:i + 1]
-                return stop_word, i + 1
+                return word, i + 1
+
+        return None
 
+    def _find_normalized_at_position(self, text: str, start_pos: int) -> tuple[str, int] | None:
+        state = 0
+        for i in range(start_pos, len(text)):
+            for char in self.normalize(text[i]):
+                state = self.goto[state].get(char)
+                if state is None:
+                    return None
+                word = self.output[state]
+                if word is not None and len(word) == self.depth[state]:
+                    return self.original_words[word], i + 1
         return None
 
+    def find_stop_words_at_position(self, text: str, start_pos: int) -> list[tuple[str, int]]:
+        """
+        Find all stop words starting at the given position, shortest first.
+        Returns a list of (stop_word, end_position), used by redaction to pick the longest match.
+        """
+        matches = []
+        state = 0
+        for i in range(start_pos, len(text)):
+            for char in self.normalize(text[i]) if self.normalize is not None else text[i]:
+                state = self.goto[state].get(char)
+                if state is None:
+                    return matches
+                word = self.output[state]
+                if word is not None and len(word) == self.depth[state]:
+                    matches.append((self.original_words.get(word, word), i + 1))
+        return matches
+
     def find_earliest_stop_word(self, text: str) -> tuple[str, int, int] | None:
         """
         Find the earliest occurring stop word in the text.
         Returns (stop_word, start_pos, end_pos) or None.
         """
-        earliest_pos = len(text)
-        earliest_word = None
-        earliest_end = None
+        return self.matcher().feed(text)
 
-        for i in range(len(text)):
-            result = self.find_stop_word_at_position(text, i)
-            if result and i < earliest_pos:
-                earliest_pos = i
-                earliest_word = result[0]
-                earliest_end = result[1]
 
-        return (earliest_word, earliest_pos, earliest_end) if earliest_word else None
+class StopWordMatcher:
+    """
+    Streaming state of the StopWordFilter automaton.
+    The state is kept between tokens, so each token only advances it over its own characters.
+    """
 
+    def __init__(self, filter: StopWordFilter):
+        self.filter = filter
+        self.state = 0
+        self.offset = 0  # Number of characters fed so far
 
-def cut_stream_stop_words(token_stream: Generator[str, None, None],
-                          stop_words: list[str]) -> Generator[str, None, None]:
+    @property
+    def live_start(self) -> int:
+        """
+        Stream offset of the longest fed suffix which is still a prefix of some stop word.
+        No stop word can start before it, so everything before is safe to emit.
+        """
+        return self.offset - self.filter.depth[self.state]
+
+    def feed(self, text: str) -> tuple[str, int, int] | None:
+        """
+        Advance the automaton over the text.
+        Returns (stop_word, start_pos, end_pos) of the earliest starting stop word which ends
+        inside the text, positions are counted from the start of the stream. Otherwise None.
+        """
+        goto = self.filter.goto
+        fail = self.filter.fail
+        output = self.filter.output
+
+        state = self.state
+        position = self.offset
+        match = None
+
+        for char in text:
+            position += 1
+            while (next_state := goto[state].get(char)) is None and state:
+                state = fail[state]
+            state = next_state or 0
+
+            word = output[state]
+            if word is not None:
+                start = position - len(word)
+                # The longest stop word ending here starts first, so only it can be the earliest
+                if match is None or start < match[1]:
+                    match = (word, start, position)
+
+        self.state = state
+        self.offset = position
+        return match
+
+    def feed_counting(self, text: str) -> tuple[tuple[str, int, int] | None, int]:
+        """
+        Same as feed, also returns the number of automaton nodes visited (goto and failure
+        transitions). Used by the instrumented cutter only, feed stays free of counting.
+        """
+        goto = self.filter.goto
+        fail = self.filter.fail
+        output = self.filter.output
+
+        state = self.state
+        position = self.offset
+        match = None
+        visited = 0
+
+        for char in text:
+            position += 1
+            visited += 1
+            while (next_state := goto[state].get(char)) is None and state:
+                state = fail[state]
+                visited += 1
+            state = next_state or 0
+
+            word = output[state]
+            if word is not None:
+                start = position - len(word)
+                if match is None or start < match[1]:
+                    match = (word, start, position)
+
+        self.state = state
+        self.offset = position
+        return match, visited
+
+
+class NormalizingMatcher:
     """
-    Optimized function using n-gram filter for fast stop word detection.
+    Streaming state of a normalizing StopWordFilter.
+    Every fed character is normalized on its own and the automaton runs over the normalized text.
+    The original offset of each recent normalized character is kept in a ring (deque) of
+    max_length entries, enough to map matches and the live prefix back to the original stream.
     """
-    if not stop_words:
-        yield from token_stream
-        return
 
-    # Initialize filter for stop words
-    filter = StopWordFilter(stop_words)
+    def __init__(self, filter: StopWordFilter):
+        self.filter = filter
+        self.inner = StopWordMatcher(filter)
+        self.offset = 0  # Number of original characters fed so far
+        self.origins = deque(maxlen=max(filter.max_length, 1))
+
+    @property
+    def state(self) -> int:
+        return self.inner.state
+
+    @state.setter
+    def state(self, state: int):
+        self.inner.state = state
+
+    @property
+    def live_start(self) -> int:
+        depth = self.filter.depth[self.inner.state]
+        return self.origins[-depth] if depth else self.offset
+
+    def feed(self, text: str) -> tuple[str, int, int] | None:
+        """
+        Same as StopWordMatcher.feed, the stop word and the positions refer to the original text.
+        """
+        normalize = self.filter.normalize
+        origins = self.origins
+        position = self.offset
+        pieces = []
+        token_origins = []
+        for char in text:
+            normalized = normalize(char)
+            pieces.append(normalized)
+            token_origins += [position] * len(normalized)
+            position += 1
 
-    # Sliding window buffer for efficient processing
-    buffer = ""
-    token_queue = deque()  # (token, start_pos_in_buffer)
+        inner_offset = self.inner.offset
+        match = self.inner.feed("".join(pieces))
+        if match:
+            word, start, end = match
+            # The start may lie before this token, its origin is then still in the ring
+            start -= inner_offset
+            start = token_origins[start] if start >= 0 else origins[start]
+            match = (self.filter.original_words[word], start, token_origins[end - 1 - inner_offset] + 1)
 
-    for token in token_stream:
-        start_pos = len(buffer)
-        buffer += token
-        token_queue.append((token, start_pos))
+        origins.extend(token_origins)
+        self.offset = position
+        return match
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _compile_normalized(stop_words: tuple[str, ...], casefold: bool = False, strip_diacritics: bool = False,
+                        unicode_form: str | None = None) -> StopWordFilter:
+    return StopWordFilter(stop_words, casefold, strip_diacritics, unicode_form)
+
+
+def compile_stop_words(stop_words: Iterable[str] | StopWordFilter, casefold: bool = False,
+                       strip_diacritics: bool = False, unicode_form: str | None = None) -> StopWordFilter:
+    """
+    Compile stop words into a shared StopWordFilter.
+    Filters are cached by the normalized stop word set (deduplicated, sorted, without empty words)
+    and the normalization options, so repeated lists never trigger a rebuild.
+    An already compiled filter (any object providing matcher(), e.g. CompactStopWordFilter)
+    is returned as is, a LazyStopWordFilter is compiled now.
+    """
+    if isinstance(stop_words, LazyStopWordFilter):
+        return stop_words.filter
+    if hasattr(stop_words, "matcher"):
+        return stop_words
+    return _compile_normalized(tuple(sorted(set(word for word in stop_words if word))),
+                               casefold, strip_diacritics, unicode_form)
 
-        # Check for stop words using filter
-        stop_result = filter.find_earliest_stop_word(buffer)
+
+class LazyStopWordFilter:
+    """
+    Stop words compiled on first use instead of at import time, for filters defined at module
+    level (e.g. in serverless workers, where every cold start imports the module).
+    It is compiled through compile_stop_words, so it shares the cached StopWordFilter, and behaves
+    like the compiled filter everywhere a StopWordFilter is accepted.
+    """
+
+    def __init__(self, stop_words: Iterable[str], casefold: bool = False, strip_diacritics: bool = False,
+                 unicode_form: str | None = None):
+        self._stop_words = tuple(stop_words)
+        self._options = (casefold, strip_diacritics, unicode_form)
+        self._filter = None
+
+    @property
+    def filter(self) -> StopWordFilter:
+        if self._filter is None:
+            self._filter = compile_stop_words(self._stop_words, *self._options)
+        return self._filter
+
+    def matcher(self) -> "StopWordMatcher | NormalizingMatcher":
+        return self.filter.matcher()
+
+    def __getattr__(self, name: str):
+        # Only called for attributes missing on the wrapper, e.g. max_length or stop_words
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.filter, name)
+
+
+def compile_cache_info():
+    """
+    Statistics of the compiled filter cache: (hits, misses, maxsize, currsize).
+    """
+    return _compile_normalized.cache_info()
+
+
+def clear_compile_cache():
+    """
+    Drop all cached compiled filters and reset the statistics.
+    """
+    _compile_normalized.cache_clear()
+
+
+class StopEvent(namedtuple("StopEvent", ("stop_word", "start", "end"))):
+    """
+    A confirmed stop word match, offsets are character positions from the start of the stream.
+    """
+    __slots__ = ()
+
+
+class StreamCutter:
+    """
+    Token bookkeeping around a streaming matcher, shared by the sync and async filters.
+    Tokens are pushed one by one, the returned tokens are safe to emit.
+    Pending tokens are kept in a ring (deque) with the absolute stream offset of the first one,
+    so emitting tokens never copies text or re-indexes the remaining tokens.
+    Only the live prefix of the matcher (see StopWordMatcher.live_start) is held back, matchers
+    without live_start hold back max_length - 1 characters. With split_tokens a token is split at
+    the boundary so its safe part leaves immediately, otherwise tokens are emitted whole.
+    """
+
+    def __init__(self, filter, split_tokens: bool = True):
+        self.matcher = filter.matcher()
+        self.max_length = filter.max_length
+        self.split_tokens = split_tokens
+        self.live_prefix = hasattr(self.matcher, "live_start")
+        self.stopped = False
+        self.stop_event = None
+
+        # Pending tokens, they end at matcher.offset
+        self.tokens = deque()
+        self.base = 0  # Absolute offset of the first pending token
+
+    def push(self, token: str) -> Sequence[str]:
+        """
+        Process the next token and return the tokens/parts of tokens which can be emitted.
+        When a stop word is found, the text before it is returned and `stopped` is set.
+        """
+        tokens = self.tokens
+        tokens.append(token)
+
+        # Check for stop words, only the characters of the new token are scanned
+        matcher = self.matcher
+        stop_result = matcher.feed(token)
 
         if stop_result:
             stop_word, stop_start, stop_end = stop_result
+            self.stop_event = StopEvent(stop_word, stop_start, stop_end)
+            self.stopped = True
 
             # Emit tokens/parts of tokens before the stop word
-            while token_queue:
-                curr_token, token_start = token_queue.popleft()
+            emitted_tokens = []
+            token_start = self.base
+            while tokens:
+                curr_token = tokens.popleft()
                 token_end = token_start + len(curr_token)
 
                 if token_end <= stop_start:
                     # Entire token is before the stop word
-                    yield curr_token
+                    emitted_tokens.append(curr_token)
                 elif token_start < stop_start:
                     # Token partially overlaps with stop word
-                    prefix_len = stop_start - token_start
-                    yield curr_token[:prefix_len]
+                    emitted_tokens.append(curr_token[:stop_start - token_start])
                     break
                 else:
                     # Token is after the stop word, don't emit it
                     break
+                token_start = token_end
 
-            return
+            tokens.clear()
+            return emitted_tokens
+
+        # Emit text that can no longer be the start of a stop word
+        if self.live_prefix:
+            safe_boundary = matcher.live_start
+        else:
+            safe_boundary = matcher.offset - self.max_length + 1
 
-        # Optimization: emit tokens that can no longer contain the start of a stop word
-        safe_boundary = len(buffer) - filter.max_length + 1
+        base = self.base
+        if base >= safe_boundary or base + len(tokens[0]) > safe_boundary and not self.split_tokens:
+            return _NOTHING
 
         emitted_tokens = []
-        while token_queue:
-            curr_token, token_start = token_queue[0]
-            token_end = token_start + len(curr_token)
+        while tokens and base + len(tokens[0]) <= safe_boundary:
+            curr_token = tokens.popleft()
+            base += len(curr_token)
+            emitted_tokens.append(curr_token)
 
-            if token_end <= safe_boundary:
-                emitted_tokens.append(token_queue.popleft()[0])
-            else:
-                break
+        if self.split_tokens and base < safe_boundary:
+            # The safe head of the token leaves now, its tail stays pending
+            curr_token = tokens[0]
+            emitted_tokens.append(curr_token[:safe_boundary - base])
+            tokens[0] = curr_token[safe_boundary - base:]
+            base = safe_boundary
+        self.base = base
+
+        return emitted_tokens
+
+    def flush(self) -> list[str]:
+        """
+        End of the stream, return all remaining tokens.
+        """
+        remaining = list(self.tokens)
+        self.tokens.clear()
+        self.base = self.matcher.offset
+        return remaining
 
-        # Emit safe tokens
-        for token in emitted_tokens:
-            yield token
 
-        # Update buffer and recalculate positions
-        if emitted_tokens:
-            emitted_length = sum(len(t) for t in emitted_tokens)
-            buffer = buffer[emitted_length:]
+def _instrumented_cutter(filter, metrics, split_tokens: bool) -> StreamCutter:
+    # Imported on demand, the uninstrumented filter never loads the metrics module
+    from stream_metrics import InstrumentedStreamCutter
+    return InstrumentedStreamCutter(filter, metrics, split_tokens)
 
-            # Recalculate positions of remaining tokens
-            updated_queue = deque()
-            for token, pos in token_queue:
-                updated_queue.append((token, pos - emitted_length))
-            token_queue = updated_queue
+
+def cut_stream_stop_words(token_stream: Generator[str, None, None],
+                          stop_words: list[str] | StopWordFilter,
+                          on_stop: Callable[[StopEvent], None] | None = None,
+                          close_upstream: bool = True,
+                          metrics=None,
+                          split_tokens: bool = True) -> Generator[str, None, None]:
+    """
+    Optimized function using Aho-Corasick matcher for fast stop word detection.
+    Accepts either a list of stop words or a precompiled filter.
+    When a stop word is confirmed, on_stop is called with the StopEvent and the upstream
+    generator is closed (close_upstream), which also releases e.g. its HTTP connection.
+    metrics is an optional stream_metrics.FilterMetrics sink, see stream_metrics.
+    Text is emitted as soon as it cannot start a stop word; tokens are split at that point
+    unless split_tokens is False, which keeps the original token boundaries.
+    """
+    # Initialize filter for stop words, compiled filters are shared between calls
+    filter = compile_stop_words(stop_words)
+    token_iterator = iter(token_stream)
+    if not filter.max_length:
+        yield from token_iterator
+        return
+
+    if metrics is None:
+        cutter = StreamCutter(filter, split_tokens)
+    else:
+        cutter = _instrumented_cutter(filter, metrics, split_tokens)
+
+    for token in token_iterator:
+        emitted_tokens = cutter.push(token)
+        if cutter.stopped:
+            # Stop the upstream first, the consumer may not ask for the last tokens
+            if on_stop is not None:
+                on_stop(cutter.stop_event)
+            close = getattr(token_iterator, "close", None)
+            if close_upstream and close is not None:
+                close()
+            yield from emitted_tokens
+            return
+        yield from emitted_tokens
 
     # Emit all remaining tokens
-    while token_queue:
-        yield token_queue.popleft()[0]
+    yield from cutter.flush()
+
 
+async def acut_stream_stop_words(token_stream: AsyncIterable[str],
+                                 stop_words: list[str] | StopWordFilter,
+                                 on_stop: Callable[[StopEvent], None] | None = None,
+                                 close_upstream: bool = True,
+                                 metrics=None,
+                                 split_tokens: bool = True) -> AsyncGenerator[str, None]:
+    """
+    Asyncio variant of cut_stream_stop_words with identical semantics.
+    The upstream async iterator is closed as soon as a stop word is found,
+    so it stops producing tokens nobody will see. on_stop may also be a coroutine function.
+    """
+    filter = compile_stop_words(stop_words)
+    token_iterator = aiter(token_stream)
+    if not filter.max_length:
+        async for token in token_iterator:
+            yield token
+        return
+
+    if metrics is None:
+        cutter = StreamCutter(filter, split_tokens)
+    else:
+        cutter = _instrumented_cutter(filter, metrics, split_tokens)
+
+    async for token in token_iterator:
+        emitted_tokens = cutter.push(token)
+        if cutter.stopped:
+            # Cancel the upstream first, the consumer may not ask for the last tokens
+            if on_stop is not None:
+                from inspect import isawaitable
+                result = on_stop(cutter.stop_event)
+                if isawaitable(result):
+                    await result
+            aclose = getattr(token_iterator, "aclose", None)
+            if close_upstream and aclose is not None:
+                await aclose()
+        for emitted in emitted_tokens:
+            yield emitted
+        if cutter.stopped:
+            return
+
+    # Emit all remaining tokens
+    for emitted in cutter.flush():
+        yield emitted
@@ -0,0 +1,65 @@
+"""
+Offline corpus throughput of filter_batch and filter_interleaved against one
+cut_stream_stop_words generator per stream.
+
+    python -m test_playground.benchmark_batch --streams 20000
+"""
+import argparse
+import random
+import time
+
+from batch_filter import filter_batch, filter_interleaved
+from compact_filter import CompactStopWordFilter
+from stream_stopper import compile_stop_words, cut_stream_stop_words
+
+
+def generate_corpus(stream_count: int, seed: int = 1) -> list[list[str]]:
+    """Recorded generations of 20-200 BPE-like tokens, about a third ends with a stop word"""
+    rng = random.Random(seed)
+    words = [" Praha", " je", " hlavní", " město", " Česka", ".", " Vlt", "ava", " teče", " most", "y"]
+    corpus = []
+    for _ in range(stream_count):
+        tokens = [rng.choice(words) for _ in range(rng.randint(20, 200))]
+        if rng.random() < 0.3:
+            tokens[rng.randrange(len(tokens))] = " HOTOVO!"
+        corpus.append(tokens)
+    return corpus
+
+
+def benchmark_batch(stream_count: int = 20000):
+    print("=== BATCH FILTERING BENCHMARK ===\n")
+
+    filter = compile_stop_words(["HOTOVO!", "toto se už nezobrazuje", "stopni"])
+    corpus = generate_corpus(stream_count)
+    token_count = sum(len(tokens) for tokens in corpus)
+    events = [(stream_id, token) for stream_id, tokens in enumerate(corpus) for token in tokens]
+    print(f"Streams: {stream_count}, tokens: {token_count}\n")
+
+    start = time.perf_counter()
+    expected = ["".join(cut_stream_stop_words(iter(tokens), filter)) for tokens in corpus]
+    generator_time = time.perf_counter() - start
+
+    timings = [("generator per stream", generator_time)]
+    # The compact filter takes the automaton path, short dict filters the str.find scan
+    for engine, engine_filter in (("find", filter), ("automaton", CompactStopWordFilter.from_filter(filter))):
+        start = time.perf_counter()
+        batch = filter_batch(corpus, engine_filter)
+        timings.append((f"filter_batch ({engine})", time.perf_counter() - start))
+
+        start = time.perf_counter()
+        interleaved = filter_interleaved(events, engine_filter)
+        timings.append((f"filter_interleaved ({engine})", time.perf_counter() - start))
+
+        assert [result.text for result in batch] == expected
+        assert [interleaved[stream_id].text for stream_id in range(stream_count)] == expected
+
+    for name, elapsed in timings:
+        print(f"  {name:<32} {elapsed:7.3f}s  {token_count / elapsed:>12,.0f} tokens/s"
+              f"  {generator_time / elapsed:5.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, default=20000)
+    args = parser.parse_args()
+    benchmark_batch(args.streams)
@@ -0,0 +1,125 @@
+"""
+Microbenchmark of the pending-token bookkeeping in StreamCutter on single-character tokens,
+comparing the ring of tokens with absolute offsets against the previous design
+(buffer concatenation, buffer slicing and a rebuilt deque of shifted offsets) at the same
+hold-back, and the default cutter which holds back only the live prefix.
+
+    python -m test_playground.benchmark_bookkeeping --tokens 1000000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from collections import deque
+
+from stream_stopper import StreamCutter, compile_stop_words
+
+
+class LegacyBookkeepingCutter(StreamCutter):
+    """StreamCutter with the string buffer and re-indexed queue it used before"""
+
+    def __init__(self, filter):
+        super().__init__(filter)
+        self.buffer = ""
+        self.token_queue = deque()  # (token, start_pos_in_buffer)
+
+    def push(self, token):
+        start_pos = len(self.buffer)
+        self.buffer += token
+        self.token_queue.append((token, start_pos))
+
+        if self.matcher.feed(token):
+            raise ValueError("the benchmark stream must not contain stop words")
+
+        safe_boundary = len(self.buffer) - self.max_length + 1
+
+        emitted_tokens = []
+        while self.token_queue:
+            curr_token, token_start = self.token_queue[0]
+            if token_start + len(curr_token) <= safe_boundary:
+                emitted_tokens.append(self.token_queue.popleft()[0])
+            else:
+                break
+
+        if emitted_tokens:
+            emitted_length = sum(len(t) for t in emitted_tokens)
+            self.buffer = self.buffer[emitted_length:]
+
+            updated_queue = deque()
+            for queued_token, pos in self.token_queue:
+                updated_queue.append((queued_token, pos - emitted_length))
+            self.token_queue = updated_queue
+
+        return emitted_tokens
+
+
+def equal_hold_back_cutter(filter) -> StreamCutter:
+    """
+    StreamCutter holding back max_length - 1 characters and emitting whole tokens, as the legacy
+    design does, so the comparison measures the bookkeeping alone.
+    """
+    cutter = StreamCutter(filter, split_tokens=False)
+    cutter.live_prefix = False
+    return cutter
+
+
+def measure_time(make_cutter, filter, tokens: list[str]) -> float:
+    cutter = make_cutter(filter)
+    gc.collect()
+    start = time.perf_counter()
+    for token in tokens:
+        cutter.push(token)
+    return time.perf_counter() - start
+
+
+def measure_peak_memory(make_cutter, filter, tokens: list[str]) -> int:
+    cutter = make_cutter(filter)
+    tracemalloc.start()
+    for token in tokens:
+        cutter.push(token)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def measure_held_back(make_cutter, filter, tokens: list[str]) -> float:
+    """
+    Mean number of characters pending after a token, in a separate untimed pass.
+    """
+    cutter = make_cutter(filter)
+    pushed = emitted = held_back = 0
+    for token in tokens:
+        pushed += len(token)
+        emitted += sum(len(piece) for piece in cutter.push(token))
+        held_back += pushed - emitted
+    return held_back / max(len(tokens), 1)
+
+
+def benchmark_bookkeeping(token_count: int = 1000000):
+    print("=== TOKEN BOOKKEEPING BENCHMARK ===\n")
+
+    # A long stop phrase keeps many tokens pending, which the old design re-indexed on every emission
+    filter = compile_stop_words(["toto se už nezobrazuje uživateli", "HOTOVO!"])
+    text = "Praha je hlavní město České republiky. "
+    tokens = [text[i % len(text)] for i in range(token_count)]
+    print(f"Single-character tokens: {token_count}, longest stop word: {filter.max_length} characters\n")
+
+    # The first two rows hold back the same text and differ only in the bookkeeping,
+    # the last one adds the live-prefix hold-back and token splitting of the default cutter
+    for name, make_cutter in (("string buffer + deque rebuild", LegacyBookkeepingCutter),
+                              ("token ring + base offset", equal_hold_back_cutter),
+                              ("token ring, live prefix", StreamCutter)):
+        elapsed = measure_time(make_cutter, filter, tokens)
+        # Tracing is slow, a part of the stream shows the steady state
+        peak = measure_peak_memory(make_cutter, filter, tokens[:100000])
+        held_back = measure_held_back(make_cutter, filter, tokens[:100000])
+        print(f"  {name:<30} {elapsed:7.3f}s  {token_count / elapsed:>12,.0f} tokens/s"
+              f"  {elapsed / token_count * 1e9:6.0f} ns/token  held back: {held_back:5.1f} characters"
+              f"  peak: {peak / 1024:6.1f} KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=1000000)
+    args = parser.parse_args()
+    benchmark_bookkeeping(args.tokens)
@@ -0,0 +1,61 @@
+"""
+Worker start with a large stop list: building the automaton against loading it from the
+on-disk cache of compact_filter.load_cached (with and without the checksum validation).
+
+    python -m test_playground.benchmark_cache --phrases 500000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from compact_filter import CompactStopWordFilter, cache_key, load_cached
+from stream_stopper import StopWordFilter, cut_stream_stop_words
+from test_playground.benchmark_compact import generate_phrases, generate_text
+
+
+def benchmark_cache(phrase_count: int = 500000):
+    print("=== COMPILED FILTER CACHE BENCHMARK ===\n")
+
+    phrases = generate_phrases(phrase_count)
+    text = generate_text(phrases, 20000)
+    tokens = [text[i:i + 4] for i in range(0, len(text), 4)]
+    print(f"Phrases: {len(phrases)}, total characters: {sum(len(p) for p in phrases)}\n")
+
+    start = time.perf_counter()
+    StopWordFilter(phrases)
+    build = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        load_cached(phrases, directory)
+        miss = time.perf_counter() - start
+        path = os.path.join(directory, cache_key(phrases) + ".ssac")
+
+        start = time.perf_counter()
+        cached = load_cached(phrases, directory)
+        hit = time.perf_counter() - start
+
+        start = time.perf_counter()
+        CompactStopWordFilter.load(path, verify=False)
+        unverified = time.perf_counter() - start
+
+        expected = "".join(cut_stream_stop_words(iter(tokens), StopWordFilter(phrases[:1000])))
+        assert "".join(cut_stream_stop_words(iter(tokens), load_cached(phrases[:1000], directory))) == expected
+        file_size = os.path.getsize(path)
+        del cached
+
+    print(f"Cache file: {file_size / 2**20:.1f} MiB\n")
+    print(f"  {'worker start':<34} {'seconds':>9} {'speedup':>9}")
+    for name, seconds in (("StopWordFilter build", build),
+                          ("cache miss (build + save)", miss),
+                          ("cache hit (mmap + sha256)", hit),
+                          ("cache hit without verification", unverified)):
+        print(f"  {name:<34} {seconds:>9.3f} {build / seconds:>8.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--phrases", type=int, default=500000)
+    args = parser.parse_args()
+    benchmark_cache(args.phrases)
@@ -0,0 +1,119 @@
+"""
+Downstream cost of single-character streams: cut_stream_stop_words output written as one SSE event
+per token against frames merged by coalesce_stream, with the latency the frames add.
+
+    python -m test_playground.benchmark_coalesce --chars 200000
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from stream_coalesce import coalesce_stream
+from stream_stopper import compile_stop_words, cut_stream_stop_words
+from test_playground.benchmark_suite import CZECH_TEXT, percentile, repeat_text, synthetic_phrases
+
+# (name, max_chars, max_delay), None for one event per token
+SETTINGS = (
+    ("per token", None, None),
+    ("max_chars=16", 16, None),
+    ("max_chars=64", 64, None),
+    ("max_chars=256", 256, None),
+    ("max_delay=0.2 ms", 1 << 20, 0.0002),
+    ("max_delay=1 ms", 1 << 20, 0.001),
+    ("max_delay=5 ms", 1 << 20, 0.005),
+    ("256 chars or 1 ms", 256, 0.001),
+)
+
+
+class SSEWriter:
+    """
+    Stand-in for the response writer: frames every text as a chat-completions chunk and writes it
+    with one syscall, the per-yield cost the coalescing saves.
+    """
+
+    def __init__(self):
+        self.descriptor = os.open(os.devnull, os.O_WRONLY)
+        self.events = 0
+
+    def write(self, text: str):
+        chunk = {"choices": [{"index": 0, "delta": {"content": text}}]}
+        os.write(self.descriptor, b"data: " + json.dumps(chunk, ensure_ascii=False).encode("utf-8") + b"\n\n")
+        self.events += 1
+
+    def close(self):
+        os.close(self.descriptor)
+
+
+def _output(tokens: list[str], filter, max_chars: int | None, max_delay: float | None):
+    filtered = cut_stream_stop_words(iter(tokens), filter)
+    if max_chars is None:
+        return filtered
+    return coalesce_stream(filtered, max_chars, max_delay)
+
+
+def measure_throughput(tokens: list[str], filter, max_chars: int | None, max_delay: float | None) -> tuple[float, int]:
+    writer = SSEWriter()
+    start = time.perf_counter()
+    for text in _output(tokens, filter, max_chars, max_delay):
+        writer.write(text)
+    elapsed = time.perf_counter() - start
+    writer.close()
+    return elapsed, writer.events
+
+
+def measure_added_latency(tokens: list[str], filter, max_chars: int | None, max_delay: float | None) -> list[int]:
+    """
+    Nanoseconds from the filter releasing a piece until the frame containing it is written.
+    """
+    clock = time.perf_counter_ns
+    released = []
+
+    def timed(pieces):
+        for piece in pieces:
+            released.append(clock())
+            yield piece
+
+    writer = SSEWriter()
+    latencies = []
+    if max_chars is None:
+        for text in timed(cut_stream_stop_words(iter(tokens), filter)):
+            writer.write(text)
+            latencies.append(clock() - released[-1])
+    else:
+        index = 0
+        stream = timed(cut_stream_stop_words(iter(tokens), filter))
+        for frame in coalesce_stream(stream, max_chars, max_delay, keep_tokens=True):
+            writer.write(frame.text)
+            written = clock()
+            latencies += [written - released[index + i] for i in range(len(frame.tokens))]
+            index += len(frame.tokens)
+    writer.close()
+    return latencies
+
+
+def benchmark_coalesce(char_count: int = 200000):
+    print("=== OUTPUT COALESCING BENCHMARK ===\n")
+
+    text = repeat_text(CZECH_TEXT, char_count)
+    tokens = list(text)  # Single-character stream, the worst case for per-token writes
+    filter = compile_stop_words(synthetic_phrases(200, random.Random(7)) + ["HOTOVO!"])
+    print(f"Tokens: {len(tokens)} single characters, one SSE event (json + write syscall) per yield\n")
+
+    print(f"  {'setting':<20} {'events':>8} {'chars/s':>12} {'speedup':>8} {'p99 added ms':>13} {'max added ms':>13}")
+    baseline = None
+    for name, max_chars, max_delay in SETTINGS:
+        measure_throughput(tokens[:1000], filter, max_chars, max_delay)  # Warm the lazily built transitions
+        elapsed, events = min(measure_throughput(tokens, filter, max_chars, max_delay) for _ in range(3))
+        latencies = sorted(measure_added_latency(tokens, filter, max_chars, max_delay))
+        baseline = baseline or elapsed
+        print(f"  {name:<20} {events:>8} {len(tokens) / elapsed:>12,.0f} {baseline / elapsed:>7.1f}x"
+              f" {percentile(latencies, 0.99) / 1e6:>13.3f} {latencies[-1] / 1e6:>13.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chars", type=int, default=200000)
+    args = parser.parse_args()
+    benchmark_coalesce(args.chars)
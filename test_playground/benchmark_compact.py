@@ -0,0 +1,106 @@
+"""
+Memory and lookup throughput of the dict trie (StopWordFilter) and the array-backed
+CompactStopWordFilter, built in process and loaded through mmap.
+
+    python -m test_playground.benchmark_compact --phrases 100000
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from compact_filter import CompactStopWordFilter
+from stream_stopper import StopWordFilter
+
+
+def generate_phrases(count: int, seed: int = 42) -> list[str]:
+    """Moderation-list-like phrases of 1-4 words from a synthetic vocabulary"""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyzáčďéěíňóřšťúůýž"
+    vocabulary = ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(20000)]
+    phrases = set()
+    while len(phrases) < count:
+        phrases.add(" ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 4))))
+    return sorted(phrases)
+
+
+def generate_text(phrases: list[str], length: int, seed: int = 7) -> str:
+    """Text built from the words of the phrases, so the scan keeps entering the trie"""
+    rng = random.Random(seed)
+    words = [word for phrase in phrases[:5000] for word in phrase.split()]
+    parts = []
+    size = 0
+    while size < length:
+        word = rng.choice(words)
+        parts.append(word)
+        size += len(word) + 1
+    return " ".join(parts)[:length]
+
+
+def measure_memory(build) -> tuple[object, int]:
+    """Build an object and return it with the traced memory it keeps alive"""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, retained
+
+
+def measure_throughput(filter, text: str, token_len: int = 4) -> float:
+    """Characters per second of a streaming scan with tokens of token_len characters"""
+    tokens = [text[i:i + token_len] for i in range(0, len(text), token_len)]
+    matcher = filter.matcher()
+    start = time.perf_counter()
+    for token in tokens:
+        matcher.feed(token)
+    return len(text) / (time.perf_counter() - start)
+
+
+def benchmark_compact_trie(phrase_count: int = 100000, text_length: int = 200000):
+    print("=== COMPACT TRIE BENCHMARK ===\n")
+
+    phrases = generate_phrases(phrase_count)
+    text = generate_text(phrases, text_length)
+    print(f"Phrases: {len(phrases)}, total characters: {sum(len(p) for p in phrases)}")
+
+    start = time.perf_counter()
+    dict_filter, dict_memory = measure_memory(lambda: StopWordFilter(phrases))
+    dict_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compact_filter, compact_memory = measure_memory(lambda: CompactStopWordFilter.from_filter(dict_filter))
+    compact_build = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "stop_words.ssac")
+        compact_filter.save(path)
+        file_size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        loaded_filter, loaded_memory = measure_memory(lambda: CompactStopWordFilter.load(path))
+        load_time = time.perf_counter() - start
+
+        rows = [
+            ("dict trie", dict_memory, dict_build, measure_throughput(dict_filter, text)),
+            ("compact arrays", compact_memory, compact_build, measure_throughput(compact_filter, text)),
+            ("compact mmap", loaded_memory, load_time, measure_throughput(loaded_filter, text)),
+        ]
+        del loaded_filter
+
+    print(f"States: {len(dict_filter.fail)}, file size: {file_size / 2**20:.1f} MiB\n")
+    print(f"  {'engine':<15} {'heap MiB':>9} {'build/load s':>13} {'chars/s':>12}")
+    for name, memory, seconds, throughput in rows:
+        print(f"  {name:<15} {memory / 2**20:>9.1f} {seconds:>13.3f} {throughput:>12,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--phrases", type=int, default=100000)
+    parser.add_argument("--text-length", type=int, default=200000)
+    args = parser.parse_args()
+    benchmark_compact_trie(args.phrases, args.text_length)
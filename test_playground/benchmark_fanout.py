@@ -0,0 +1,54 @@
+"""
+One stream shown to several audiences with their own stop lists: fan_out_stop_words (one merged
+automaton, one scan, shared buffer) against itertools.tee and one cut_stream_stop_words per list.
+
+    python -m test_playground.benchmark_fanout --tokens 200000 --lists 3 --token-length 10
+"""
+import argparse
+import itertools
+import random
+import time
+
+from stream_fanout import fan_out_stop_words
+from stream_stopper import cut_stream_stop_words
+from test_playground.benchmark_suite import CZECH_TEXT, bpe_tokens, repeat_text, synthetic_phrases
+
+
+def benchmark_fanout(token_count: int = 200000, list_count: int = 3, token_length: int = 10, words_per_list: int = 200):
+    print("=== FAN-OUT BENCHMARK ===\n")
+
+    rng = random.Random(5)
+    tokens = bpe_tokens(repeat_text(CZECH_TEXT, token_count * (token_length + 1) // 2), rng, token_length)[:token_count]
+    stop_lists = [synthetic_phrases(words_per_list, rng) + ["HOTOVO!"] for _ in range(list_count)]
+    print(f"Tokens: {len(tokens)}, lists: {list_count} x {words_per_list + 1} words\n")
+
+    def teed():
+        copies = itertools.tee(iter(tokens), list_count)
+        outputs = [cut_stream_stop_words(copy, words) for copy, words in zip(copies, stop_lists)]
+        # Consumers reading side by side, as in a server writing to several sinks
+        for _ in itertools.zip_longest(*outputs):
+            pass
+
+    def fanned():
+        for _ in itertools.zip_longest(*fan_out_stop_words(iter(tokens), stop_lists)):
+            pass
+
+    rows = []
+    for name, run in (("tee + cut per list", teed), ("fan_out_stop_words", fanned)):
+        run()  # Compile the filters and warm the lazily built transitions
+        start = time.perf_counter()
+        run()
+        rows.append((name, time.perf_counter() - start))
+
+    baseline = rows[0][1]
+    for name, seconds in rows:
+        print(f"  {name:<22} {len(tokens) / seconds:>12,.0f} tokens/s  {baseline / seconds:>5.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=200000)
+    parser.add_argument("--lists", type=int, default=3)
+    parser.add_argument("--token-length", type=int, default=10, help="longest token, lengths are uniform from 1")
+    args = parser.parse_args()
+    benchmark_fanout(args.tokens, args.lists, args.token_length)
@@ -0,0 +1,46 @@
+"""
+Scaling of parallel_filter.filter_corpus with the number of worker processes on a large local JSONL file.
+
+    python -m test_playground.benchmark_parallel --records 200000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from parallel_filter import filter_corpus
+from test_playground.benchmark_batch import generate_corpus
+
+STOP_WORDS = ["HOTOVO!", "toto se už nezobrazuje", "stopni"]
+
+
+def benchmark_parallel(record_count: int = 200000):
+    print("=== PARALLEL CORPUS FILTERING BENCHMARK ===\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "corpus.jsonl")
+        with open(path, "w", encoding="utf-8") as file:
+            for tokens in generate_corpus(record_count):
+                file.write(json.dumps({"tokens": tokens}, ensure_ascii=False) + "\n")
+        print(f"Records: {record_count}, file size: {os.path.getsize(path) / 2**20:.1f} MiB, "
+              f"cores: {os.cpu_count()}\n")
+
+        baseline = None
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            stats = {}
+            start = time.perf_counter()
+            cuts = sum(result["cut"] is not None for result in filter_corpus(path, STOP_WORDS, workers=workers, stats=stats))
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"  {workers:>3} workers  {elapsed:7.2f}s  {stats['records'] / elapsed:>10,.0f} records/s"
+                  f"  {stats['characters'] / elapsed:>12,.0f} chars/s  speedup {baseline / elapsed:4.1f}x  cuts: {cuts}")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=200000)
+    args = parser.parse_args()
+    benchmark_parallel(args.records)
@@ -0,0 +1,71 @@
+"""
+Cost of changing one stop list in a StopListRegistry against rebuilding a StopWordFilter,
+and the first-stream cost of the lazily computed failure links after an update.
+
+    python -m test_playground.benchmark_registry --lists 100 --words 500
+"""
+import argparse
+import random
+import time
+
+from stop_list_registry import StopListRegistry
+from stream_stopper import StopWordFilter, cut_stream_stop_words
+from test_playground.benchmark_suite import CZECH_TEXT, bpe_tokens, repeat_text, synthetic_phrases
+
+
+def benchmark_registry(list_count: int = 100, words_per_list: int = 500, updates: int = 200):
+    print("=== STOP LIST REGISTRY BENCHMARK ===\n")
+
+    rng = random.Random(1)
+    lists = {f"customer-{index}": synthetic_phrases(words_per_list, rng) for index in range(list_count)}
+    registry = StopListRegistry()
+    start = time.perf_counter()
+    for name, words in lists.items():
+        registry.add(name, words)
+    print(f"Lists: {list_count} x {words_per_list} words, registry built in {time.perf_counter() - start:.2f}s\n")
+
+    new_words = synthetic_phrases(updates, rng)
+    start = time.perf_counter()
+    for word in new_words:
+        registry.add("customer-0", [word])
+        registry.remove("customer-0", [word])
+    update_time = (time.perf_counter() - start) / (2 * updates)
+
+    start = time.perf_counter()
+    for word in new_words[:10]:
+        StopWordFilter(lists["customer-0"] + [word])
+    list_rebuild_time = (time.perf_counter() - start) / 10
+
+    all_words = [word for words in lists.values() for word in words]
+    start = time.perf_counter()
+    StopWordFilter(all_words)
+    shared_rebuild_time = time.perf_counter() - start
+
+    print(f"  {'registry add/remove of one word':<36} {update_time * 1e6:>10.1f} µs")
+    print(f"  {'rebuild of one list':<36} {list_rebuild_time * 1e6:>10.1f} µs  {list_rebuild_time / update_time:6.0f}x")
+    print(f"  {'rebuild of the shared automaton':<36} {shared_rebuild_time * 1e6:>10.1f} µs"
+          f"  {shared_rebuild_time / update_time:6.0f}x\n")
+
+    tokens = bpe_tokens(repeat_text(CZECH_TEXT, 200000), rng)
+    view = registry.view("customer-0")
+    for name in ("first stream after the update", "next stream, links memoized"):
+        start = time.perf_counter()
+        for _ in cut_stream_stop_words(iter(tokens), view):
+            pass
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<36} {len(tokens) / elapsed:>12,.0f} tokens/s")
+
+    reference = StopWordFilter(lists["customer-0"])
+    start = time.perf_counter()
+    for _ in cut_stream_stop_words(iter(tokens), reference):
+        pass
+    elapsed = time.perf_counter() - start
+    print(f"  {'StopWordFilter of the list':<36} {len(tokens) / elapsed:>12,.0f} tokens/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lists", type=int, default=100)
+    parser.add_argument("--words", type=int, default=500)
+    args = parser.parse_args()
+    benchmark_registry(args.lists, args.words)
@@ -0,0 +1,68 @@
+"""
+Throughput of the pooled StreamingChatClient against the original requests.post + iter_lines
++ json.loads query, both reading from the local mock SSE server at a high chunk rate.
+
+    python -m test_playground.benchmark_streaming_client --tokens 20000 --requests 5
+"""
+import argparse
+import json
+import time
+
+import requests
+
+from test_playground.mock_sse_server import mock_sse_server
+from stream_http import StreamingChatClient
+
+PAYLOAD = {"messages": [{"role": "user", "content": "benchmark"}], "model": "mock", "stream": True}
+
+
+def legacy_tokens(api_url: str):
+    """The original query(): a new connection per request and a full json.loads per chunk"""
+    response = requests.post(api_url, json=PAYLOAD, stream=True)
+    for line in response.iter_lines():
+        if not line.startswith(b"data:"):
+            continue
+        if line.strip() == b"data: [DONE]":
+            return
+        chunk = json.loads(line.decode("utf-8").lstrip("data:").rstrip("/n"))
+        content = chunk["choices"][0]["delta"]["content"]
+        if content:
+            yield content
+
+
+def run(name: str, server, make_stream, request_count: int, expected_text: str):
+    connections = server.connections
+    start = time.perf_counter()
+    chunk_count = 0
+    for _ in range(request_count):
+        tokens = list(make_stream())
+        chunk_count += len(tokens)
+        assert "".join(tokens) == expected_text, f"{name} returned a different text"
+    elapsed = time.perf_counter() - start
+    print(f"  {name:<26} {chunk_count / elapsed:>12,.0f} chunks/s  {elapsed / request_count * 1000:>8.1f} ms/request"
+          f"  {server.connections - connections:>3} connections")
+
+
+def benchmark_streaming_client(token_count: int = 20000, request_count: int = 5):
+    print("=== STREAMING CLIENT BENCHMARK ===\n")
+
+    tokens = [f" tok{i % 97}" if i % 5 else "ř\"\\n" for i in range(token_count)]
+    expected_text = "".join(tokens)
+
+    with mock_sse_server(tokens) as server:
+        print(f"Chunks per request: {token_count}, requests: {request_count}\n")
+        run("legacy query", server, lambda: legacy_tokens(server.url), request_count, expected_text)
+
+        with StreamingChatClient(server.url, fast_json=False) as client:
+            run("pooled client, json.loads", server, lambda: client.stream_tokens(PAYLOAD), request_count, expected_text)
+
+        with StreamingChatClient(server.url) as client:
+            run("pooled client, fast json", server, lambda: client.stream_tokens(PAYLOAD), request_count, expected_text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=5)
+    args = parser.parse_args()
+    benchmark_streaming_client(args.tokens, args.requests)
@@ -0,0 +1,251 @@
+"""
+Reproducible benchmark suite of cut_stream_stop_words over realistic stream shapes.
+Reports per-token latency percentiles, throughput and peak memory, saves the results as JSON
+and flags regressions against a stored baseline.
+
+    python -m test_playground.benchmark_suite --output results.json
+    python -m test_playground.benchmark_suite --baseline test_playground/benchmark_baseline.json
+    python -m test_playground.benchmark_suite --save-baseline
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from stream_stopper import clear_compile_cache, compile_stop_words, cut_stream_stop_words
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "benchmark_baseline.json")
+
+# A regression is flagged when throughput drops or peak memory grows by more than this
+REGRESSION_THRESHOLD = 0.15
+# Percentiles of microsecond timings are noisier, p99 latency has its own threshold
+LATENCY_REGRESSION_THRESHOLD = 0.5
+
+CZECH_TEXT = ("Prezident České republiky dnes podepsal nový zákon o digitalizaci. Změny se dotknou všech "
+              "občanů a budou platit od příštího roku. Vláda očekává úspory v řádu miliard korun. ")
+EMOJI_TEXT = "Ahoj všichni 😊 Jak se máte? 👨‍👩‍👧‍👦 Dnes je krásný den ☀️ Těším se na víkend! 🇨🇿 Здравствуй мир こんにちは世界 "
+
+
+def repeat_text(text: str, length: int) -> str:
+    return (text * (length // len(text) + 1))[:length]
+
+
+def bpe_tokens(text: str, rng: random.Random, max_len: int = 10) -> list[str]:
+    tokens = []
+    i = 0
+    while i < len(text):
+        token_len = rng.randint(1, max_len)
+        tokens.append(text[i:i + token_len])
+        i += token_len
+    return tokens
+
+
+def synthetic_phrases(count: int, rng: random.Random) -> list[str]:
+    letters = "abcdefghijklmnopqrstuvwxyzáčďéěíňóřšťúůýž"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(8, 24))) for _ in range(count)]
+
+
+def build_scenarios(scale: float = 1.0) -> dict[str, Callable[[], tuple[list[str], list[str]]]]:
+    """
+    Scenario name -> factory of (tokens, stop_words). None of the streams contains a stop word,
+    so the whole stream is always processed.
+    """
+    size = lambda n: max(1, int(n * scale))
+
+    def single_char():
+        return list(repeat_text(CZECH_TEXT, size(200000))), ["vysokofrekv", "HOTOVO!", "stopni"]
+
+    def bpe_subword():
+        rng = random.Random(1)
+        return bpe_tokens(repeat_text(CZECH_TEXT, size(400000)), rng), ["HOTOVO!", "toto se už nezobrazuje", "Praha"]
+
+    def huge_stop_list():
+        rng = random.Random(2)
+        return bpe_tokens(repeat_text(CZECH_TEXT, size(200000)), rng), synthetic_phrases(size(50000), rng)
+
+    def long_stop_phrase():
+        rng = random.Random(3)
+        phrase = repeat_text("toto se už nezobrazuje uživateli, ", 200)
+        return bpe_tokens(repeat_text(CZECH_TEXT, size(400000)), rng), [phrase, "HOTOVO!"]
+
+    def near_miss_prefixes():
+        # Every stop word shares a long prefix with the stream and fails on its last character
+        rng = random.Random(4)
+        prefix = "občanů a budou platit od příštího"
+        stop_words = [prefix + suffix for suffix in "XYZQW"] + [f"{prefix[:k]}#" for k in range(1, len(prefix))]
+        return bpe_tokens(repeat_text(CZECH_TEXT, size(400000)), rng, max_len=4), stop_words
+
+    def unicode_emoji():
+        rng = random.Random(5)
+        return bpe_tokens(repeat_text(EMOJI_TEXT, size(200000)), rng, max_len=3), ["😊 spam", "👨‍👩‍👧‍👦!", "мир!"]
+
+    return {
+        "single_char": single_char,
+        "bpe_subword": bpe_subword,
+        "huge_stop_list": huge_stop_list,
+        "long_stop_phrase": long_stop_phrase,
+        "near_miss_prefixes": near_miss_prefixes,
+        "unicode_emoji": unicode_emoji,
+    }
+
+
+def percentile(sorted_values: list[int], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def measure_latencies(tokens: list[str], filter) -> list[int]:
+    """
+    Nanoseconds the filter spends on every token: from handing the token over
+    until the filter asks the upstream for the next one.
+    """
+    latencies = []
+    clock = time.perf_counter_ns
+
+    def timed_stream():
+        for token in tokens:
+            handed_over = clock()
+            yield token
+            latencies.append(clock() - handed_over)
+
+    for _ in cut_stream_stop_words(timed_stream(), filter):
+        pass
+    return latencies
+
+
+def measure_throughput(tokens: list[str], filter) -> float:
+    start = time.perf_counter()
+    for _ in cut_stream_stop_words(iter(tokens), filter):
+        pass
+    return time.perf_counter() - start
+
+
+def measure_peak_memory(tokens: list[str], filter) -> int:
+    gc.collect()
+    tracemalloc.start()
+    for _ in cut_stream_stop_words(iter(tokens), filter):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def run_scenario(factory, repetitions: int = 5) -> dict:
+    tokens, stop_words = factory()
+    clear_compile_cache()  # Time the compilation, not a hit of an earlier run
+    start = time.perf_counter()
+    filter = compile_stop_words(stop_words)
+    compile_seconds = time.perf_counter() - start
+    characters = sum(len(token) for token in tokens)
+
+    measure_throughput(tokens, filter)  # Warmup
+    seconds = statistics.median(measure_throughput(tokens, filter) for _ in range(repetitions))
+    latencies = sorted(measure_latencies(tokens, filter))
+
+    return {
+        "tokens": len(tokens),
+        "characters": characters,
+        "stop_words": len(stop_words),
+        "compile_seconds": compile_seconds,
+        "seconds": seconds,
+        "tokens_per_second": len(tokens) / seconds,
+        "chars_per_second": characters / seconds,
+        "latency_ns": {name: percentile(latencies, fraction)
+                       for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("p999", 0.999))}
+                      | {"max": latencies[-1]},
+        "peak_memory_bytes": measure_peak_memory(tokens, filter),
+    }
+
+
+def run_suite(scale: float = 1.0, repetitions: int = 5, only: list[str] | None = None) -> dict:
+    results = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "scale": scale,
+            "repetitions": repetitions,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "scenarios": {},
+    }
+    for name, factory in build_scenarios(scale).items():
+        if only and name not in only:
+            continue
+        results["scenarios"][name] = run_scenario(factory, repetitions)
+    return results
+
+
+def compare_with_baseline(results: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD,
+                          latency_threshold: float = LATENCY_REGRESSION_THRESHOLD) -> list[str]:
+    """
+    Names of the metrics which regressed by more than the threshold.
+    Scenarios run at another scale than the baseline are compared by throughput only.
+    """
+    regressions = []
+    same_scale = results["meta"]["scale"] == baseline["meta"]["scale"]
+    for name, result in results["scenarios"].items():
+        reference = baseline["scenarios"].get(name)
+        if reference is None:
+            continue
+        if result["tokens_per_second"] < reference["tokens_per_second"] * (1 - threshold):
+            regressions.append(f"{name}.tokens_per_second")
+        if same_scale and result["latency_ns"]["p99"] > reference["latency_ns"]["p99"] * (1 + latency_threshold):
+            regressions.append(f"{name}.latency_ns.p99")
+        if same_scale and result["peak_memory_bytes"] > reference["peak_memory_bytes"] * (1 + threshold):
+            regressions.append(f"{name}.peak_memory_bytes")
+    return regressions
+
+
+def print_results(results: dict, baseline: dict | None = None):
+    print(f"  {'scenario':<20} {'tokens/s':>12} {'chars/s':>12} {'p50 µs':>8} {'p99 µs':>8} {'max µs':>9} {'peak KiB':>9}  vs baseline")
+    for name, result in results["scenarios"].items():
+        latency = result["latency_ns"]
+        change = ""
+        reference = (baseline or {}).get("scenarios", {}).get(name)
+        if reference:
+            change = f"{result['tokens_per_second'] / reference['tokens_per_second'] - 1:+.0%}"
+        print(f"  {name:<20} {result['tokens_per_second']:>12,.0f} {result['chars_per_second']:>12,.0f}"
+              f" {latency['p50'] / 1000:>8.1f} {latency['p99'] / 1000:>8.1f} {latency['max'] / 1000:>9.1f}"
+              f" {result['peak_memory_bytes'] / 1024:>9.1f}  {change}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=float, default=1.0, help="stream and stop list size multiplier")
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--scenario", action="append", help="run only this scenario, can be repeated")
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--baseline", help="compare with a stored results JSON")
+    parser.add_argument("--save-baseline", action="store_true", help=f"store the results as {BASELINE_PATH}")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.scale, args.repetitions, args.scenario)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+
+    for path in filter(None, (args.output, args.save_baseline and BASELINE_PATH)):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if baseline:
+        regressions = compare_with_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Throughput of cut_token_ids on token-ID streams against decoding every ID to text
+and running cut_stream_stop_words, with a byte level BPE vocabulary.
+
+    python -m test_playground.benchmark_token_ids --tokens 200000
+"""
+import argparse
+import codecs
+import json
+import os
+import random
+import tempfile
+import time
+
+from stream_stopper import cut_stream_stop_words
+from token_filter import TokenIdFilter, _byte_level_decoder, cut_token_ids, load_vocabulary
+
+TEXT = ("Prezident České republiky dnes podepsal nový zákon o digitalizaci. Změny se dotknou všech "
+        "občanů a budou platit od příštího roku. Vláda očekává úspory v řádu miliard korun. ")
+STOP_WORDS = ["HOTOVO!", "toto se už nezobrazuje", "<|im_end|>"]
+
+
+def write_vocabulary(path: str):
+    """Byte level vocabulary of all bytes, the words of TEXT with and without a leading space and some pieces"""
+    byte_chars = {byte: char for char, byte in _byte_level_decoder().items()}
+    pieces = {bytes([byte]) for byte in range(256)}
+    for word in TEXT.split():
+        for piece in (word, " " + word, word[:3], word[3:]):
+            pieces.add(piece.encode("utf-8"))
+    vocab = {"".join(byte_chars[byte] for byte in piece): index for index, piece in enumerate(sorted(pieces))}
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(vocab, file, ensure_ascii=False)
+
+
+def tokenize(text: str, vocab: dict[bytes, int], rng: random.Random) -> list[int]:
+    """Greedy longest-match tokenization with random shorter pieces, like sampled BPE output"""
+    data = text.encode("utf-8")
+    token_ids = []
+    i = 0
+    while i < len(data):
+        end = min(len(data), i + rng.randint(1, 12))
+        while end > i + 1 and data[i:end] not in vocab:
+            end -= 1
+        token_ids.append(vocab[data[i:end]])
+        i = end
+    return token_ids
+
+
+def benchmark_token_ids(token_count: int = 200000):
+    print("=== TOKEN ID FILTER BENCHMARK ===\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "vocab.json")
+        write_vocabulary(path)
+        vocabulary = load_vocabulary(path)
+
+    vocab = {data: token_id for token_id, data in enumerate(vocabulary.token_bytes)}
+    token_ids = []
+    rng = random.Random(1)
+    while len(token_ids) < token_count:
+        token_ids += tokenize(TEXT, vocab, rng)
+    token_ids = token_ids[:token_count]
+    filter = TokenIdFilter(STOP_WORDS, vocabulary)
+    print(f"Vocabulary: {len(vocabulary)} tokens, stream: {len(token_ids)} token IDs\n")
+
+    def decoded_stream():
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        token_bytes = vocabulary.token_bytes
+        for token_id in token_ids:
+            text = decoder.decode(token_bytes[token_id])
+            if text:
+                yield text
+
+    for _ in range(2):  # The first round warms the transition table
+        start = time.perf_counter()
+        text = "".join(cut_stream_stop_words(decoded_stream(), filter.filter))
+        decode_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        emitted = list(cut_token_ids(iter(token_ids), filter))
+        id_time = time.perf_counter() - start
+    assert vocabulary.decode(emitted) == text
+
+    print(f"  {'decode + cut_stream_stop_words':<32} {token_count / decode_time:>12,.0f} tokens/s")
+    print(f"  {'cut_token_ids':<32} {token_count / id_time:>12,.0f} tokens/s  {decode_time / id_time:5.1f}x")
+    print(f"  Memoized transitions: {filter.cached_transitions}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=200000)
+    args = parser.parse_args()
+    benchmark_token_ids(args.tokens)
@@ -0,0 +1,373 @@
+"""
+End-to-end streaming latency under concurrency: many concurrent streams from a local mock of the
+chat-completions SSE endpoint, consumed through acut_stream_stop_words on one event loop,
+against the same streams consumed unfiltered.
+
+    python -m test_playground.load_test --streams 2000 --rate 20 --tokens 200 --token-size uniform:1-8
+
+The mock runs in separate server processes sharing the port (SO_REUSEPORT), so its CPU is not
+counted to the driver. It answers the payload of real_streaming_api.query; every stream is generated
+from the request's seed with the configured token rate, token size distribution and stop word
+placement. Reported per run: TTFT, the latency the filter adds to every token, the hold-back delay
+of text released with a later token, CPU and memory per stream.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import math
+import multiprocessing
+import random
+import time
+import tracemalloc
+from bisect import bisect_left
+from collections.abc import AsyncGenerator, Callable
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from sse import DONE, SSEParser, extract_content
+from stream_stopper import acut_stream_stop_words, compile_stop_words
+from test_playground.benchmark_suite import CZECH_TEXT, percentile, repeat_text, synthetic_phrases
+from test_playground.mock_sse_server import MockSSEServer
+
+PAYLOAD = {"messages": [{"role": "user", "content": "load test"}], "model": "mock", "stream": True}
+
+
+@dataclass(frozen=True)
+class LoadProfile:
+    """
+    Shape of the mocked streams. token_size is fixed:N, uniform:A-B or geometric:MEAN characters;
+    stop_position is the relative position of the stop word in the stream, random when None.
+    """
+    tokens: int = 200
+    rate: float = 20.0              # Tokens per second and stream, 0 for as fast as possible
+    first_token_delay: float = 0.0  # Seconds before the first token (prefill)
+    token_size: str = "uniform:1-8"
+    stop_fraction: float = 0.5      # Share of the streams containing the stop word
+    stop_position: float | None = None
+    stop_word: str = "HOTOVO!"
+
+
+def parse_token_sizes(spec: str) -> Callable[[random.Random], int]:
+    """
+    Sampler of token lengths in characters: fixed:N, uniform:A-B or geometric:MEAN.
+    """
+    kind, _, value = spec.partition(":")
+    if kind == "fixed":
+        size = int(value)
+        return lambda rng: size
+    if kind == "uniform":
+        low, high = map(int, value.split("-"))
+        return lambda rng: rng.randint(low, high)
+    if kind == "geometric" and float(value) > 1:
+        log_q = math.log(1 - 1 / float(value))
+        return lambda rng: int(math.log(1 - rng.random()) / log_q) + 1
+    if kind == "geometric":
+        return lambda rng: 1
+    raise ValueError(f"unknown token size distribution {spec!r}, expected fixed:N, uniform:A-B or geometric:MEAN")
+
+
+def generate_stream(profile: LoadProfile, seed: int) -> tuple[list[str], int | None]:
+    """
+    Tokens of one mocked stream and the offset of its stop word (None without one).
+    """
+    rng = random.Random(seed)
+    sizes = parse_token_sizes(profile.token_size)
+    lengths = [max(1, sizes(rng)) for _ in range(profile.tokens)]
+    total = sum(lengths)
+    text = repeat_text(CZECH_TEXT, total + len(CZECH_TEXT))
+    start = rng.randrange(len(CZECH_TEXT))
+    text = text[start:start + total]
+
+    stop_offset = None
+    if rng.random() < profile.stop_fraction:
+        position = rng.random() if profile.stop_position is None else profile.stop_position
+        stop_offset = int(position * total)
+        text = text[:stop_offset] + profile.stop_word + text[stop_offset:]
+
+    tokens = []
+    offset = 0
+    for length in lengths:
+        tokens.append(text[offset:offset + length])
+        offset += length
+    if offset < len(text):
+        tokens.append(text[offset:])
+    return tokens, stop_offset
+
+
+def _raise_file_limit():
+    # Every stream holds a socket on both sides; resource only exists on Unix
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+class AsyncMockSSEServer:
+    """
+    Asyncio mock of the chat-completions endpoint for thousands of concurrent streams.
+    Each response is generated from the seed of the request payload and paced at profile.rate;
+    the connection is closed after [DONE] (or when the client disconnects, e.g. after a stop word).
+    """
+
+    def __init__(self, profile: LoadProfile):
+        self.profile = profile
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        try:
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in headers.split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            payload = json.loads(await reader.readexactly(length) or b"{}")
+            tokens, _ = generate_stream(self.profile, payload.get("seed", 0))
+
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+            interval = 1 / self.profile.rate if self.profile.rate else 0.0
+            deadline = loop.time() + self.profile.first_token_delay
+            for index, token in enumerate(tokens):
+                if interval or index == 0:
+                    # Paced by a deadline, so the rate does not drift with the write time
+                    await asyncio.sleep(max(0.0, deadline - loop.time()))
+                    deadline += interval
+                writer.write(MockSSEServer.encode_event(index, token))
+                await writer.drain()
+            writer.write(b"data: [DONE]\n\n")
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _serve(profile: LoadProfile, port: int, ports: multiprocessing.Queue):
+    _raise_file_limit()
+
+    async def serve():
+        mock = AsyncMockSSEServer(profile)
+        server = await asyncio.start_server(mock.handle, "127.0.0.1", port, reuse_port=True, backlog=65535)
+        ports.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+@contextmanager
+def mock_servers(profile: LoadProfile, processes: int = 1):
+    """
+    Run the mock in the given number of processes on one free local port, yields the port.
+    """
+    ports = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_serve, args=(profile, 0, ports), daemon=True)]
+    workers[0].start()
+    port = ports.get(timeout=30)
+    for _ in range(processes - 1):
+        workers.append(multiprocessing.Process(target=_serve, args=(profile, port, ports), daemon=True))
+        workers[-1].start()
+        ports.get(timeout=30)
+    try:
+        yield port
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+
+
+async def stream_tokens(port: int, payload: dict) -> AsyncGenerator[str, None]:
+    """
+    Non-empty delta contents of one streamed response, read with plain asyncio streams.
+    Closing the generator closes the connection.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(b"POST /v1/chat/completions HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                     b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+        await reader.readuntil(b"\r\n\r\n")
+        parser = SSEParser()
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                return
+            for data in parser.feed(chunk):
+                if data == DONE:
+                    return
+                content = extract_content(data)
+                if content:
+                    yield content
+    finally:
+        writer.close()
+
+
+class RunStats:
+    """
+    Samples of one run over all streams, times in nanoseconds.
+    """
+
+    def __init__(self):
+        self.ttft = []        # Request start to the first emitted text
+        self.first_token = [] # Request start to the first upstream token
+        self.added = []       # Per upstream token: handed to the consumer until the next one is requested
+        self.hold_back = []   # Per text piece released with a later token: arrival of its last character to release
+        self.pieces = 0
+        self.tokens = 0
+        self.stopped = 0
+        self.failed = 0
+
+
+async def consume(port: int, seed: int, filter, stats: RunStats, delay: float):
+    """
+    One client: request the stream of the seed and consume it, filtered when filter is given.
+    """
+    await asyncio.sleep(delay)
+    clock = time.perf_counter_ns
+    start = clock()
+    ends = []   # Stream offset after every upstream token
+    times = []  # Arrival time of every upstream token
+
+    async def timed():
+        offset = 0
+        async for token in stream_tokens(port, dict(PAYLOAD, seed=seed)):
+            offset += len(token)
+            ends.append(offset)
+            handed_over = clock()
+            times.append(handed_over)
+            yield token
+            stats.added.append(clock() - handed_over)
+
+    def stopped(event):
+        stats.stopped += 1
+
+    output = timed() if filter is None else acut_stream_stop_words(timed(), filter, on_stop=stopped)
+    emitted = 0
+    first = None
+    try:
+        async for piece in output:
+            now = clock()
+            if first is None:
+                first = now
+            emitted += len(piece)
+            stats.pieces += 1
+            index = bisect_left(ends, emitted)
+            if index < len(ends) - 1:
+                stats.hold_back.append(now - times[index])
+    except (ConnectionError, OSError, asyncio.IncompleteReadError):
+        stats.failed += 1
+        return
+    stats.tokens += len(ends)
+    if times:
+        stats.first_token.append(times[0] - start)
+    if first is not None:
+        stats.ttft.append(first - start)
+
+
+async def run(port: int, streams: int, filter, ramp: float, trace_memory: bool = False) -> dict:
+    """
+    Run the streams concurrently (started evenly over ramp seconds) and summarize them.
+    With trace_memory the peak of the traced allocations is measured, which slows the run down,
+    so the timings of such a run are not reported.
+    """
+    stats = RunStats()
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    await asyncio.gather(*(consume(port, seed, filter, stats, ramp * seed / streams) for seed in range(streams)))
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    def percentiles(values: list[int], scale: float) -> tuple[float, float, float]:
+        values = sorted(values) or [0]
+        return tuple(percentile(values, fraction) / scale for fraction in (0.5, 0.99, 1.0))
+
+    return {
+        "streams": streams,
+        "failed": stats.failed,
+        "stopped": stats.stopped,
+        "tokens_per_second": stats.tokens / wall,
+        "ttft_ms": percentiles(stats.ttft, 1e6),
+        "first_token_ms": percentiles(stats.first_token, 1e6),
+        "added_us": percentiles(stats.added, 1e3),
+        "hold_back_ms": percentiles(stats.hold_back, 1e6),
+        "held_pieces": len(stats.hold_back) / max(1, stats.pieces),
+        "cpu_per_stream_ms": cpu / streams * 1000,
+        "memory_per_stream_kib": None if peak is None else peak / streams / 1024,
+    }
+
+
+def print_report(results: dict[str, dict]):
+    def triple(values, digits=1):
+        return "/".join(f"{value:.{digits}f}" for value in values)
+
+    rows = (
+        ("failed streams", lambda r: f"{r['failed']}"),
+        ("stopped streams", lambda r: f"{r['stopped']}"),
+        ("tokens/s (all streams)", lambda r: f"{r['tokens_per_second']:,.0f}"),
+        ("first token p50/p99/max ms", lambda r: triple(r["first_token_ms"])),
+        ("TTFT p50/p99/max ms", lambda r: triple(r["ttft_ms"])),
+        ("per-token latency p50/p99/max µs", lambda r: triple(r["added_us"])),
+        ("hold-back delay p50/p99/max ms", lambda r: triple(r["hold_back_ms"])),
+        ("pieces released late", lambda r: f"{r['held_pieces']:.1%}"),
+        ("CPU per stream ms", lambda r: f"{r['cpu_per_stream_ms']:.2f}"),
+        ("memory per stream KiB", lambda r: "n/a" if r["memory_per_stream_kib"] is None else f"{r['memory_per_stream_kib']:.1f}"),
+    )
+    names = list(results)
+    print(f"  {'':<34}" + "".join(f"{name:>26}" for name in names))
+    for label, format_value in rows:
+        print(f"  {label:<34}" + "".join(f"{format_value(results[name]):>26}" for name in names))
+
+
+def load_test(profile: LoadProfile, streams: int = 1000, stop_list_size: int = 100, ramp: float = 1.0,
+              server_processes: int = 1, memory: bool = True) -> dict[str, dict]:
+    print("=== LOAD TEST ===\n")
+    _raise_file_limit()
+    stop_words = synthetic_phrases(stop_list_size, random.Random(3)) + [profile.stop_word]
+    filter = compile_stop_words(stop_words)
+    expected_stops = sum(generate_stream(profile, seed)[1] is not None for seed in range(streams))
+    print(f"Streams: {streams}, tokens per stream: {profile.tokens} ({profile.token_size}), rate: {profile.rate} tokens/s, "
+          f"stop words: {len(stop_words)}, streams with a stop word: {expected_stops}\n")
+
+    results = {}
+    with mock_servers(profile, server_processes) as port:
+        # Warm the server processes, the connection path and the lazily built transitions
+        asyncio.run(run(port, min(streams, 100), filter, ramp))
+        for name, run_filter in (("unfiltered", None), ("acut_stream_stop_words", filter)):
+            results[name] = asyncio.run(run(port, streams, run_filter, ramp))
+            if memory:
+                traced = asyncio.run(run(port, streams, run_filter, ramp, trace_memory=True))
+                results[name]["memory_per_stream_kib"] = traced["memory_per_stream_kib"]
+    print_report(results)
+    print("\n  The per-token latency runs from handing a token to the consumer until the next one is requested,")
+    print("  the difference of the two columns is what the filter adds. Memory is the traced peak of a separate run.")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, default=1000)
+    parser.add_argument("--tokens", type=int, default=200, help="tokens per stream")
+    parser.add_argument("--rate", type=float, default=20.0, help="tokens per second and stream, 0 for unpaced")
+    parser.add_argument("--first-token-delay", type=float, default=0.0, help="seconds before the first token")
+    parser.add_argument("--token-size", default="uniform:1-8", help="fixed:N, uniform:A-B or geometric:MEAN")
+    parser.add_argument("--stop-fraction", type=float, default=0.5, help="share of streams containing the stop word")
+    parser.add_argument("--stop-position", type=float, default=None, help="relative stop word position, random by default")
+    parser.add_argument("--stop-list-size", type=int, default=100)
+    parser.add_argument("--ramp", type=float, default=1.0, help="seconds over which the streams are started")
+    parser.add_argument("--server-processes", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced runs measuring memory per stream")
+    args = parser.parse_args()
+    load_test(LoadProfile(args.tokens, args.rate, args.first_token_delay, args.token_size,
+                          args.stop_fraction, args.stop_position),
+              args.streams, args.stop_list_size, args.ramp, args.server_processes, not args.no_memory)
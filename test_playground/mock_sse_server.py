@@ -0,0 +1,107 @@
+"""
+Local mock of the chat-completions SSE endpoint used by real_streaming_api.query,
+so the streaming path can be measured offline.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockSSEServer(ThreadingHTTPServer):
+    """
+    Streams the configured tokens as chat-completions chunks, one SSE event per token,
+    with token_delay seconds between them. HTTP/1.1 with chunked encoding, so connections
+    can be kept alive between requests.
+    """
+    daemon_threads = True
+
+    def __init__(self, tokens: list[str], token_delay: float = 0.0, address=("127.0.0.1", 0)):
+        super().__init__(address, MockSSEHandler)
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.events = [self.encode_event(index, token) for index, token in enumerate(tokens)]
+        self.sent_tokens = 0       # Tokens actually written to clients, stops growing on disconnect
+        self.connections = 0       # Accepted TCP connections
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def encode_event(index: int, token: str) -> bytes:
+        chunk = {"id": f"mock-{index}", "object": "chat.completion.chunk", "model": "mock",
+                 "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+        return b"data: " + json.dumps(chunk, ensure_ascii=False).encode("utf-8") + b"\n\n"
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def get_request(self):
+        with self.lock:
+            self.connections += 1
+        return super().get_request()
+
+
+class MockSSEHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        try:
+            if self.server.token_delay:
+                for event in self.server.events:
+                    time.sleep(self.server.token_delay)
+                    self.write_chunk(event)
+                    with self.server.lock:
+                        self.server.sent_tokens += 1
+            else:
+                # Without a delay the events are written in large chunks, so the server keeps up
+                batch = []
+                size = 0
+                for event in self.server.events:
+                    batch.append(event)
+                    size += len(event)
+                    if size >= 64 * 1024:
+                        self.write_chunk(b"".join(batch))
+                        with self.server.lock:
+                            self.server.sent_tokens += len(batch)
+                        batch = []
+                        size = 0
+                if batch:
+                    self.write_chunk(b"".join(batch))
+                    with self.server.lock:
+                        self.server.sent_tokens += len(batch)
+            self.write_chunk(b"data: [DONE]\n\n")
+            self.write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the connection, e.g. after a stop word
+            self.close_connection = True
+
+
+@contextmanager
+def mock_sse_server(tokens: list[str], token_delay: float = 0.0):
+    """
+    Run a MockSSEServer on a free local port for the duration of the block.
+    """
+    server = MockSSEServer(tokens, token_delay)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -1,42 +1,79 @@
 import os
-import json
 import sys
-from typing import Generator
-
-import requests
-import dotenv
+import time
+from typing import Generator, Iterator
 
 from stream_stopper import cut_stream_stop_words
 
-dotenv.load_dotenv("./.env")
+API_URL = "https://router.huggingface.co/v1/chat/completions"
 
+# One pooled client per endpoint, connections are kept alive between queries
+_clients = {}
 
 
-API_URL = "https://router.huggingface.co/v1/chat/completions"
-headers = {
-    "Authorization": f"Bearer {os.environ['HF_TOKEN']}",
-}
+def _client(api_url: str):
+    """
+    Pooled client of the endpoint. dotenv, requests and HF_TOKEN are loaded on the first query,
+    importing this module does not touch the network libraries or the environment.
+    """
+    client = _clients.get(api_url)
+    if client is None:
+        import dotenv
+        from stream_http import StreamingChatClient
+
+        dotenv.load_dotenv("./.env")
+        client = _clients[api_url] = StreamingChatClient(api_url, token=os.environ.get("HF_TOKEN"))
+    return client
 
-def query(payload):
-    response = requests.post(API_URL, headers=headers, json=payload, stream=True)
-    for line in response.iter_lines():
-        if not line.startswith(b"data:"):
-            continue
-        if line.strip() == b"data: [DONE]":
-            return
-        yield json.loads(line.decode("utf-8").lstrip("data:").rstrip("/n"))
+
+def query(payload, api_url=API_URL):
+    # Closing the generator (e.g. cut_stream_stop_words after a stop word) closes the HTTP connection
+    yield from _client(api_url).stream_chunks(payload)
 
 
 def token_stream_from_chunks(chunks: Generator) -> Generator[str, None, None]:
     """Convert API response chunks to token stream."""
-    for chunk in chunks:
-        try:
-            content = chunk["choices"][0]["delta"]["content"]
-            if content:  # Skip empty content
-                yield content
-        except (KeyError, IndexError, TypeError):
-            # Handle malformed chunks gracefully
-            continue
+    try:
+        for chunk in chunks:
+            try:
+                content = chunk["choices"][0]["delta"]["content"]
+                if content:  # Skip empty content
+                    yield content
+            except (KeyError, IndexError, TypeError):
+                # Handle malformed chunks gracefully
+                continue
+    finally:
+        # Propagate cancellation to the HTTP response
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+class StreamRecorder:
+    """
+    Tee for a token stream: records the unfiltered tokens as they pass through to the filter,
+    so the original text is available for comparison without a second pass.
+    Closing the recorder closes the upstream.
+    """
+
+    def __init__(self, token_stream: Iterator[str]):
+        self.token_stream = iter(token_stream)
+        self.tokens = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        token = next(self.token_stream)
+        self.tokens.append(token)
+        return token
+
+    def close(self):
+        if hasattr(self.token_stream, "close"):
+            self.token_stream.close()
+
+    @property
+    def text(self) -> str:
+        return "".join(self.tokens)
 
 
 def test_stopwords(stop_words=("HOTOVO!", "stopni", "Praha"),
@@ -61,12 +98,11 @@ def test_stopwords(stop_words=("HOTOVO!", "stopni", "Praha"),
         "stream": True,
     })
 
-    # Create two parallel streams - one for filtering, one for collecting filtered text
-    all_chunks = list(chunks)  # Collect all chunks first
+    # Chunks flow straight through the filter, the recorder keeps the unfiltered tokens
+    recorder = StreamRecorder(token_stream_from_chunks(chunks))
 
     # Stream 1: Display filtered tokens in real-time
-    token_stream = token_stream_from_chunks(iter(all_chunks))
-    filtered_stream = cut_stream_stop_words(token_stream, list(stop_words))
+    filtered_stream = cut_stream_stop_words(recorder, list(stop_words))
 
     filtered_text = ""
     for token in filtered_stream:
@@ -78,17 +114,8 @@ def test_stopwords(stop_words=("HOTOVO!", "stopni", "Praha"),
     # Stream 2: Show what was filtered out via stderr
     print(f"Filtered text: '{filtered_text}'", file=sys.stderr)
 
-    # Show full unfiltered text for comparison
-    full_text = ""
-    for chunk in all_chunks:
-        try:
-            content = chunk["choices"][0]["delta"]["content"]
-            if content:
-                full_text += content
-        except:
-            continue
-
-    print(f"Original full text: '{full_text}'", file=sys.stderr)
+    # Show unfiltered text for comparison, generation was cancelled at the stop word
+    print(f"Original received text: '{recorder.text}'", file=sys.stderr)
     print(f"Stop words used: {list(stop_words)}", file=sys.stderr)
 
 
@@ -126,12 +153,9 @@ def advanced_test_stopwords():
         print("🤖 AI Response (filtered):")
         print("-" * 40)
 
-        # Collect all chunks for dual processing
-        all_chunks = list(chunks)
-
-        # Stream 1: Filtered display
-        token_stream = token_stream_from_chunks(iter(all_chunks))
-        filtered_stream = cut_stream_stop_words(token_stream, stop_words)
+        # Stream 1: Filtered display, the recorder keeps the unfiltered tokens
+        recorder = StreamRecorder(token_stream_from_chunks(chunks))
+        filtered_stream = cut_stream_stop_words(recorder, stop_words)
 
         filtered_text = ""
         token_count = 0
@@ -149,17 +173,8 @@ def advanced_test_stopwords():
         # Stream 2: Show filtered text and original via stderr
         print(f"Filtered text: '{filtered_text}'", file=sys.stderr)
 
-        # Show full text
-        full_text = ""
-        for chunk in all_chunks:
-            try:
-                content = chunk["choices"][0]["delta"]["content"]
-                if content:
-                    full_text += content
-            except:
-                continue
-
-        print(f"Original full text: '{full_text}'", file=sys.stderr)
+        # Show received text, generation was cancelled at the stop word
+        print(f"Original received text: '{recorder.text}'", file=sys.stderr)
 
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -185,28 +200,13 @@ def demo_comparison():
         "max_tokens": 300
     })
 
-    # Collect all tokens first (for demo purposes)
-    all_chunks = list(chunks)
+    # Filter while streaming, the upstream is kept open to show the unfiltered rest afterwards
+    recorder = StreamRecorder(token_stream_from_chunks(chunks))
 
-    print("🚫 UNFILTERED OUTPUT:")
-    print("-" * 50)
-    full_text = ""
-    for chunk in all_chunks:
-        try:
-            content = chunk["choices"][0]["delta"]["content"]
-            if content:
-                print(content, end="", flush=True)
-                full_text += content
-        except:
-            continue
-
-    print("\n\n")
     print("✅ FILTERED OUTPUT:")
     print("-" * 50)
 
-    # Reset and filter
-    token_stream = token_stream_from_chunks(iter(all_chunks))
-    filtered_stream = cut_stream_stop_words(token_stream, stop_words)
+    filtered_stream = cut_stream_stop_words(recorder, stop_words, close_upstream=False)
 
     filtered_text = ""
     for token in filtered_stream:
@@ -215,9 +215,40 @@ def demo_comparison():
 
     print(f"\n\n🛑 Stopped at stop words: {stop_words}")
 
+    print("\n\n")
+    print("🚫 UNFILTERED OUTPUT:")
+    print("-" * 50)
+    print(recorder.text, end="", flush=True)
+    for token in recorder:
+        print(token, end="", flush=True)
+    full_text = recorder.text
+    print()
+
     # Show comparison via stderr
     print(f"Filtered text: '{filtered_text}'", file=sys.stderr)
     print(f"Original full text: '{full_text}'", file=sys.stderr)
     print(f"Characters filtered out: {len(full_text) - len(filtered_text)}", file=sys.stderr)
 
 
+def measure_streaming_latency(api_url: str, stop_words: list[str], payload: dict | None = None) -> dict:
+    """
+    Time to first token and total latency of the filtered stream, streaming straight through
+    the filter versus collecting all chunks with list() first. Use with the local mock SSE server.
+    """
+    payload = payload or {"messages": [], "model": "mock", "stream": True}
+    results = {}
+
+    for mode in ("collected", "streaming"):
+        start = time.perf_counter()
+        chunks = query(payload, api_url=api_url)
+        if mode == "collected":
+            chunks = iter(list(chunks))
+
+        first_token = None
+        for _ in cut_stream_stop_words(token_stream_from_chunks(chunks), stop_words):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+
+        results[mode] = {"ttft": first_token, "total": time.perf_counter() - start}
+
+    return results
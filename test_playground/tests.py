@@ -203,38 +203,1006 @@ def test_enhanced_algorithm():
     print(f"Expected: 25000 tokens (stops at STOP_WORD)\n")
 
 
-def benchmark_algorithm():
-    """Benchmark for performance comparison"""
-    import time
+def benchmark_algorithm(scale=0.1, repetitions=3):
+    """Quick run of the benchmark suite, compared with the stored baseline"""
+    import json
+    import os
+    from test_playground.benchmark_suite import BASELINE_PATH, compare_with_baseline, print_results, run_suite
 
     print("=== BENCHMARK TESTS ===\n")
 
-    # Test 1: Different numbers of stop words
-    print("Benchmark 1: Effect of number of stop words on performance")
+    results = run_suite(scale, repetitions)
+
+    baseline = None
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+
+    if baseline:
+        regressions = compare_with_baseline(results, baseline)
+        print(f"\nRegressions against the baseline: {regressions or 'none'}")
+    print("Full suite: python -m test_playground.benchmark_suite --baseline test_playground/benchmark_baseline.json\n")
+
+
+def test_reference_equivalence():
+    """Compare the streaming matcher with the original whole-buffer rescan on random streams"""
+    import random
+    from test_playground import reference_stream_stopper
+
+    print("=== REFERENCE EQUIVALENCE TEST ===\n")
+
+    random.seed(7)
+    alphabet = "abcd "
+    mismatches = 0
+    runs = 2000
+
+    for _ in range(runs):
+        stop_words = ["".join(random.choice(alphabet) for _ in range(random.randint(1, 6)))
+                      for _ in range(random.randint(1, 5))]
+        text = "".join(random.choice(alphabet) for _ in range(random.randint(0, 60)))
+
+        tokens = []
+        i = 0
+        while i < len(text):
+            token_len = random.randint(1, 8)
+            tokens.append(text[i:i + token_len])
+            i += token_len
+
+        expected = list(reference_stream_stopper.cut_stream_stop_words(iter(tokens), stop_words))
+        # Unsplit emission keeps the original token boundaries, split emission the same text
+        result = list(cut_stream_stop_words(iter(tokens), stop_words, split_tokens=False))
+        split_text = "".join(cut_stream_stop_words(iter(tokens), stop_words))
+        if result != expected or split_text != "".join(expected):
+            mismatches += 1
+            print(f"Mismatch: tokens={tokens}, stop words={stop_words}, result={result}, expected={expected}")
+
+    print(f"Random streams: {runs}")
+    print(f"Mismatches: {mismatches}")
+    print("Expected: 0 mismatches\n")
+
+
+def test_compiled_filter_cache():
+    """Compiled filters are shared between streams and threads"""
+    from concurrent.futures import ThreadPoolExecutor
+    from stream_stopper import compile_stop_words, compile_cache_info, clear_compile_cache
+
+    print("=== COMPILED FILTER CACHE TEST ===\n")
+
+    clear_compile_cache()
+    tokens = ["Ah", "oj, ", "sv", "ete", "!"]
+
+    # The same list in a different order and with duplicates maps to one compiled filter
+    for stop_words in (["svet", "spam"], ["spam", "svet"], ["svet", "spam", "svet"]):
+        result = list(cut_stream_stop_words(iter(tokens), stop_words))
+    print(f"Result: {result}")
+    print(f"Cache: {compile_cache_info()}")
+    print("Expected: 1 miss, 2 hits\n")
+
+    # One precompiled filter used by many concurrent streams
+    filter = compile_stop_words(["svet"])
+
+    def run_stream(_):
+        return "".join(cut_stream_stop_words(iter(tokens), filter))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = set(executor.map(run_stream, range(1000)))
+
+    print(f"Distinct results of 1000 threaded streams: {results}")
+    print("Expected: {'Ahoj, '}\n")
+
+
+def test_async_algorithm(stream_count=5000):
+    """Many concurrent asyncio streams filtered on one event loop"""
+    import asyncio
+    import random
+    import time
+    from stream_stopper import acut_stream_stop_words, compile_stop_words
+
+    print("=== ASYNC STREAMS TEST ===\n")
+
+    random.seed(11)
+    stop_words = compile_stop_words(["STOP", "konec"])
+    words = ["ahoj", " svete", " STO", "P", " kon", "ec", " data", " token", " !"]
+    streams = [[random.choice(words) for _ in range(random.randint(1, 40))] for _ in range(stream_count)]
+    closed_upstreams = 0
+
+    async def simulated_stream(tokens):
+        nonlocal closed_upstreams
+        try:
+            for token in tokens:
+                await asyncio.sleep(0)  # Hand over to the other streams
+                yield token
+        except GeneratorExit:
+            closed_upstreams += 1
+            raise
+
+    async def consume(tokens):
+        return [token async for token in acut_stream_stop_words(simulated_stream(tokens), stop_words)]
+
+    async def run_all():
+        return await asyncio.gather(*(consume(tokens) for tokens in streams))
+
+    start = time.time()
+    results = asyncio.run(run_all())
+    elapsed = time.time() - start
+
+    expected = [list(cut_stream_stop_words(iter(tokens), stop_words)) for tokens in streams]
+    stopped = sum(1 for tokens, result in zip(streams, results) if "".join(result) != "".join(tokens))
+
+    print(f"Concurrent streams: {stream_count}, elapsed: {elapsed:.3f}s")
+    print(f"Results identical to the sync filter: {results == expected}")
+    print(f"Streams cut by a stop word: {stopped}, upstreams cancelled: {closed_upstreams}")
+    print("Expected: identical results, every cut stream cancels its upstream\n")
+
+
+def test_stop_event_and_cancellation():
+    """The stop event carries the matched word and offsets, the upstream generator is closed"""
+    print("=== STOP EVENT AND CANCELLATION TEST ===\n")
+
+    produced = []
+    closed = []
+
+    def llm_stream():
+        try:
+            for token in ["Ah", "oj, ", "sv", "ete", "!", " toto", " se", " už", " nezobrazuje"]:
+                produced.append(token)
+                yield token
+        finally:
+            closed.append(True)
+
+    events = []
+    result = list(cut_stream_stop_words(llm_stream(), ["svet"], on_stop=events.append))
+    print(f"Result: {result}")
+    print(f"Stop event: {events}")
+    print(f"Produced tokens: {produced}, upstream closed: {bool(closed)}")
+    print("Expected: StopEvent(stop_word='svet', start=6, end=10), generation stops after 'ete'\n")
+
+
+def test_mock_streaming_latency():
+    """TTFT and total latency of the real streaming path against the local mock SSE server"""
+    import time
+    from test_playground.mock_sse_server import mock_sse_server
+    from test_playground.real_streaming_api import measure_streaming_latency
+
+    print("=== MOCK SSE STREAMING LATENCY TEST ===\n")
+
+    tokens = ["Praha", " je", " hlavní", " město", " Česka", "."] * 10 + [" HOTOVO!", " toto", " se", " už", " nezobrazuje"] * 10
+    with mock_sse_server(tokens, token_delay=0.005) as server:
+        results = measure_streaming_latency(server.url, ["HOTOVO!"])
+        time.sleep(0.1)  # Let the server notice the closed connection
+        sent_tokens = server.sent_tokens
+
+    for mode, timings in results.items():
+        print(f"  {mode:<10} TTFT: {timings['ttft'] * 1000:7.1f} ms, total: {timings['total'] * 1000:7.1f} ms")
+    print(f"Tokens sent by the server: {sent_tokens} of {2 * len(tokens)}")
+    print("Expected: streaming TTFT of a few token delays, collected TTFT equal to the whole generation;")
+    print("          the streaming request is cancelled shortly after HOTOVO!\n")
+
+
+def test_sse_parser():
+    """Incremental SSE parsing of byte chunks split at arbitrary positions"""
+    import json
+    import random
+    from sse import SSEParser, extract_content
+
+    print("=== SSE PARSER TEST ===\n")
+
+    contents = ["Ahoj", " světe", " 😊", "data:", "\"quoted\"", "line\nbreak", "", None, "tail"]
+    events = []
+    for content in contents:
+        chunk = {"choices": [{"index": 0, "delta": {"role": "assistant", "content": content}}]}
+        events.append(b"data: " + json.dumps(chunk, ensure_ascii=False).encode("utf-8"))
+    body = b": keep-alive comment\r\n\r\n" + b"\r\n\r\n".join(events) + b"\n\ndata:[DONE]\n\n"
+
+    random.seed(3)
+    failures = 0
+    for _ in range(200):
+        parser = SSEParser()
+        parsed = []
+        position = 0
+        while position < len(body):
+            size = random.randint(1, 20)
+            parsed.extend(parser.feed(body[position:position + size]))
+            position += size
+        if [extract_content(data) for data in parsed[:-1]] != contents or parsed[-1] != b"[DONE]":
+            failures += 1
+
+    print(f"Parsed contents: {[extract_content(data) for data in parsed[:-1]]}")
+    print(f"Random splits with a wrong result: {failures}")
+    print("Expected: the original contents and 0 wrong results\n")
+
+
+def test_batch_filtering():
+    """Batch and interleaved filtering give the same text as one generator per stream"""
+    import random
+    from batch_filter import filter_batch, filter_interleaved
+
+    print("=== BATCH FILTERING TEST ===\n")
+
+    random.seed(5)
+    stop_words = ["abcd", "bc", "dd"]
+    streams = []
+    for _ in range(3000):
+        text = "".join(random.choice("abcde ") for _ in range(random.randint(0, 40)))
+        tokens = []
+        i = 0
+        while i < len(text):
+            token_len = random.randint(1, 6)
+            tokens.append(text[i:i + token_len])
+            i += token_len
+        streams.append(tokens)
+
+    expected = ["".join(cut_stream_stop_words(iter(tokens), stop_words)) for tokens in streams]
+
+    batch_results = filter_batch(streams, stop_words)
+
+    # Round-robin interleaving of all streams, like a replayed server log
+    events = []
+    for position in range(max(len(tokens) for tokens in streams)):
+        for stream_id, tokens in enumerate(streams):
+            if position < len(tokens):
+                events.append((stream_id, tokens[position]))
+    interleaved_results = filter_interleaved(events, stop_words)
+
+    print(f"Streams: {len(streams)}, cut: {sum(result.cut is not None for result in batch_results)}")
+    print(f"Batch equal to cut_stream_stop_words: {[r.text for r in batch_results] == expected}")
+    # Empty streams produce no events
+    interleaved_equal = all(interleaved_results[stream_id].text == expected[stream_id] for stream_id in interleaved_results)
+    print(f"Interleaved equal to cut_stream_stop_words: {interleaved_equal}, "
+          f"streams seen: {len(interleaved_results)} of {sum(1 for tokens in streams if tokens)}")
+    print("Expected: True, True and all non-empty streams seen\n")
+
+
+def test_parallel_filtering():
+    """Corpus filtering on a process pool keeps the file order and the results of filter_batch"""
+    import json
+    import os
+    import tempfile
+    from batch_filter import filter_batch
+    from parallel_filter import filter_corpus
+    from test_playground.benchmark_batch import generate_corpus
+
+    print("=== PARALLEL CORPUS FILTERING TEST ===\n")
+
+    stop_words = ["HOTOVO!", "Vltava"]
+    corpus = generate_corpus(5000)
+    expected = [(result.cut, result.stop_word) for result in filter_batch(corpus, stop_words)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "corpus.jsonl")
+        with open(path, "w", encoding="utf-8") as file:
+            for tokens in corpus:
+                file.write(json.dumps({"response": {"tokens": tokens}}, ensure_ascii=False) + "\n")
+
+        stats = {}
+        results = list(filter_corpus(path, stop_words, field="response.tokens", workers=2, batch_size=300, stats=stats))
+
+        # Closing the generator early still reports what was read
+        partial_stats = {}
+        partial = filter_corpus(path, stop_words, field="response.tokens", workers=2, batch_size=300, stats=partial_stats)
+        for _ in range(10):
+            next(partial)
+        partial.close()
+
+        # Two corpora filtered at the same time keep their own filters
+        other_words = ["Praha"]
+        other_expected = [(result.cut, result.stop_word) for result in filter_batch(corpus, other_words)]
+        first = filter_corpus(path, stop_words, field="response.tokens", workers=2, batch_size=300)
+        second = filter_corpus(path, other_words, field="response.tokens", workers=2, batch_size=300)
+        interleaved = list(zip(first, second))
+        concurrent = ([(a["cut"], a["stop_word"]) for a, _ in interleaved] == expected
+                      and [(b["cut"], b["stop_word"]) for _, b in interleaved] == other_expected)
+
+    print(f"Records: {stats['records']}, throughput: {stats['records'] / stats['seconds']:,.0f} records/s")
+    print(f"In file order: {[result['record'] for result in results] == list(range(len(corpus)))}")
+    print(f"Equal to filter_batch: {[(result['cut'], result['stop_word']) for result in results] == expected}")
+    print(f"Closed early: {partial_stats.get('records')} records, concurrent calls equal to filter_batch: {concurrent}")
+    print("Expected: True, True, 10 records, True\n")
+
+
+def test_filter_metrics():
+    """Instrumented filtering gives the same output and reports tokens, delays and matches"""
+    import urllib.request
+    from stream_metrics import InMemoryMetrics, PrometheusMetrics, serve_metrics
+
+    print("=== FILTER METRICS TEST ===\n")
+
+    tokens = ["Ahoj", " světe", ", tady", " je", " HOTO", "VO!", " konec"]
+    expected = "".join(cut_stream_stop_words(iter(tokens), ["HOTOVO!"]))
+
+    metrics = InMemoryMetrics()
+    text = "".join(cut_stream_stop_words(iter(tokens), ["HOTOVO!"], metrics=metrics))
+    summary = metrics.summary()
+    print(f"Same output: {text == expected}")
+    print(f"Tokens recorded: {summary['token_seconds']['count']}, emit delays: {summary['emit_delay_seconds']['count']}, "
+          f"nodes visited: {summary['nodes_visited']['sum']}")
+    print(f"Held back p99: {summary['held_back_characters']['p99']} characters, matches: {summary['matches']}")
+    print("Expected: True, 6 tokens, 5 emit delays (the last one is the part before HOTOVO!), HOTOVO! matched once\n")
+
+    # " HOT" is split at the safe boundary, its head and tail are one emit delay
+    split_tokens = ["Ahoj světe, tady je dlouhý token", " HOT", "OVÝ", " konec"]
+    metrics = InMemoryMetrics()
+    pieces = list(cut_stream_stop_words(iter(split_tokens), ["HOTOVO!"], metrics=metrics))
+    summary = metrics.summary()
+    print(f"Pieces: {len(pieces)}, tokens recorded: {summary['token_seconds']['count']}, "
+          f"emit delays: {summary['emit_delay_seconds']['count']}")
+    print("Expected: 5 pieces, 4 tokens, 4 emit delays\n")
+
+    prometheus = PrometheusMetrics()
+    for _ in range(3):
+        "".join(cut_stream_stop_words(iter(tokens), ["HOTOVO!", "konec"], metrics=prometheus))
+    server = serve_metrics(prometheus, port=0)
+    try:
+        host, port = server.server_address[:2]
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            exposition = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
+    print(f"Prometheus lines: {len(exposition.splitlines())}")
+    print(f"Match counter: {[line for line in exposition.splitlines() if line.startswith('stream_stopper_matches_total{')]}")
+    print('Expected: [\'stream_stopper_matches_total{stop_word="HOTOVO!"} 3\']\n')
+
+
+def test_minimal_hold_back():
+    """Only the live prefix of the automaton is held back instead of max_length - 1 characters"""
+    import random
+    from stream_stopper import StreamCutter, compile_stop_words
+
+    print("=== MINIMAL HOLD-BACK TEST ===\n")
+
+    random.seed(11)
+    text = ("Prezident České republiky dnes podepsal nový zákon o digitalizaci. "
+            "Změny se dotknou všech občanů a budou platit od příštího roku. ") * 20
+    tokens = []
+    i = 0
+    while i < len(text):
+        token_len = random.randint(1, 6)
+        tokens.append(text[i:i + token_len])
+        i += token_len
+    # One 200 character phrase used to delay every stream by 199 characters
+    filter = compile_stop_words(["HOTOVO!", "toto se už nezobrazuje uživateli " * 6])
+
+    def mean_hold_back(live_prefix, split_tokens):
+        cutter = StreamCutter(filter, split_tokens)
+        cutter.live_prefix = live_prefix
+        held_back = 0
+        emitted = []
+        for token in tokens:
+            emitted += cutter.push(token)
+            held_back += cutter.matcher.offset - cutter.base
+        emitted += cutter.flush()
+        assert "".join(emitted) == text
+        return held_back / len(tokens)
+
+    print(f"Longest stop word: {filter.max_length} characters, tokens: {len(tokens)}")
+    print(f"Mean hold-back, max_length boundary: {mean_hold_back(False, False):.1f} characters")
+    print(f"Mean hold-back, live prefix: {mean_hold_back(True, False):.1f} characters")
+    print(f"Mean hold-back, live prefix with split tokens: {mean_hold_back(True, True):.2f} characters")
+    print("Expected: ~200 characters before, below 1 character with the live prefix\n")
+
+
+def test_normalized_matching():
+    """Case, Unicode form and diacritics insensitive stop words cut the original stream exactly"""
+    import random
+    import unicodedata
+    from stream_stopper import compile_stop_words
+
+    print("=== NORMALIZED MATCHING TEST ===\n")
+
+    filter = compile_stop_words(["Praha", "ceska republika"], casefold=True, strip_diacritics=True)
+    streams = {
+        "upper case": ["Jedu do PRA", "HA a ", "pak dál"],
+        "diacritics": ["Vítá vás Čes", "ká ", "republika!"],
+        "NFD input": [unicodedata.normalize("NFD", "Vítá vás "), unicodedata.normalize("NFD", "ČESKÁ republika")],
+    }
+    for name, tokens in streams.items():
+        events = []
+        result = "".join(cut_stream_stop_words(iter(tokens), filter, on_stop=events.append))
+        print(f"{name}: {result!r}, {events}")
+    print("Expected: 'Jedu do ', 'Vítá vás ' and the NFD 'Vítá vás ', cut at the original offsets\n")
+
+    # Case folding of a random stream must cut where the plain filter cuts the lower-cased stream
+    random.seed(13)
+    mismatches = 0
+    for _ in range(2000):
+        stop_words = ["".join(random.choice("abAB ") for _ in range(random.randint(1, 4)))
+                      for _ in range(random.randint(1, 3))]
+        text = "".join(random.choice("abAB ") for _ in range(random.randint(0, 40)))
+        tokens = [text[i:i + 3] for i in range(0, len(text), 3)]
+        folded = "".join(cut_stream_stop_words(iter(tokens), compile_stop_words(stop_words, casefold=True)))
+        lowered = "".join(cut_stream_stop_words(iter([token.lower() for token in tokens]),
+                                                [word.lower() for word in stop_words]))
+        mismatches += len(folded) != len(lowered)
+    print(f"Case folding mismatches: {mismatches}")
+    print("Expected: 0 mismatches\n")
+
+
+def test_pattern_filter():
+    """Regex stop patterns run as a streaming DFA and cut like the brute force regex search"""
+    import random
+    import re
+    from batch_filter import filter_batch
+    from pattern_filter import PatternFilter
+
+    print("=== PATTERN FILTER TEST ===\n")
+
+    filter = PatternFilter([r"STOP\s*!+", r"<\|im_end\|>", r"(?:HOTOVO|KONEC)\n", r"[0-9]{3}-[0-9]{4}"])
+    print(f"Pattern max lengths: {filter.pattern_max_lengths}, hold-back bound: {filter.max_length}")
+    streams = [
+        ["Odpověď je hotová ST", "OP  ", "!!", " a dál"],
+        ["Konec odpovědi<|im", "_end|>", "další text"],
+        ["Všechno je HOTOVO", "\n", "Skrytý text"],
+        ["Volejte 555-", "12", "34 kdykoliv"],
+    ]
+    for tokens in streams:
+        events = []
+        result = "".join(cut_stream_stop_words(iter(tokens), filter, on_stop=events.append))
+        print(f"{result!r} {events[0] if events else None}")
+    print("Expected: cut before STOP, <|im_end|>, HOTOVO and 555-1234\n")
+
+    # Brute force: the first token where any match ends, the earliest start, the shortest end
+    random.seed(17)
+    atoms = ["a", "b", "[ab]", "[^a]", ".", "\\s", "(?:ab|c)"]
+    quantifiers = ["", "", "?", "+", "*", "{2}", "{1,3}"]
+    mismatches = flushes = 0
+    runs = 1000
+    for _ in range(runs):
+        patterns = []
+        while len(patterns) < 2:
+            pattern = "".join(random.choice(atoms) + random.choice(quantifiers) for _ in range(random.randint(1, 3)))
+            if not re.fullmatch(pattern, ""):
+                patterns.append(pattern)
+        text = "".join(random.choice("abc d") for _ in range(random.randint(0, 30)))
+        tokens = [text[i:i + 4] for i in range(0, len(text), 4)]
+
+        expected = text
+        compiled = [re.compile(pattern) for pattern in patterns]
+        for index in range(len(tokens)):
+            token_start, token_end = 4 * index, min(4 * index + 4, len(text))
+            starts = [start for start in range(token_end)
+                      if any(c.fullmatch(text, start, end) for c in compiled
+                             for end in range(max(start, token_start) + 1, token_end + 1))]
+            if starts:
+                expected = text[:starts[0]]
+                break
+
+        result = "".join(cut_stream_stop_words(iter(tokens), PatternFilter(patterns, unbounded_limit=64)))
+        batch = filter_batch([tokens], PatternFilter(patterns, unbounded_limit=64))[0].text
+        # A cache of 4 states is flushed on almost every new state
+        small = PatternFilter(patterns, unbounded_limit=64, state_limit=4)
+        flushed = "".join(cut_stream_stop_words(iter(tokens), small))
+        flushes += small.dfa.flushes + small.anchored_dfa.flushes
+        mismatches += result != expected or batch != expected or flushed != expected
+    print(f"Random pattern streams: {runs}, mismatches: {mismatches}, flushes with state_limit=4: {flushes > 0}")
+    print("Expected: 0 mismatches, True\n")
+
+
+def test_token_id_filter():
+    """Stop words matched on token IDs cut where the decoded text stream is cut"""
+    import codecs
+    import json
+    import os
+    import random
+    import tempfile
+    from token_filter import TokenIdFilter, _byte_level_decoder, cut_token_ids, load_vocabulary
+
+    print("=== TOKEN ID FILTER TEST ===\n")
+
+    # tokenizer.json with a byte level BPE vocabulary: all bytes and a few Czech words
+    byte_chars = {byte: char for char, byte in _byte_level_decoder().items()}
+    pieces = sorted({bytes([byte]) for byte in range(256)}
+                    | {piece.encode("utf-8") for piece in (" HOT", "OVO", "!", " Praha", " je", " krásná", "ř", " ř")})
+    tokenizer = {
+        "model": {"type": "BPE", "vocab": {"".join(byte_chars[byte] for byte in piece): index
+                                           for index, piece in enumerate(pieces)}},
+        "added_tokens": [{"id": len(pieces), "content": "<|im_end|>", "special": True}],
+        "pre_tokenizer": {"type": "ByteLevel"},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tokenizer.json")
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(tokenizer, file, ensure_ascii=False)
+        vocabulary = load_vocabulary(path)
+
+    filter = TokenIdFilter(["HOTOVO!", "<|im_end|>", "řeka"], vocabulary)
+    print(f"Pre-tokenized variants of 'HOTOVO!': {len(filter.variants['HOTOVO!'])}")
+    # Without memoized transitions every token ID is scanned as text
+    uncached = TokenIdFilter(filter.filter, vocabulary, transition_limit=0)
+
+    random.seed(19)
+    mismatches = 0
+    runs = 2000
+    for _ in range(runs):
+        token_ids = [random.randrange(len(vocabulary)) if random.random() < 0.1
+                     else vocabulary.token_bytes.index(random.choice(pieces[-8:] + [b"e", b"k", b"a", "ř".encode()[:1]]))
+                     for _ in range(random.randint(0, 30))]
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        texts = [decoder.decode(vocabulary.token_bytes[token_id]) for token_id in token_ids]
+        texts.append(decoder.decode(b"", final=True))
+        # Streams with invalid UTF-8 decode differently token by token, they are not compared
+        expected = "".join(cut_stream_stop_words(iter(texts), filter.filter))
+        if "�" in expected:
+            continue
+        emitted = list(cut_token_ids(iter(token_ids), filter))
+        text = vocabulary.decode(item for item in emitted if isinstance(item, int))
+        text += "".join(item for item in emitted if isinstance(item, str))
+        mismatches += text != expected or list(cut_token_ids(iter(token_ids), uncached)) != emitted
+    print(f"Random token ID streams: {runs}, mismatches: {mismatches}, "
+          f"memoized with transition_limit=0: {uncached.cached_transitions}")
+    print("Expected: 0 mismatches, 0\n")
+
+
+def test_stop_list_registry():
+    """Registry lists updated at runtime cut like freshly built filters, running streams keep their snapshot"""
+    import random
+    from stop_list_registry import StopListRegistry
+    from stream_stopper import StopWordFilter
+
+    print("=== STOP LIST REGISTRY TEST ===\n")
+
+    random.seed(23)
+    registry = StopListRegistry()
+    lists = {}
+    mismatches = 0
+    updates = 400
+    published = []  # Views taken before an update and the words they must keep
+    for _ in range(updates):
+        name = random.choice(["customer-a", "customer-b", "customer-c"])
+        words = ["".join(random.choice("abc") for _ in range(random.randint(1, 4))) for _ in range(random.randint(1, 3))]
+        if name in lists:
+            published.append((registry.view(name), set(lists[name])))
+        operation = random.random()
+        if operation < 0.55:
+            registry.add(name, words)
+            lists.setdefault(name, set()).update(words)
+        elif operation < 0.9:
+            registry.remove(name, words)
+            lists.get(name, set()).difference_update(words)
+        else:
+            registry.drop(name)
+            lists.pop(name, None)
+
+        name = random.choice(["customer-a", "customer-b", "customer-c"])
+        words = sorted(lists.get(name, ()))
+        text = "".join(random.choice("abcd") for _ in range(random.randint(0, 25)))
+        tokens = [text[i:i + 3] for i in range(0, len(text), 3)]
+        view = registry.view(name)
+        expected = list(cut_stream_stop_words(iter(tokens), StopWordFilter(words)))
+        mismatches += set(view.stop_words) != set(words) or list(cut_stream_stop_words(iter(tokens), view)) != expected
+    print(f"Random updates: {updates}, mismatches with a rebuilt StopWordFilter: {mismatches}")
+    print("Expected: 0 mismatches")
+    changed = sum(set(view.stop_words) != words for view, words in published)
+    print(f"Views taken before an update: {len(published)}, changed by later updates: {changed}")
+    print("Expected: 0 changed")
+
+    # A multi-word add extends a published node, the second word must not write into its children
+    registry = StopListRegistry()
+    registry.add("customer-a", ["abq"])
+    old = registry.view("customer-a")
+    registry.add("customer-a", ["ab", "abc"])
+    registry.remove("customer-a", ["ab", "abc"])
+    result = "".join(cut_stream_stop_words(iter(["x abc y"]), old))
+    print(f"View before add/remove: {old.stop_words}, cut: {result!r}")
+    print("Expected: ('abq',), 'x abc y'")
+
+    registry = StopListRegistry()
+    registry.add("customer-a", ["HOTOVO!"])
+    stream = cut_stream_stop_words(iter(["Praha ", "je ", "HOT", "OVO", "! ", "stopni"]), registry.view("customer-a"))
+    first = next(stream)
+    registry.remove("customer-a", ["HOTOVO!"])
+    registry.add("customer-a", ["stopni"])
+    result = first + "".join(stream)
+    print(f"Stream started before the update: {result!r}")
+    print("Expected: 'Praha je ' (the update applies to new streams only)")
+    result = "".join(cut_stream_stop_words(iter(["Praha ", "je ", "HOT", "OVO", "! ", "stopni"]), registry.view("customer-a")))
+    print(f"Stream started after the update: {result!r}")
+    print("Expected: 'Praha je HOTOVO! '")
+
+    # A long periodic word has a failure chain as long as the word, it is walked without recursion
+    registry = StopListRegistry()
+    registry.add("customer-a", ["=-" * 1000, "-=x"])
+    text = "=-" * 999 + "=x"
+    tokens = [text[i:i + 7] for i in range(0, len(text), 7)]
+    result = "".join(cut_stream_stop_words(iter(tokens), registry.view("customer-a")))
+    expected = "".join(cut_stream_stop_words(iter(tokens), StopWordFilter(["=-" * 1000, "-=x"])))
+    print(f"Periodic word of 2000 characters: {len(result)} characters emitted, same as StopWordFilter: {result == expected}")
+    print("Expected: 1997 characters emitted, True\n")
+
+
+def test_redaction():
+    """Every occurrence is masked, removed or reported without overlaps, by either policy"""
+    import random
+    from stream_redactor import redact_stream
+    from stream_stopper import compile_stop_words
+
+    print("=== REDACTION TEST ===\n")
+
+    tokens = ["Moje heslo je hes", "lo123, PIN 55", "55 a heslo", "123 znovu."]
+    events = []
+    result = "".join(redact_stream(iter(tokens), ["heslo123", "5555"], on_match=events.append))
+    print(f"mask:   {result!r}")
+    print("Expected: 'Moje heslo je ********, PIN **** a ******** znovu.'")
+    result = "".join(redact_stream(iter(tokens), ["heslo123", "5555"], mode="remove"))
+    print(f"remove: {result!r}")
+    print(f"report: {[(event.stop_word, event.start, event.end) for event in events]}")
+    print("Expected: 3 matches at their stream offsets\n")
+
+    result = "".join(redact_stream(iter(["she sells"]), ["he", "she", "hers", "sell"], policy="leftmost-longest"))
+    print(f"leftmost-longest: {result!r}")
+    result = "".join(redact_stream(iter(["abc", "d"]), ["ab", "abcd", "bc"], policy="leftmost-first"))
+    print(f"leftmost-first:   {result!r}")
+    print("Expected: '*** ****s' and '**cd' (the first listed word wins at the earliest start)\n")
+
+    # A precompiled filter keeps the sorted words, order restores the priority
+    compiled = compile_stop_words(["abcd", "ab"])
+    sorted_result = "".join(redact_stream(iter(["abc", "d"]), compiled, policy="leftmost-first"))
+    ordered_result = "".join(redact_stream(iter(["abc", "d"]), compiled, policy="leftmost-first", order=["abcd", "ab"]))
+    print(f"precompiled: {sorted_result!r}, with order: {ordered_result!r}")
+    print("Expected: '**cd', '****'\n")
+
+    def reference(text, words, policy):
+        # Brute force: at every position take the match chosen by the policy and skip over it
+        position = 0
+        output = []
+        while position < len(text):
+            matches = [word for word in words if text.startswith(word, position)]
+            if matches:
+                word = max(matches, key=len) if policy == "leftmost-longest" else matches[0]
+                output.append("*" * len(word))
+                position += len(word)
+            else:
+                output.append(text[position])
+                position += 1
+        return "".join(output)
+
+    random.seed(29)
+    mismatches = 0
+    runs = 2000
+    for _ in range(runs):
+        words = list(dict.fromkeys("".join(random.choice("abc") for _ in range(random.randint(1, 5)))
+                                   for _ in range(random.randint(1, 6))))
+        text = "".join(random.choice("abcd") for _ in range(random.randint(0, 40)))
+        tokens = [text[i:i + 3] for i in range(0, len(text), 3)]
+        policy = random.choice(["leftmost-longest", "leftmost-first"])
+        mismatches += "".join(redact_stream(iter(tokens), words, policy=policy)) != reference(text, words, policy)
+    print(f"Random streams: {runs}, mismatches with brute force redaction: {mismatches}")
+    print("Expected: 0 mismatches\n")
+
+
+# Startup cost allowed for `import stream_stopper` on top of the bare interpreter
+IMPORT_BUDGET_MS = 5.0
+
+
+def test_import_time():
+    """The core imports only itself, no network or playground modules, within the startup budget"""
+    import os
+    import subprocess
+    import sys
+    import stream_stopper
+
+    print("=== IMPORT TIME TEST ===\n")
+
+    def imported(statement):
+        # python -X importtime reports "import time: self [us] | cumulative | module" on stderr
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(stream_stopper.__file__)))
+        modules = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                _, cumulative, name = line[len("import time:"):].split("|")
+                if cumulative.strip().isdigit():
+                    modules[name.strip()] = int(cumulative)
+        return modules
+
+    baseline = imported("pass")
+    runs = [imported("import stream_stopper") for _ in range(3)]
+    loaded = sorted(set(runs[0]) - set(baseline))
+    milliseconds = min(run.get("stream_stopper", 0) for run in runs) / 1000
+    heavy = [name for name in loaded if name.split(".")[0] in
+             ("requests", "dotenv", "urllib3", "http", "socket", "ssl", "test_playground", "inspect", "typing")]
+    print(f"Modules loaded by the core: {loaded}")
+    print(f"Import time: {milliseconds:.2f} ms, budget {IMPORT_BUDGET_MS} ms, within budget: {milliseconds <= IMPORT_BUDGET_MS}")
+    print(f"Network/playground modules: {heavy}")
+    print("Expected: ['stream_stopper'] only, within budget, no network/playground modules\n")
+
+    lazy = imported("import stream_stopper; stream_stopper.LazyStopWordFilter(['HOTOVO!'])")
+    print(f"Module level LazyStopWordFilter loads: {sorted(set(lazy) - set(baseline))}")
+    print("Expected: ['stream_stopper'] (compiled on first use)\n")
+
+
+def test_filter_disk_cache():
+    """Compiled filters are loaded from the content addressed cache, damaged or stale entries are rebuilt"""
+    import os
+    import tempfile
+    import compact_filter
+    from compact_filter import CompactStopWordFilter, cache_key, load_cached
+
+    print("=== COMPILED FILTER DISK CACHE TEST ===\n")
+
+    stop_words = ["HOTOVO!", "stopni", "Praha"]
+    tokens = ["Vítejte v Pra", "ze. Praha je ", "krásná. HOTOVO!"]
+    expected = "".join(cut_stream_stop_words(iter(tokens), stop_words))
+    with tempfile.TemporaryDirectory() as directory:
+        built = load_cached(stop_words, directory)
+        loaded = load_cached(["stopni", "Praha", "HOTOVO!", "Praha"], directory)
+        print(f"Entries after a miss and a hit: {len(os.listdir(directory))}, hit is memory mapped: {loaded._mmap is not None}")
+        print(f"Same cut: {''.join(cut_stream_stop_words(iter(tokens), built)) == ''.join(cut_stream_stop_words(iter(tokens), loaded)) == expected}")
+        print("Expected: 1 entry, memory mapped, same cut")
+        del loaded
+
+        path = os.path.join(directory, cache_key(stop_words) + ".ssac")
+        with open(path, "r+b") as file:
+            file.seek(-1, os.SEEK_END)
+            last = file.read(1)
+            file.seek(-1, os.SEEK_END)
+            file.write(bytes([last[0] ^ 1]))
+        try:
+            CompactStopWordFilter.load(path)
+            damaged = "loaded"
+        except ValueError as error:
+            damaged = str(error).rsplit(" ", 2)[-2:]
+        rebuilt = load_cached(stop_words, directory)
+        CompactStopWordFilter.load(path)
+        print(f"Damaged entry: {damaged}, rebuilt: {''.join(cut_stream_stop_words(iter(tokens), rebuilt)) == expected}")
+        print("Expected: ['the', 'checksum'], rebuilt: True")
+
+        changed = cache_key(stop_words + ["nový"]) != cache_key(stop_words)
+        version = compact_filter.FILE_VERSION
+        compact_filter.FILE_VERSION = version + 1
+        try:
+            new_format = cache_key(stop_words) != path.rsplit(os.sep, 1)[-1][:-len(".ssac")]
+        finally:
+            compact_filter.FILE_VERSION = version
+        print(f"New key for a changed list: {changed}, for a new format version: {new_format}")
+        print("Expected: True, True\n")
+
+
+def test_fan_out():
+    """One scan drives an output per stop list, each cut like its own cut_stream_stop_words"""
+    import random
+    import threading
+    from stream_fanout import fan_out_stop_words
+
+    print("=== FAN-OUT TEST ===\n")
+
+    closed = []
+
+    def source():
+        try:
+            yield from ["Praha je ", "krásná, ", "HOTO", "VO! ", "stopni ", "tady."]
+        finally:
+            closed.append(True)
+
+    events = []
+    outputs = fan_out_stop_words(source(), {"ui": ["HOTOVO!"], "logging": ["stopni"], "safety": ["krásná"]},
+                                 on_stop=lambda name, event: events.append((name, event.stop_word)))
+    results = {name: "".join(output) for name, output in outputs.items()}
+    print(f"Outputs: {results}")
+    print("Expected: ui 'Praha je krásná, ', logging 'Praha je krásná, HOTOVO! ', safety 'Praha je '")
+    print(f"Stops: {sorted(events)}, upstream closed: {closed == [True]}")
+    print("Expected: all three lists stopped, upstream closed once\n")
+
+    random.seed(31)
+    mismatches = 0
+    runs = 1000
+    for _ in range(runs):
+        stop_lists = [["".join(random.choice("abc") for _ in range(random.randint(1, 4))) for _ in range(random.randint(0, 4))]
+                      for _ in range(random.randint(1, 4))]
+        text = "".join(random.choice("abcd") for _ in range(random.randint(0, 30)))
+        tokens = [text[i:i + 3] for i in range(0, len(text), 3)]
+        expected = [list(cut_stream_stop_words(iter(tokens), words)) for words in stop_lists]
+
+        # Outputs read at different speeds from different threads
+        outputs = fan_out_stop_words(iter(tokens), stop_lists)
+        results = [None] * len(outputs)
+
+        def consume(index):
+            results[index] = list(outputs[index])
+
+        threads = [threading.Thread(target=consume, args=(index,)) for index in range(len(outputs))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        mismatches += results != expected
+    print(f"Random streams: {runs}, mismatches with cut_stream_stop_words per list: {mismatches}")
+    print("Expected: 0 mismatches\n")
+
+    def failing_source():
+        yield "Praha je "
+        yield "HOTO"
+        raise ConnectionError("upstream failed")
+
+    # Every output sees the failure, none flushes its held-back text as if the stream had ended
+    received = []
+    for output in fan_out_stop_words(failing_source(), [["HOTOVO!"], ["krásná"]]):
+        pieces = []
+        try:
+            for piece in output:
+                pieces.append(piece)
+        except ConnectionError as error:
+            pieces.append(str(error))
+        received.append(pieces)
+    print(f"Failing upstream: {received}")
+    print("Expected: ['Praha je ', 'upstream failed'] and ['Praha je ', 'HOTO', 'upstream failed']")
+
+    outputs = fan_out_stop_words(iter(["b" + "a" * 2999, "b" + "a" * 3000, " konec"]), [["a" * 3000], ["konec"]])
+    print(f"Stop word of 3000 characters: {[len(''.join(output)) for output in outputs]} characters emitted")
+    print("Expected: [3001, 6002]\n")
+
+
+def test_fuzzy_matching():
+    """Stop words within k edits, cut like cut_stream_stop_words and checked against a full edit-distance scan"""
+    import random
+    from fuzzy_filter import FuzzyStopWordFilter
+
+    print("=== FUZZY MATCHING TEST ===\n")
+
+    filter = FuzzyStopWordFilter(["HOTOVO!", "stopni"], max_edits=1)
+    for tokens in (["Praha je HOTO", "VO. Dál"], ["Ne", "stopnì", " teď"], ["Vše je ", "hotovo"]):
+        events = []
+        result = "".join(cut_stream_stop_words(iter(tokens), filter, on_stop=events.append))
+        print(f"{tokens} -> {result!r}, {[(event.stop_word, event.start, event.end) for event in events]}")
+    print("Expected: 'Praha je ' (HOTOVO! 9-15, 'HOTOVO' already is one deletion away), 'Ne' (stopni 2-7), 'Vše je hotovo' (no cut)\n")
+
+    def distance(word, text):
+        previous = list(range(len(text) + 1))
+        for i, char in enumerate(word, 1):
+            current = [i]
+            for j, other in enumerate(text, 1):
+                current.append(min(previous[j - 1] + (char != other), previous[j] + 1, current[j - 1] + 1))
+            previous = current
+        return previous[-1]
+
+    def reference(tokens, stop_words, max_edits):
+        # First token completing a match; per end the closest start (latest on a tie), the earliest of them
+        text = "".join(tokens)
+        position = 0
+        for token in tokens:
+            cut = None
+            for end in range(position + 1, position + len(token) + 1):
+                for word in stop_words:
+                    distances = [(distance(word, text[start:end]), -start) for start in range(end)]
+                    best, start = min(distances, default=(max_edits + 1, 0))
+                    if best <= max_edits and (cut is None or -start < cut):
+                        cut = -start
+            if cut is not None:
+                return text[:cut]
+            position += len(token)
+        return text
+
+    random.seed(37)
+    mismatches = 0
+    runs = 500
+    for _ in range(runs):
+        stop_words = ["".join(random.choice("abc") for _ in range(random.randint(2, 5))) for _ in range(random.randint(1, 3))]
+        max_edits = random.randint(0, min(len(word) for word in stop_words) - 1)
+        text = "".join(random.choice("abcd") for _ in range(random.randint(0, 16)))
+        tokens = [text[i:i + 3] for i in range(0, len(text), 3)]
+        result = "".join(cut_stream_stop_words(iter(tokens), FuzzyStopWordFilter(stop_words, max_edits)))
+        mismatches += result != reference(tokens, stop_words, max_edits)
+    print(f"Random streams: {runs}, mismatches with the edit-distance scan: {mismatches}")
+    print("Expected: 0 mismatches\n")
+
+    matcher = filter.matcher()
+    matcher.feed("Text bez stop slov, " * 5)
+    print(f"Held back after plain text: {matcher.offset - matcher.live_start} characters, "
+          f"bound max_length - 1 = {filter.max_length - 1}")
+    print("Expected: 2 characters, any character may start a match with a substituted or deleted first letter\n")
+
+
+def test_inflected_stop_words():
+    """Stop words expanded into their inflected forms, matched literally and reported by their canonical form"""
+    import os
+    import tempfile
+    import inflection_filter
+    from inflection_filter import InflectedStopWordFilter, inflect
+
+    print("=== INFLECTED STOP WORDS TEST ===\n")
+
+    print(f"inflect('historie'): {inflect('historie')}")
+    print(f"inflect('Praha'): {inflect('Praha')}")
+    print("Expected: the case forms, historii and Praze among them\n")
+
+    text = "Česká republika má bohatou historii. Praha je krásné město s mnoha památkami."
+    tokens = [text[i:i + 5] for i in range(0, len(text), 5)]
+    with tempfile.TemporaryDirectory() as directory:
+        events = []
+        filter = InflectedStopWordFilter(["historie", "Praha"], persistent=True, cache_dir=directory)
+        result = "".join(cut_stream_stop_words(iter(tokens), filter, on_stop=events.append))
+        print(f"Filtered text: {result!r}, {[(event.stop_word, text[event.start:event.end]) for event in events]}")
+        print("Expected: 'Česká republika má bohatou ', ('historie', 'historii')\n")
+
+        result = "".join(cut_stream_stop_words(iter(["Bydlím v Pra", "ze už roky."]), filter))
+        print(f"Locative: {result!r}")
+        print("Expected: 'Bydlím v '\n")
+
+        # A word list covers irregular forms the suffix rules cannot generate
+        lexicon = os.path.join(directory, "lexicon.tsv")
+        with open(lexicon, "w", encoding="utf-8") as file:
+            file.write("člověk\tlidé\nčlověk\tlidi\nčlověk\tčlověka\n")
+        filter = InflectedStopWordFilter(["člověk"], lexicon=lexicon, persistent=True, cache_dir=directory)
+        result = "".join(cut_stream_stop_words(iter(["Všichni li", "dé tu jsou."]), filter))
+        print(f"Word list: {result!r}")
+        print("Expected: 'Všichni '\n")
+
+        # The second worker reads the cached expansion instead of expanding again
+        expand = inflection_filter.expand_stop_words
+        calls = []
+        inflection_filter.expand_stop_words = lambda *args: calls.append(args) or expand(*args)
+        try:
+            cached = InflectedStopWordFilter(["člověk"], lexicon=lexicon, persistent=True, cache_dir=directory)
+        finally:
+            inflection_filter.expand_stop_words = expand
+        entries = sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+        print(f"Cache entries: {len(entries)}, expansions on the cache hit: {len(calls)}, "
+              f"same variants: {cached.variants == filter.variants}")
+        print("Expected: 2 entries, 0 expansions, True\n")
+
+    # Phrases are inflected in agreement, the words take the same case
+    filter = InflectedStopWordFilter(["krásné staré město"])
+    agreeing = "".join(cut_stream_stop_words(iter(["Bydlí v krásném sta", "rém městě."]), filter))
+    mixed = "".join(cut_stream_stop_words(iter(["Bydlí v krásného sta", "rém městě."]), filter))
+    print(f"Variants: {len(filter.variants)}, agreeing: {agreeing!r}, mixed cases: {mixed!r}")
+    print("Expected: 10 variants, 'Bydlí v ', the whole text\n")
+
+    long_phrase = InflectedStopWordFilter(["dlouhý konec krásného starého města Praha"], max_variants=16)
+    print(f"Variants of a six word phrase with max_variants=16: {len(long_phrase.variants)}")
+    print("Expected: 16\n")
+
+
+def test_output_coalescing():
+    """Filtered output merged into frames by size and deadline, token boundaries kept on request"""
+    import asyncio
+    import time
+    from stream_coalesce import acoalesce_stream, coalesce_stream
+    from stream_stopper import acut_stream_stop_words
+
+    print("=== OUTPUT COALESCING TEST ===\n")
 
-    def generate_stream(size=10000):
-        for i in range(size):
-            yield f"token{i % 50}"
-        yield "FINAL_STOP"
+    tokens = list("Toto je test vysokofrekvenčního streamu. HOTOVO! Tohle už ne.")
+    frames = list(coalesce_stream(cut_stream_stop_words(iter(tokens), ["HOTOVO!"]), max_chars=16, max_delay=None))
+    print(f"Frames: {frames}")
+    print("Expected: frames of 16 characters and a shorter last one, ending before 'HOTOVO!'\n")
 
-    for num_stops in [1, 5, 10, 20, 50]:
-        stop_words = [f"stop{i}" for i in range(num_stops)] + ["FINAL_STOP"]
+    frames = list(coalesce_stream(iter(["Ahoj", " svě", "te"]), keep_tokens=True))
+    print(f"Frames with tokens: {frames}")
+    print("Expected: one frame 'Ahoj světe' with tokens ('Ahoj', ' svě', 'te')\n")
 
-        start = time.time()
-        result = list(cut_stream_stop_words(generate_stream(), stop_words))
-        elapsed = time.time() - start
+    async def stalled():
+        yield "Ahoj"
+        await asyncio.sleep(0.2)  # The model pauses, the pending frame must not wait for it
+        yield " světe"
 
-        print(f"  {num_stops:2d} stop words: {elapsed:.4f}s, {len(result)} tokens")
+    async def collect():
+        start = time.monotonic()
+        return [(frame, time.monotonic() - start) async for frame in acoalesce_stream(stalled(), max_chars=256, max_delay=0.02)]
 
-    print("\nBenchmark 2: Effect of stop word length")
+    frames = asyncio.run(collect())
+    print(f"Async frames: {[(frame, round(seconds, 2)) for frame, seconds in frames]}")
+    print("Expected: 'Ahoj' after about 0.02 s (the deadline, not the pause), ' světe' after about 0.2 s (the end of the stream flushes at once)\n")
 
-    for word_len in [5, 10, 20, 30, 50]:
-        stop_words = ["x" * word_len, "FINAL_STOP"]
+    async def filtered():
+        async def source():
+            for token in tokens:
+                yield token
+        return [frame async for frame in acoalesce_stream(acut_stream_stop_words(source(), ["HOTOVO!"]), max_chars=16)]
 
-        start = time.time()
-        result = list(cut_stream_stop_words(generate_stream(), stop_words))
-        elapsed = time.time() - start
+    print(f"Async equals sync: {''.join(asyncio.run(filtered())) == ''.join(cut_stream_stop_words(iter(tokens), ['HOTOVO!']))}")
+    print("Expected: True\n")
 
-        print(f"  Length {word_len:2d}: {elapsed:.4f}s, {len(result)} tokens")
 
+def test_load_harness():
+    """Smoke run of the load test: concurrent filtered streams from the mock endpoint"""
+    from test_playground.load_test import LoadProfile, generate_stream, load_test
 
+    profile = LoadProfile(tokens=30, rate=0)
+    streams = 20
+    results = load_test(profile, streams=streams, ramp=0, memory=False)
+    expected_stops = sum(generate_stream(profile, seed)[1] is not None for seed in range(streams))
+    filtered = results["acut_stream_stop_words"]
+    print(f"\nFailed streams: {results['unfiltered']['failed'] + filtered['failed']}, "
+          f"stopped: {filtered['stopped']} of {expected_stops} streams with a stop word")
+    print("Expected: 0 failed, every stream with a stop word stopped\n")
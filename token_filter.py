@@ -0,0 +1,386 @@
+"""
+Stop sequences matched directly on token-ID streams, without decoding every token to text.
+
+    vocabulary = load_vocabulary("tokenizer.json")
+    filter = TokenIdFilter(["HOTOVO!", "<|im_end|>"], vocabulary)
+    for item in cut_token_ids(id_stream, filter): ...  # token IDs, the last item may be a str
+"""
+import codecs
+import inspect
+import json
+from array import array
+from collections.abc import AsyncGenerator, AsyncIterable, Callable, Generator, Iterable, Mapping, Sequence
+
+from compact_filter import CompactStopWordMatcher
+from stream_stopper import _NOTHING, StopEvent, StopWordFilter, StopWordMatcher, compile_stop_words
+
+# Default upper bound of memoized (state, token ID) transitions per filter, later ones are computed each time
+TRANSITION_CACHE_LIMIT = 65536
+# Pre-tokenized variants kept per stop word
+MAX_VARIANTS = 256
+
+_SENTENCEPIECE_SPACE = "▁"
+
+
+def _byte_level_decoder() -> dict[str, int]:
+    """
+    Inverse of the GPT-2 byte level alphabet, which maps every byte to a printable character.
+    """
+    printable = list(range(ord("!"), ord("~") + 1)) + list(range(ord("¡"), ord("¬") + 1)) \
+        + list(range(ord("®"), ord("ÿ") + 1))
+    chars = {byte: byte for byte in printable}
+    extra = 0
+    for byte in range(256):
+        if byte not in chars:
+            chars[byte] = 256 + extra
+            extra += 1
+    return {chr(char): byte for byte, char in chars.items()}
+
+
+def _has_type(node, type_name: str) -> bool:
+    # Nested pre_tokenizer/decoder configurations of tokenizer.json
+    if isinstance(node, dict):
+        return node.get("type") == type_name or any(_has_type(value, type_name) for value in node.values())
+    if isinstance(node, list):
+        return any(_has_type(value, type_name) for value in node)
+    return False
+
+
+class Vocabulary:
+    """
+    Text of every token ID. texts[id] is None for tokens which are not valid UTF-8 on their own
+    (byte level pieces of a multi-byte character), their bytes are in token_bytes[id].
+    """
+
+    def __init__(self, token_bytes: dict[int, bytes]):
+        size = max(token_bytes, default=-1) + 1
+        self.token_bytes = [b""] * size
+        self.texts = [""] * size
+        for token_id, data in token_bytes.items():
+            self.token_bytes[token_id] = data
+            try:
+                self.texts[token_id] = data.decode("utf-8")
+            except UnicodeDecodeError:
+                self.texts[token_id] = None
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def decode(self, token_ids: Iterable[int]) -> str:
+        return b"".join(self.token_bytes[token_id] for token_id in token_ids).decode("utf-8", errors="replace")
+
+    def text_index(self) -> dict[str, list[int]]:
+        """
+        Token IDs of every token text, tokens without valid UTF-8 text are left out.
+        """
+        index = {}
+        for token_id, token_text in enumerate(self.texts):
+            if token_text:
+                index.setdefault(token_text, []).append(token_id)
+        return index
+
+
+def load_vocabulary(path: str, byte_level: bool | None = None) -> Vocabulary:
+    """
+    Load a tokenizer vocabulary from a local file: a Hugging Face tokenizer.json or a plain
+    {"token": id} JSON map (vocab.json). byte_level (GPT-2 style "Ġ" tokens) is detected
+    when None. SentencePiece "▁" is decoded as a space and <0xNN> pieces as single bytes.
+    """
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+
+    added = []
+    if "model" in data:
+        vocab = data["model"]["vocab"]
+        if isinstance(vocab, list):
+            # Unigram models list [piece, score] pairs, the ID is the position
+            vocab = {piece: token_id for token_id, (piece, _) in enumerate(vocab)}
+        added = data.get("added_tokens") or []
+        if byte_level is None:
+            byte_level = _has_type(data.get("pre_tokenizer"), "ByteLevel") or _has_type(data.get("decoder"), "ByteLevel")
+    else:
+        vocab = data
+        if byte_level is None:
+            byte_level = any("Ġ" in token for token in vocab)
+
+    byte_decoder = _byte_level_decoder() if byte_level else None
+    token_bytes = {}
+    for token, token_id in vocab.items():
+        if byte_decoder is not None and all(char in byte_decoder for char in token):
+            token_bytes[token_id] = bytes(byte_decoder[char] for char in token)
+        elif len(token) == 6 and token.startswith("<0x") and token.endswith(">"):
+            token_bytes[token_id] = bytes([int(token[3:5], 16)])
+        else:
+            token_bytes[token_id] = token.replace(_SENTENCEPIECE_SPACE, " ").encode("utf-8")
+    # Added (special) tokens are never byte level encoded
+    for token in added:
+        token_bytes[token["id"]] = token["content"].encode("utf-8")
+    return Vocabulary(token_bytes)
+
+
+def tokenize_variants(text: str, vocabulary: Vocabulary, max_variants: int = MAX_VARIANTS,
+                      index: Mapping[str, list[int]] | None = None) -> list[tuple[int, ...]]:
+    """
+    All token ID sequences whose texts spell exactly the text, at most max_variants of them.
+    index is vocabulary.text_index(), pass it when tokenizing several texts so the vocabulary
+    is scanned once; every substring of the text is then one lookup.
+    """
+    if index is None:
+        index = vocabulary.text_index()
+
+    # variants[i] are the segmentations of text[:i]
+    variants = [[] for _ in range(len(text) + 1)]
+    variants[0].append(())
+    for end in range(1, len(text) + 1):
+        for start in range(end):
+            if not variants[start]:
+                continue
+            for token_id in index.get(text[start:end], ()):
+                for prefix in variants[start]:
+                    if len(variants[end]) >= max_variants:
+                        break
+                    variants[end].append(prefix + (token_id,))
+    return variants[len(text)]
+
+
+class TokenIdFilter:
+    """
+    Stop words matched on token IDs. The transitions of the string automaton are memoized per
+    (automaton state, token ID): a token ID advances the matcher with one dict lookup instead of
+    being decoded and scanned character by character. The table is seeded with the pre-tokenized
+    ID variants of every stop word. Token IDs which are no valid UTF-8 on their own are decoded
+    incrementally and scanned with the string matcher, the only place text is still built.
+    At most transition_limit transitions are memoized, later ones are computed on every use.
+    """
+
+    def __init__(self, stop_words: Iterable[str] | StopWordFilter, vocabulary: Vocabulary,
+                 max_variants: int = MAX_VARIANTS, transition_limit: int = TRANSITION_CACHE_LIMIT):
+        self.filter = compile_stop_words(stop_words)
+        if not isinstance(self.filter.matcher(), (StopWordMatcher, CompactStopWordMatcher)):
+            raise ValueError("token ID matching needs a filter whose matcher state is (state, offset)")
+        self.vocabulary = vocabulary
+        self.max_length = self.filter.max_length
+        self.transitions = {}  # automaton state -> {token ID: (next state, relative match or None)}
+        self.transition_limit = transition_limit
+        self.cached_transitions = 0
+
+        index = vocabulary.text_index()
+        self.variants = {word: tokenize_variants(word, vocabulary, max_variants, index)
+                         for word in self.filter.stop_words if word}
+        for variants in self.variants.values():
+            for token_ids in variants:
+                state = 0
+                for token_id in token_ids:
+                    state = self.transition(state, token_id)[0]
+
+    def transition(self, state: int, token_id: int) -> tuple[int, tuple[str, int, int] | None]:
+        """
+        Next automaton state after the token's text and the earliest match ending inside it,
+        with positions relative to the start of the token.
+        """
+        edges = self.transitions.get(state)
+        if edges is not None:
+            cached = edges.get(token_id)
+            if cached is not None:
+                return cached
+
+        matcher = self.filter.matcher()
+        matcher.state = state
+        match = matcher.feed(self.vocabulary.texts[token_id])
+        result = (matcher.state, match)
+        if self.cached_transitions < self.transition_limit:
+            self.transitions.setdefault(state, {})[token_id] = result
+            self.cached_transitions += 1
+        return result
+
+
+class TokenIdCutter:
+    """
+    StreamCutter over token IDs. Pending IDs and the number of characters each contributed are
+    kept in array('i') buffers. Emitted items are token IDs, only a token cut in the middle by a
+    stop word is returned as the text of its part before the stop word.
+    """
+
+    def __init__(self, filter: TokenIdFilter):
+        self.filter = filter
+        self.texts = filter.vocabulary.texts
+        self.transitions = filter.transitions
+        self.depth = filter.filter.depth
+        self.matcher = filter.filter.matcher()
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.partial = False  # The decoder holds the first bytes of a character
+        self.stopped = False
+        self.stop_event = None
+
+        self.ids = array("i")
+        self.lengths = array("i")
+        self.base = 0  # Absolute offset of the first pending token
+
+    def _feed_bytes(self, token_id: int) -> tuple[str, int] | None:
+        """
+        Part of a multi-byte character, scanned as text once the character is complete.
+        Returns the absolute match and the number of decoded characters.
+        """
+        text = self.decoder.decode(self.filter.vocabulary.token_bytes[token_id])
+        self.partial = bool(self.decoder.getstate()[0])
+        return self.matcher.feed(text), len(text)
+
+    def _take(self, count: int) -> list[int]:
+        """
+        Remove the first count pending IDs and return them.
+        Trailing IDs without characters hold the first bytes of a character which stays pending.
+        """
+        lengths = self.lengths
+        while count and lengths[count - 1] == 0:
+            count -= 1
+        emitted = self.ids[:count].tolist()
+        self.base += sum(lengths[:count])
+        del self.ids[:count]
+        del lengths[:count]
+        return emitted
+
+    def push(self, token_id: int) -> Sequence[int | str]:
+        """
+        Process the next token ID and return the IDs (or the text of a cut token) safe to emit.
+        When a stop word is found, the IDs before it are returned and `stopped` is set.
+        """
+        matcher = self.matcher
+        offset = matcher.offset
+        text = self.texts[token_id]
+
+        if text is None or self.partial:
+            stop_result, length = self._feed_bytes(token_id)
+        else:
+            # Memoized transition of the automaton over the token's text
+            edges = self.transitions.get(matcher.state)
+            cached = edges.get(token_id) if edges is not None else None
+            if cached is None:
+                cached = self.filter.transition(matcher.state, token_id)
+            matcher.state, stop_result = cached
+            length = len(text)
+            matcher.offset = offset + length
+            if stop_result is not None:
+                word, start, end = stop_result
+                stop_result = (word, offset + start, offset + end)
+
+        self.ids.append(token_id)
+        lengths = self.lengths
+        lengths.append(length)
+
+        if stop_result:
+            stop_word, stop_start, stop_end = stop_result
+            self.stop_event = StopEvent(stop_word, stop_start, stop_end)
+            self.stopped = True
+
+            # IDs entirely before the stop word
+            count = 0
+            token_start = self.base
+            while count < len(lengths) and token_start + lengths[count] <= stop_start:
+                token_start += lengths[count]
+                count += 1
+
+            cut_text = ""
+            if count < len(lengths) and token_start < stop_start:
+                # The stop word starts inside this token, its characters are decoded together
+                # with the preceding IDs which carry the first bytes of its first character
+                first = count
+                while first and lengths[first - 1] == 0:
+                    first -= 1
+                cut_text = self.filter.vocabulary.decode(self.ids[first:count + 1])[:stop_start - token_start]
+
+            emitted = self._take(count)
+            if cut_text:
+                emitted.append(cut_text)
+            self.ids = array("i")
+            self.lengths = array("i")
+            return emitted
+
+        # Emit IDs whose characters can no longer be the start of a stop word
+        safe_boundary = matcher.offset - self.depth[matcher.state]
+        end = self.base + lengths[0]
+        if end > safe_boundary:
+            return _NOTHING
+        if safe_boundary == matcher.offset and lengths[-1]:
+            # Nothing is live, all pending IDs leave
+            emitted = self.ids.tolist()
+            del self.ids[:]
+            del lengths[:]
+            self.base = safe_boundary
+            return emitted
+
+        count = 1
+        while count < len(lengths) and end + lengths[count] <= safe_boundary:
+            end += lengths[count]
+            count += 1
+        return self._take(count)
+
+    def flush(self) -> list[int]:
+        """
+        End of the stream, return all remaining token IDs.
+        """
+        remaining = self.ids.tolist()
+        self.ids = array("i")
+        self.lengths = array("i")
+        self.base = self.matcher.offset
+        return remaining
+
+
+def cut_token_ids(token_ids: Iterable[int], filter: TokenIdFilter,
+                  on_stop: Callable[[StopEvent], None] | None = None,
+                  close_upstream: bool = True) -> Generator[int | str, None, None]:
+    """
+    cut_stream_stop_words over a stream of token IDs. Yields token IDs, the last item is a str
+    when a stop word starts inside a token: the text of the token before the stop word.
+    StopEvent offsets are character positions of the decoded stream.
+    """
+    token_iterator = iter(token_ids)
+    if not filter.max_length:
+        yield from token_iterator
+        return
+
+    cutter = TokenIdCutter(filter)
+    for token_id in token_iterator:
+        emitted = cutter.push(token_id)
+        if cutter.stopped:
+            if on_stop is not None:
+                on_stop(cutter.stop_event)
+            close = getattr(token_iterator, "close", None)
+            if close_upstream and close is not None:
+                close()
+            yield from emitted
+            return
+        yield from emitted
+
+    yield from cutter.flush()
+
+
+async def acut_token_ids(token_ids: AsyncIterable[int], filter: TokenIdFilter,
+                         on_stop: Callable[[StopEvent], None] | None = None,
+                         close_upstream: bool = True) -> AsyncGenerator[int | str, None]:
+    """
+    Asyncio variant of cut_token_ids with identical semantics.
+    """
+    token_iterator = aiter(token_ids)
+    if not filter.max_length:
+        async for token_id in token_iterator:
+            yield token_id
+        return
+
+    cutter = TokenIdCutter(filter)
+    async for token_id in token_iterator:
+        emitted = cutter.push(token_id)
+        if cutter.stopped:
+            if on_stop is not None:
+                result = on_stop(cutter.stop_event)
+                if inspect.isawaitable(result):
+                    await result
+            aclose = getattr(token_iterator, "aclose", None)
+            if close_upstream and aclose is not None:
+                await aclose()
+        for item in emitted:
+            yield item
+        if cutter.stopped:
+            return
+
+    for item in cutter.flush():
+        yield item